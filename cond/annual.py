@@ -0,0 +1,282 @@
+"""
+全年 8760 小时运行模拟
+投标评估需要固定设计在全年逐时负荷与逐时冷却水温下的背压、循环水泵耗电
+与背压升高造成的发电损失。本模块一次向量化调用完成：
+- 设计（一台或多台候选）的几何与传热系数基值只算一次，逐时部分按
+  [设计, 小时] 二维数组整体计算，多台候选按块处理以限制内存；
+- 每小时按固定几何校核（见 cooling_tower.rated_saturation_temp）：由进口水温、
+  蒸汽流量与焓求饱和温度、排热量与出口水温，背压按 IF97 饱和压力方程；
+- 水阻与引擎相同（HEI，含 1.2 系数），按逐时平均水温修正；
+  泵功率 = (凝汽器水阻 + 系统阻力) × 体积流量 / 泵效率，停机小时不计；
+- 发电损失：排汽压力高于参考背压时末级少做的功 ∫v·dp，按排汽湿度与
+  理想气体比容积分为 x·R·T·ln(p/p_ref)，低于参考背压不计收益；
+- 返回逐时结果与按月、全年汇总。
+"""
+import numpy as np
+
+from . import vectorized as vec
+from .cooling_tower import rated_saturation_temp, saturation_pressure
+
+HOURS_PER_YEAR = 8760
+_MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+R_STEAM = 0.4615        # 水蒸气气体常数 kJ/(kg·K)
+# 默认参考背压 (MPa)：湿冷机组汽轮机常见的额定排汽压力，各候选设计共用同一参考才可比较
+REFERENCE_BACK_PRESSURE = 0.0049
+
+_DESIGN_FIELDS = ('tube_diameter', 'tube_wall_thickness', 'tube_length', 'tube_count', 'passes',
+                  'material', 'cp_water', 'rho_water', 'clean_factor_corrected', 'water_flow_kg_s',
+                  'steam_mass_flow', 'steam_enthalpy', 'cooling_water_in_temp')
+HOURLY_FIELDS = ('saturation_temp', 'back_pressure', 'cooling_water_out_temp', 'DUTY',
+                 'pressure_drop', 'pump_power', 'lost_power')
+
+
+class AnnualResult:
+    """
+    全年模拟结果
+
+    hourly: 逐时字段 -> [设计, 小时] 数组（hourly=False 时为 None）
+    monthly: 按月字段 -> [设计, 12] 数组
+    annual: 全年字段 -> [设计] 数组
+    reference_back_pressure: 各设计的参考背压 (MPa)
+    只给定一台设计（InputData）时去掉设计维。
+    """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
+def _design_arrays(designs):
+    """设计 -> 字段数组 [设计数]；designs 为 InputData 序列或列式字典"""
+    if isinstance(designs, dict):
+        values = {k: np.asarray(designs[k]) for k in _DESIGN_FIELDS}
+    else:
+        values = {k: np.array([getattr(d, k) for d in designs]) for k in _DESIGN_FIELDS}
+    missing = [k for k, v in values.items() if k != 'material' and np.isnan(v.astype(float)).any()]
+    if missing:
+        raise ValueError(f"设计缺少计算结果字段：{', '.join(missing)}（须先完成计算）")
+    return values
+
+
+def _month_starts(hours):
+    if hours == HOURS_PER_YEAR:
+        days = _MONTH_DAYS
+    elif hours == HOURS_PER_YEAR + 24:
+        days = _MONTH_DAYS[:1] + (29,) + _MONTH_DAYS[2:]
+    else:
+        raise ValueError(f"逐时数据须为 8760 或 8784 小时，实际 {hours}")
+    return np.concatenate([[0], np.cumsum(days)[:-1]]) * 24
+
+
+class _Designs:
+    """设计的逐时无关部分（全为 [设计数, 1] 列，便于与逐时数组广播）"""
+
+    def __init__(self, d):
+        col = {k: v.reshape(-1, 1) for k, v in d.items()}
+        do = col['tube_diameter'].astype(float)
+        wall = col['tube_wall_thickness'].astype(float)
+        count = col['tube_count'].astype(float)
+        self.passes = col['passes'].astype(float)
+        self.length = col['tube_length'].astype(float)
+        self.di = do - 2 * wall
+        self.area = np.pi * do / 1000 * self.length / 1000 * count
+        flow_area = np.pi * (self.di / 2000) ** 2 * count / self.passes
+        self.water_flow = col['water_flow_kg_s'].astype(float)
+        self.volume_flow = self.water_flow / col['rho_water'].astype(float)
+        self.velocity = self.volume_flow / flow_area
+        self.cp = col['cp_water'].astype(float)
+        self.mcp = self.water_flow * self.cp
+        mat = vec.material_coeff(vec.material_index(d['material']), d['tube_wall_thickness'] / 25.4)
+        u = vec.uncorrected_u(do, self.velocity) * vec.U_BTU_TO_METRIC
+        self.u_clean = u * mat.reshape(-1, 1)
+        self.u_base = self.u_clean * col['clean_factor_corrected'].astype(float)
+        self.design_steam_flow = col['steam_mass_flow'].astype(float) / 3600
+        self.design_enthalpy = col['steam_enthalpy'].astype(float)
+        self.design_t_in = col['cooling_water_in_temp'].astype(float)
+
+    def take(self, rows):
+        part = object.__new__(_Designs)
+        part.__dict__.update({k: v[rows] for k, v in self.__dict__.items()})
+        return part
+
+
+def lost_power(t_sat, back_pressure, steam_flow, enthalpy, reference_back_pressure):
+    """
+    背压高于参考背压造成的发电损失 (kW)（数组版本）
+
+    参数:
+        t_sat: 饱和温度 (°C)
+        back_pressure: 背压 (MPa)
+        steam_flow: 蒸汽流量 (kg/s)
+        enthalpy: 蒸汽焓 (kJ/kg)
+        reference_back_pressure: 参考背压 (MPa)
+    """
+    # 排汽干度与汽化潜热按饱和温度近似
+    h_fg = 2501.0 - 2.361 * t_sat
+    dryness = np.clip((enthalpy - (4.2 * t_sat + 0.0015 * t_sat ** 2)) / h_fg, 0.0, 1.0)
+    ratio = np.maximum(back_pressure / reference_back_pressure, 1.0)
+    return steam_flow * dryness * R_STEAM * (t_sat + 273.15) * np.log(ratio)
+
+
+def _hourly(g, t_in, steam_flow, enthalpy, p_ref, system_head, pump_efficiency):
+    """一块设计的逐时计算：g 为 _Designs，逐时数组为 [1, 小时]"""
+    t_sat, duty = rated_saturation_temp(t_in, g.u_base, g.area, g.mcp,
+                                        steam_flow=steam_flow, steam_enthalpy=enthalpy)
+    t_out = t_in + duty / g.mcp
+    p = saturation_pressure(t_sat)
+    running = steam_flow > 0
+    drop = 1.2 * 0.001 * vec.hei_water_resistance(g.di, g.velocity, g.length, g.passes, (t_in + t_out) / 2)
+    pump = np.where(running, (drop + system_head) * g.volume_flow / pump_efficiency, 0.0)
+    lost = lost_power(t_sat, p, steam_flow, enthalpy, p_ref)
+    return {'saturation_temp': t_sat, 'back_pressure': p, 'cooling_water_out_temp': t_out,
+            'DUTY': duty, 'pressure_drop': drop, 'pump_power': pump, 'lost_power': lost}, running
+
+
+def simulate_annual(designs, steam_mass_flow, steam_enthalpy, cooling_water_in_temp,
+                    system_head=50.0, pump_efficiency=0.85, reference_back_pressure=REFERENCE_BACK_PRESSURE,
+                    hourly=True, block=64):
+    """
+    固定设计的全年逐时模拟
+
+    参数:
+        designs: 已完成计算的设计：InputData、InputData 序列，或含设计字段的列式字典
+                 （如输入列与 batch.calculate_batch 结果合并）
+        steam_mass_flow: 逐时蒸汽流量 (kg/h)，8760（或闰年 8784）个值，0 为停机
+        steam_enthalpy: 逐时蒸汽焓 (kJ/kg)，数组或标量
+        cooling_water_in_temp: 逐时冷却水进口温度 (°C)，数组或标量
+        system_head: 凝汽器以外的循环水系统阻力 (kPa)
+        pump_efficiency: 循环水泵效率（含电机）
+        reference_back_pressure: 计算发电损失的参考背压 (MPa)，标量或按设计的数组；
+                                 None 为各设计在自身设计工况下的校核背压（考核偏差用）
+        hourly: 是否返回逐时结果（多台设计时逐时数组较大）
+        block: 每块同时计算的设计数（限制内存）
+    返回:
+        AnnualResult
+    """
+    single = not isinstance(designs, (dict, list, tuple))
+    d = _design_arrays([designs] if single else designs)
+    flow = np.asarray(steam_mass_flow, dtype=float).ravel() / 3600
+    hours = flow.size
+    starts = _month_starts(hours)
+    enthalpy = np.broadcast_to(np.asarray(steam_enthalpy, dtype=float), (hours,)).reshape(1, -1)
+    t_in = np.broadcast_to(np.asarray(cooling_water_in_temp, dtype=float), (hours,)).reshape(1, -1)
+    flow = flow.reshape(1, -1)
+    if pump_efficiency <= 0:
+        raise ValueError("泵效率必须>0")
+
+    g_all = _Designs(d)
+    n = g_all.area.shape[0]
+    if reference_back_pressure is None:
+        t_ref = rated_saturation_temp(g_all.design_t_in, g_all.u_base, g_all.area, g_all.mcp,
+                                      steam_flow=g_all.design_steam_flow,
+                                      steam_enthalpy=g_all.design_enthalpy)[0]
+        p_ref_all = saturation_pressure(t_ref)
+    else:
+        p_ref_all = np.broadcast_to(np.asarray(reference_back_pressure, dtype=float), (n,)).reshape(-1, 1)
+
+    hourly_out = {k: np.empty((n, hours)) for k in HOURLY_FIELDS} if hourly else None
+    monthly = {k: np.empty((n, 12)) for k in ('mean_back_pressure', 'max_back_pressure', 'heat_rejected',
+                                               'pumping_energy', 'lost_generation', 'operating_hours',
+                                               'invalid_hours')}
+    for start in range(0, n, block):
+        rows = slice(start, min(start + block, n))
+        r, running = _hourly(g_all.take(rows), t_in, flow, enthalpy, p_ref_all[rows],
+                             system_head, pump_efficiency)
+        if hourly:
+            for k in HOURLY_FIELDS:
+                hourly_out[k][rows] = r[k]
+        p = r['back_pressure']
+        invalid = running & np.isnan(p)
+        ok = running & ~invalid
+
+        def month_sum(x):
+            return np.add.reduceat(np.where(ok, x, 0.0), starts, axis=1)
+
+        hours_ok = month_sum(1.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            monthly['mean_back_pressure'][rows] = month_sum(p) / hours_ok
+        monthly['max_back_pressure'][rows] = np.maximum.reduceat(np.where(ok, p, -np.inf), starts, axis=1)
+        monthly['heat_rejected'][rows] = month_sum(r['DUTY']) / 1000              # MWh
+        monthly['pumping_energy'][rows] = month_sum(r['pump_power']) / 1000       # MWh
+        monthly['lost_generation'][rows] = month_sum(r['lost_power']) / 1000      # MWh
+        monthly['operating_hours'][rows] = hours_ok
+        monthly['invalid_hours'][rows] = np.add.reduceat(invalid.astype(float), starts, axis=1)
+    monthly['max_back_pressure'][np.isinf(monthly['max_back_pressure'])] = np.nan
+
+    operating = monthly['operating_hours'].sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_p = (monthly['mean_back_pressure'] * monthly['operating_hours']).sum(axis=1,
+                  where=monthly['operating_hours'] > 0) / operating
+    annual = {
+        'mean_back_pressure': mean_p,
+        'max_back_pressure': np.nanmax(np.where(np.isnan(monthly['max_back_pressure']), -np.inf,
+                                                monthly['max_back_pressure']), axis=1),
+        'heat_rejected': monthly['heat_rejected'].sum(axis=1),
+        'pumping_energy': monthly['pumping_energy'].sum(axis=1),
+        'lost_generation': monthly['lost_generation'].sum(axis=1),
+        'operating_hours': operating,
+        'invalid_hours': monthly['invalid_hours'].sum(axis=1),
+    }
+    annual['max_back_pressure'][np.isinf(annual['max_back_pressure'])] = np.nan
+    p_ref = p_ref_all.ravel()
+
+    if single:
+        hourly_out = None if hourly_out is None else {k: v[0] for k, v in hourly_out.items()}
+        monthly = {k: v[0] for k, v in monthly.items()}
+        annual = {k: v[0] for k, v in annual.items()}
+        p_ref = p_ref[0]
+    return AnnualResult(hourly=hourly_out, monthly=monthly, annual=annual, reference_back_pressure=p_ref)
+
+
+if __name__ == "__main__":
+    import time
+
+    from .batch import calculate_batch
+    from .calculator import CondenserCalculator
+    from .columns import as_columns
+    from .data_model import InputData
+
+    base = dict(steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+                tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+                material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+                cooling_water_in_temp=25, cooling_water_temp_rise=8,
+                cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85)
+    design = CondenserCalculator(InputData.from_dict(base)).calculate_all()
+
+    hours = np.arange(HOURS_PER_YEAR)
+    rng = np.random.default_rng(0)
+    t_in = 17 + 9 * np.sin(2 * np.pi * (hours / 8760 - 0.3)) + rng.normal(0, 0.5, hours.size)
+    load = np.clip(0.8 + 0.15 * np.sin(2 * np.pi * (hours % 24 - 8) / 24) + rng.normal(0, 0.03, hours.size),
+                   0.4, 1.0)
+    load[(hours >= 24 * 100) & (hours < 24 * 114)] = 0          # 两周检修
+    steam = 600000 * load
+
+    res = simulate_annual(design, steam, 2400, t_in)
+    a = res.annual
+    print(f"参考背压 {res.reference_back_pressure * 1000:.2f} kPa；全年运行 {a['operating_hours']:.0f} h，"
+          f"平均背压 {a['mean_back_pressure'] * 1000:.2f} kPa，最高 {a['max_back_pressure'] * 1000:.2f} kPa")
+    print(f"排热 {a['heat_rejected']:,.0f} MWh，泵耗电 {a['pumping_energy']:,.0f} MWh，"
+          f"发电损失 {a['lost_generation']:,.0f} MWh")
+    print("各月平均背压 (kPa)：", np.round(res.monthly['mean_back_pressure'] * 1000, 2))
+
+    # 1000 台候选设计：流速、管径、清洁系数不同
+    n = 1000
+    cols = as_columns(dict(base, velocity=rng.uniform(1.6, 2.6, n),
+                           tube_diameter=rng.choice([22.225, 25.4, 28.575], n),
+                           cleanliness_factor=rng.uniform(0.8, 0.9, n)))
+    designs = dict(cols, **calculate_batch(cols))
+    t0 = time.perf_counter()
+    many = simulate_annual(designs, steam, 2400, t_in, hourly=False)
+    elapsed = time.perf_counter() - t0
+    best = int(np.argmin(many.annual['lost_generation'] + many.annual['pumping_energy']))
+    print(f"{n} 台候选设计 × 8760 小时：{elapsed:.2f} s；"
+          f"损失+泵耗最小的设计 {best}：{many.annual['lost_generation'][best]:,.0f} + "
+          f"{many.annual['pumping_energy'][best]:,.0f} MWh")
+
+    # 与单台逐一计算一致
+    one = simulate_annual(InputData.from_dict({k: designs[k][best] for k in designs}), steam, 2400, t_in)
+    print("与单台计算一致：", all(np.isclose(one.annual[k], many.annual[k][best], equal_nan=True)
+                                  for k in one.annual))
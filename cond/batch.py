@@ -0,0 +1,213 @@
+"""
+批量计算引擎
+CondenserCalculator.calculate_all() 的列式向量化版本：整批工况先做一次
+批量校验，校验通过的工况直接走无校验的数组计算路径，未通过的工况
+结果为 NaN 并保留错误位掩码，不会因个别坏数据中断整批计算。
+给定排管方式（tube_layout_pattern）的工况按实际排管求管板外径（见 tube_layout 模块）。
+"""
+import numpy as np
+
+from . import vectorized as vec
+from .columns import as_columns, take, OUTPUT_FIELDS
+from .progress import Progress
+from .tube_layout import _PATTERNS as _LAYOUT_PATTERNS, min_tube_sheet_diameter
+from .validation import FATAL_MASK, ValidationResult, validate_batch
+
+# 报告进度或可取消时的默认分块工况数
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _layout_sheet_diameter(sheet, layout, do, count, passes, pitch):
+    """
+    按排管方式修正管板外径（同 calculate_all()：给定排管方式时按实际排管计算）
+
+    参数:
+        sheet: 按估算公式计算的管板外径 (mm)，原地修改
+        layout: 排管方式字符串数组，空串为按估算公式
+        do, count, passes, pitch: 管外径 (mm)、管数、流程数、管间距 (mm)
+    返回:
+        ndarray: sheet；排管方式未知或无法排管的工况为 NaN
+    """
+    given = layout != ''
+    if not given.any():
+        return sheet
+    pattern = np.full(layout.shape, -1)
+    for i, name in enumerate(_LAYOUT_PATTERNS):
+        pattern[layout == name] = i
+    with np.errstate(invalid='ignore'):
+        ok = given & (pattern >= 0) & (pitch > do) & (count >= 1) & np.isin(passes, (1, 2, 4))
+    sheet[given & ~ok] = np.nan
+    rows = np.flatnonzero(ok)
+    if rows.size:
+        # 同一几何参数的工况共用一次排管（管位排序结果在 tube_layout 中缓存）
+        keys = np.stack([pattern[rows], do[rows], passes[rows], pitch[rows]], axis=1)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        for g, (p, d, n, t) in enumerate(groups):
+            sel = rows[inverse.ravel() == g]
+            diameter = min_tube_sheet_diameter(d, count[sel].astype(np.intp), int(n), t,
+                                               _LAYOUT_PATTERNS[int(p)])
+            sheet[sel] = np.ceil(diameter)
+    return sheet
+
+
+def _compute(c):
+    """无校验的批量计算（输入须已通过 validate_batch）"""
+    do = c['tube_diameter']
+    wall = c['tube_wall_thickness']
+    passes = c['passes']
+    t_in = c['cooling_water_in_temp']
+    cp = c['cp_water']
+    rho = c['rho_water']
+    mode0 = c['calculation_mode'] == 0
+    r = {}
+
+    # 蒸汽热负荷
+    t_sat, h_water, duty = vec.steam_heat_load(
+        c['steam_pressure'], c['steam_enthalpy'], c['steam_mass_flow'] / 3600)
+    r['saturation_temp'], r['water_enthalpy'], r['DUTY'] = t_sat, h_water, duty
+
+    # 冷却水：模式0输入温升，模式1输入水量
+    rise = c['cooling_water_temp_rise']
+    m_kg_s = np.where(mode0, duty / (cp * rise), c['water_flow_input'] * rho / 3600)
+    m3_h = np.where(mode0, m_kg_s / rho * 3600, c['water_flow_input'])
+    rise = np.where(mode0, rise, duty / (m_kg_s * cp))
+    t_out = t_in + rise
+    r['water_flow_kg_s'], r['water_flow_m3_h'] = m_kg_s, m3_h
+    r['cooling_water_temp_rise'], r['cooling_water_out_temp'] = rise, t_out
+
+    # 修正系数与传热系数
+    mat = vec.material_coeff(vec.material_index(c['material']), wall / 25.4)
+    fw = vec.water_correction_factor(t_in)
+    u_btu = vec.uncorrected_u(do, c['velocity'])
+    u_metric = u_btu * vec.U_BTU_TO_METRIC
+    r['material_coefficient'], r['water_correction_factor'] = mat, fw
+    r['u_btu'], r['u_metric'] = u_btu, u_metric
+
+    lmtd_value = vec.lmtd(t_sat, t_in, t_out)
+    r['LMTD'] = lmtd_value
+
+    fouling = c['fouling_factor']
+    clean = np.where(fouling > 0,
+                     vec.fouling_to_clean(fouling, do, wall, u_metric * fw * mat),
+                     c['cleanliness_factor'])
+    r['clean_factor_corrected'] = clean
+    area = vec.heat_transfer_area(duty, lmtd_value, u_metric, fw, mat, clean)
+    r['surface_area'] = area
+
+    # 结构：模式0由流速求管数、管长；模式1给定管数管长；模式2给定面积与管数
+    struct = c['structure_mode']
+    margin = np.where(np.isnan(fouling), 1.05, 1.0)
+    design0 = np.ceil(area * margin / 50) * 50
+    count0 = vec.tube_count_from_flow(m3_h, c['velocity'], do, wall, passes)
+    length0 = vec.tube_length_from_area(design0, count0, do)
+
+    count = np.where(struct == 0, count0, c['input_tube_count'])
+    length_given = c['input_tube_length']
+    design_given = c['input_design_surface']
+    design = np.select(
+        [struct == 0, struct == 1],
+        [design0, np.pi * (do / 1000) * (length_given / 1000) * count],
+        design_given)
+    length = np.select(
+        [struct == 0, struct == 1],
+        [length0, length_given],
+        design_given / (np.pi * (do / 1000) * count) * 1000)
+    velocity = np.where(struct == 0, c['velocity'],
+                        vec.velocity_from_tube_count(m3_h, count, do, wall, passes))
+    r['design_surface_area'], r['tube_count'], r['tube_length'] = design, count, length
+    r['velocity'] = velocity
+
+    # 管板与接管
+    # 管间距不大于外径时只有管板外径与长径比为 NaN（同 calculate_all()）
+    pitch = c['tube_pitch']
+    sheet = np.where(pitch > do, np.ceil(np.sqrt(count / 0.6) * (1 + 0.05 * passes) * pitch), np.nan)
+    if c.get('tube_layout_pattern') is not None:
+        sheet = _layout_sheet_diameter(sheet, c['tube_layout_pattern'], do, count, passes, pitch)
+    r['tube_sheet_diameter'] = sheet
+    r['condensate_outlet_inner_diameter'] = vec.pipe_inner_diameter(c['steam_mass_flow'] / 3600, 1)
+    r['cooling_water_nozzle_diameter'] = vec.pipe_inner_diameter(
+        m_kg_s / c['cooling_water_nozzle_count'], 2.5, rho)
+    r['tube_length_diameter_ratio'] = vec.apply_precision(length / sheet, 2)
+
+    # 水阻与端差
+    temp_c = (t_in + t_out) / 2
+    r['total_pressure_drop'] = 1.2 * 0.001 * vec.hei_water_resistance(
+        do - 2 * wall, velocity, length, passes, temp_c)
+    r['terminal_temp_diff'] = t_sat - t_out
+    return r
+
+
+def calculate_batch(columns, validation=None, backend='numpy', chunk_size=None,
+                    progress=None, cancel=None):
+    """
+    批量执行全部计算
+
+    参数:
+        columns: 列式输入（字段名同 InputData，见 columns 模块）
+        validation: 已有的 ValidationResult；为 None 时先整批校验
+        backend: 'numpy'（逐阶段整列计算）或 'fused'（Numba 融合内核，见 fused 模块，
+                 未安装 Numba 时退回 numpy）
+        chunk_size: 分块工况数，None 为整批一次计算（给定 progress 或 cancel 时
+                    默认 DEFAULT_CHUNK_SIZE）；分块不影响结果
+        progress: 进度回调 callback(ProgressInfo)，每块之后按间隔调用（见 progress 模块）
+        cancel: CancelToken，块之间检查，取消时抛出 CancelledError
+    返回:
+        dict: 计算结果字段 -> 数组，未通过校验的工况为 NaN；
+              另含 'error_code'（错误位掩码，只有管间距或排管方式错误位的工况
+              照常计算，仅管板外径与长径比为 NaN）
+    """
+    if chunk_size is not None or progress is not None or cancel is not None:
+        return _calculate_chunked(columns, validation, backend, chunk_size or DEFAULT_CHUNK_SIZE,
+                                  progress, cancel)
+    if backend == 'fused':
+        from .fused import calculate_batch_fused
+        return calculate_batch_fused(columns, validation)
+    if backend != 'numpy':
+        raise ValueError(f"无效的计算后端：{backend}")
+
+    c = as_columns(columns)
+    if validation is None:
+        validation = validate_batch(c)
+    n = validation.codes.size
+    rows = np.flatnonzero(validation.valid)
+
+    with np.errstate(all='ignore'):
+        if rows.size == n:
+            computed = _compute(c)
+        else:
+            computed = _compute(take(c, rows))
+
+    results = {}
+    for name in OUTPUT_FIELDS:
+        if rows.size == n:
+            results[name] = np.asarray(computed[name], dtype=float)
+        else:
+            col = np.full(n, np.nan)
+            col[rows] = computed[name]
+            results[name] = col
+    results['error_code'] = validation.codes
+    return results
+
+
+def _calculate_chunked(columns, validation, backend, chunk_size, progress, cancel):
+    """逐块计算并报告进度"""
+    if chunk_size < 1:
+        raise ValueError("分块大小必须≥1")
+    c = columns if isinstance(columns.get('material'), np.ndarray) else as_columns(columns)
+    if validation is None:
+        validation = validate_batch(c)
+    codes = validation.codes
+    n = codes.size
+    results = {name: np.empty(n) for name in OUTPUT_FIELDS}
+    results['error_code'] = codes
+    tracker = Progress(n, progress, cancel)
+    tracker.check()
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        part = calculate_batch({k: v[start:stop] for k, v in c.items()},
+                               ValidationResult(codes[start:stop]), backend)
+        for name in OUTPUT_FIELDS:
+            results[name][start:stop] = part[name]
+        tracker.update(stop - start, np.count_nonzero(codes[start:stop] & FATAL_MASK))
+    tracker.finish()
+    return results
@@ -18,6 +18,7 @@ from .tube_structure import (
 )
 from .tube_sheet import calculate_tube_sheet_diameter
 from .pressure_drop import calculate_hei_water_resistance
+from . import precision
 
 
 class CondenserCalculator:
@@ -240,19 +241,31 @@ class CondenserCalculator:
             area_per_tube = math.pi * (di_m / 2) ** 2
             flow_m3_s = self.data.water_flow_m3_h / 3600
             calculated_velocity = (flow_m3_s * self.data.passes) / (area_per_tube * self.data.tube_count)
-            self.data.velocity = round(calculated_velocity, 3)
+            self.data.velocity = round(calculated_velocity, 3) if precision.compat else calculated_velocity
 
     def _calc_tube_sheet_diameter(self):
         """计算管板外径"""
         if None in (self.data.tube_count, self.data.passes, self.data.tube_pitch, self.data.tube_diameter):
             return
         try:
-            self.data.tube_sheet_diameter = math.ceil(calculate_tube_sheet_diameter(
-                self.data.tube_diameter,
-                int(self.data.tube_count),
-                int(self.data.passes),
-                self.data.tube_pitch
-            ))
+            if self.data.tube_layout_pattern:
+                # 按需导入：排管引擎依赖numpy
+                from .tube_layout import min_tube_sheet_diameter
+                diameter = min_tube_sheet_diameter(
+                    self.data.tube_diameter,
+                    int(self.data.tube_count),
+                    int(self.data.passes),
+                    self.data.tube_pitch,
+                    self.data.tube_layout_pattern
+                )
+            else:
+                diameter = calculate_tube_sheet_diameter(
+                    self.data.tube_diameter,
+                    int(self.data.tube_count),
+                    int(self.data.passes),
+                    self.data.tube_pitch
+                )
+            self.data.tube_sheet_diameter = math.ceil(diameter)
         except Exception as e:
             print(f"计算管板外径失败：{e}")
             self.data.tube_sheet_diameter = None
@@ -272,7 +285,8 @@ class CondenserCalculator:
         
         # 长径比
         if self.data.tube_length and self.data.tube_sheet_diameter:
-            self.data.tube_length_diameter_ratio = round(self.data.tube_length / self.data.tube_sheet_diameter, 2)
+            ratio = self.data.tube_length / self.data.tube_sheet_diameter
+            self.data.tube_length_diameter_ratio = round(ratio, 2) if precision.compat else ratio
 
     def _calc_total_pressure_drop(self):
         """计算总水阻"""
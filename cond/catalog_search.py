@@ -0,0 +1,216 @@
+"""
+标准管材目录分支定界搜索
+在标准外径（12种）、BWG 壁厚（9种）、材料（18种）、流程数 {1,2,4}
+与流速网格上精确求出目标值最小的前 K 个方案，不必逐一计算全部组合。
+
+利用的单调性：
+- 传热系数 U 随流速单调不减，换热面积随 U 单调递减，因此同一
+  （材料, 壁厚, 外径）分支内设计面积随流速单调不增，分支在最高流速下
+  的面积即为该分支的下界；管重下界由面积下界与管数上界得出；
+- 水阻随 v^1.75 上升，由面积下界与管数上界可得每个流速的水阻下界，
+  下界已超限的流速无需计算，分支下界也随之取在可能满足水阻的最高流速处。
+分支按下界从小到大处理，下界不小于当前第 K 名时其余分支全部剪除。
+"""
+import heapq
+import itertools
+import math
+import time
+
+import numpy as np
+
+from . import vectorized as vec
+from .heat_transfer_coefficient import _DIAMETERS
+from .material_coefficient import _THICKNESS, _VALID_MATERIALS
+from .optimizer import DesignEvaluator, OBJECTIVES, PASS_OPTIONS, VELOCITY_RANGE, _DENSITY_TABLE, _violation
+from .progress import Progress
+
+
+class CatalogSearchResult:
+    """目录搜索结果"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
+def velocity_grid(step=0.05):
+    """流速网格（从高到低，保留3位小数）"""
+    v_lo, v_hi = VELOCITY_RANGE
+    n = int(math.floor((v_hi - v_lo) / step + 1e-9)) + 1
+    return np.round(v_hi - step * np.arange(n), 3)
+
+
+def search_catalog(data, k=10, objective='design_surface_area', ld_range=(2.0, 3.0),
+                   max_pressure_drop=None, min_terminal_diff=None, materials=None,
+                   diameters=None, gauges=None, passes=PASS_OPTIONS, velocity_step=0.05, block=8,
+                   progress=None, cancel=None):
+    """
+    分支定界搜索标准目录中的最优 K 个方案
+
+    每个（材料, 壁厚, 外径, 流程数）组合只保留其最优流速，返回的 K 个方案
+    互不相同；与穷举全部组合的结果一致（目标值相同的方案任取其一）。
+
+    参数:
+        data: 工况 InputData
+        k: 返回方案数
+        objective: 'design_surface_area' 或 'tube_mass'
+        ld_range: 长径比允许范围
+        max_pressure_drop: 水阻上限 (kPa)
+        min_terminal_diff: 端差下限 (°C)
+        materials: 候选材料名称，默认全部
+        diameters: 候选外径 (mm)，默认全部标准管径
+        gauges: 候选壁厚 (英寸)，默认全部 BWG 壁厚
+        passes: 候选流程数
+        velocity_step: 流速网格步长 (m/s)
+        block: 分支内每次整批计算的流速点数
+        progress: 进度回调 callback(ProgressInfo)，以分支为单位，剪除的分支计为已处理
+        cancel: CancelToken，每个分支之间检查，取消时抛出 CancelledError
+    返回:
+        CatalogSearchResult: designs（按目标值排序的方案列表）, evaluations,
+                             exhaustive_evaluations, branches, pruned_branches, elapsed
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"无效的优化目标：{objective}")
+    start = time.perf_counter()
+    ev = DesignEvaluator(data)
+    velocities = velocity_grid(velocity_step)
+    passes = sorted(passes)
+
+    mat_idx = [_VALID_MATERIALS.index(m) for m in (materials or _VALID_MATERIALS)]
+    diameters = list(_DIAMETERS if diameters is None else diameters)
+    gauge_idx = list(range(len(_THICKNESS))) if gauges is None else [_THICKNESS.index(g) for g in gauges]
+    branches = np.array([(m, g, d) for m in mat_idx for g in gauge_idx for d in diameters])
+    exhaustive = len(branches) * len(passes) * velocities.size
+    tracker = Progress(len(branches), progress, cancel)
+    tracker.check()
+
+    def result(designs, pruned):
+        tracker.update(tracker.total - tracker.processed)
+        tracker.finish()
+        return CatalogSearchResult(
+            designs=designs, evaluations=ev.evaluations, exhaustive_evaluations=exhaustive,
+            branches=len(branches), pruned_branches=pruned, elapsed=time.perf_counter() - start)
+
+    if min_terminal_diff is not None and ev.terminal_temp_diff < min_terminal_diff:
+        return result([], len(branches))
+
+    m_b = branches[:, 0].astype(np.intp)
+    g_b = branches[:, 1].astype(np.intp)
+    do_b = branches[:, 2]
+    wall_b = np.asarray(_THICKNESS)[g_b] * 25.4
+    do_m = do_b / 1000
+    di_m = do_m - 2 * wall_b / 1000
+    a_tube = math.pi * di_m ** 2 / 4
+    flow_m3_s = ev.water_flow_m3_h / 3600
+
+    # 面积下界：最高流速下的设计面积（面积随流速单调不增）
+    area_lb = ev.evaluate(do_b, g_b, passes[0], velocities[0], m_b)['design_surface_area']
+
+    # 水阻下界：面积取下界、管数取上界时的最短管长，[分支, 流速]
+    rt = float(vec.temperature_factor(ev.temp_c))
+    v = velocities[None, :]
+    allowed = {}
+    for p in passes:
+        count_ub = flow_m3_s * p / (v * a_tube[:, None]) + 1
+        length_lb = np.floor(area_lb[:, None] / (math.pi * do_m[:, None] * count_ub) * 1000) / 1000
+        dp_lb = 1.2 * 0.001 * (length_lb * p * 28.72 * v ** 1.75 / di_m[:, None] ** 1.25 * rt
+                               + 0.1 * v ** 2 * p)
+        allowed[p] = np.ones(dp_lb.shape, dtype=bool) if max_pressure_drop is None \
+            else dp_lb <= max_pressure_drop + 1e-6
+
+    # 分支下界：任一流程数下水阻可能满足的最高流速处的设计面积
+    any_allowed = np.logical_or.reduce([allowed[p] for p in passes])
+    has_velocity = any_allowed.any(axis=1)
+    v_star = velocities[np.argmax(any_allowed, axis=1)]
+    design_lb = ev.evaluate(do_b, g_b, passes[0], v_star, m_b)['design_surface_area']
+    design_lb = np.where(has_velocity, design_lb, np.inf)
+
+    if objective == 'design_surface_area':
+        def objective_lb(b, design):
+            return design
+    else:
+        # 管重 = 截面 × 密度 × 管长 × 管数，管长向下取整每根至多少 1 mm
+        mass_per_m = math.pi / 4 * (do_m ** 2 - di_m ** 2) * _DENSITY_TABLE[m_b]
+        count_ub = flow_m3_s * passes[-1] / (velocities[-1] * a_tube) + 1
+
+        def objective_lb(b, design):
+            return mass_per_m[b] * np.maximum(design / (math.pi * do_m[b]) - count_ub[b] * 0.001, 0)
+    branch_lb = objective_lb(slice(None), design_lb)
+
+    heap = []           # (-目标值, 序号, 方案)，保留最优 K 个
+    seq = itertools.count()
+    threshold = np.inf  # 当前第 K 名的目标值
+    order = np.argsort(branch_lb, kind='stable')
+    visited = 0
+    for b in order:
+        if not branch_lb[b] < threshold:
+            break
+        visited += 1
+        for p in passes:
+            vs = velocities[allowed[p][b]]
+            combo_best = None
+            for s in range(0, vs.size, block):
+                chunk = vs[s:s + block]
+                r = ev.evaluate(do_b[b], g_b[b], p, chunk, m_b[b])
+                obj = r[objective]
+                feasible = _violation(r, ld_range, max_pressure_drop) == 0
+                if feasible.any():
+                    i = int(np.argmin(np.where(feasible, obj, np.inf)))
+                    if combo_best is None or obj[i] < combo_best[objective]:
+                        combo_best = {name: float(np.broadcast_to(values, obj.shape)[i])
+                                      for name, values in r.items()}
+                # 更低流速的设计面积不会更小
+                remaining_lb = objective_lb(b, r['design_surface_area'][-1])
+                cutoff = min(threshold, np.inf if combo_best is None else combo_best[objective])
+                if remaining_lb >= cutoff:
+                    break
+            if combo_best is None or not combo_best[objective] < threshold:
+                continue
+            combo_best['material'] = _VALID_MATERIALS[m_b[b]]
+            combo_best['passes'] = int(p)
+            combo_best['tube_count'] = int(combo_best['tube_count'])
+            item = (-combo_best[objective], next(seq), combo_best)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+            if len(heap) == k:
+                threshold = -heap[0][0]
+        tracker.update(1)
+
+    designs = [item[2] for item in sorted(heap, key=lambda x: (-x[0], x[1]))]
+    return result(designs, len(branches) - visited)
+
+
+if __name__ == "__main__":
+    from .data_model import InputData
+
+    d = InputData.from_dict(dict(
+        steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+        tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+        material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+        cooling_water_in_temp=25, cooling_water_temp_rise=8,
+        cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85))
+
+    for objective in OBJECTIVES:
+        res = search_catalog(d, k=5, objective=objective, max_pressure_drop=80)
+        print(f"[{objective}] 评估 {res.evaluations} / {res.exhaustive_evaluations} 次，"
+              f"剪除分支 {res.pruned_branches} / {res.branches}，用时 {res.elapsed * 1000:.0f} ms")
+        for x in res.designs:
+            print(f"  {x['material']:<26} Ø{x['tube_diameter']:<7} 壁厚 {x['tube_wall_thickness']:.3f} "
+                  f"{x['passes']}流程 v={x['velocity']:.2f}  面积 {x['design_surface_area']:.0f} m² "
+                  f"管重 {x['tube_mass'] / 1000:.2f} t  水阻 {x['total_pressure_drop']:.1f} kPa")
+
+        # 穷举校核
+        ev = DesignEvaluator(d)
+        grid = np.array([(m, g, o, p, v) for m in range(len(_VALID_MATERIALS))
+                         for g in range(len(_THICKNESS)) for o in _DIAMETERS
+                         for p in PASS_OPTIONS for v in velocity_grid()])
+        r = ev.evaluate(grid[:, 2], grid[:, 1].astype(int), grid[:, 3], grid[:, 4], grid[:, 0].astype(int))
+        obj = np.where(_violation(r, (2.0, 3.0), 80) == 0, r[objective], np.inf)
+        combo = obj.reshape(-1, velocity_grid().size).min(axis=1)
+        expected = np.sort(combo)[:5]
+        print("  穷举一致：", np.allclose(expected, [x[objective] for x in res.designs]))
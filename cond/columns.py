@@ -0,0 +1,127 @@
+"""
+批量工况的列式存储
+字段名与 InputData 属性一致：每个字段为一个长度为工况数的数组，
+数值字段缺失值(None)统一转为 NaN，材料与排管方式为字符串数组（缺失为空串）。
+"""
+import numpy as np
+
+from .data_model import InputData
+
+# 数值输入字段
+INPUT_FIELDS = (
+    'tube_diameter', 'steam_pressure', 'steam_mass_flow', 'steam_enthalpy',
+    'tube_wall_thickness', 'tube_pitch', 'cooling_water_in_temp', 'cooling_water_temp_rise',
+    'cp_water', 'rho_water', 'velocity', 'cleanliness_factor', 'fouling_factor', 'passes',
+    'cooling_water_nozzle_count', 'water_flow_input', 'input_tube_count', 'input_tube_length',
+    'input_design_surface',
+)
+# 模式字段（整数）
+MODE_FIELDS = ('calculation_mode', 'structure_mode')
+# 字符串字段（排管方式为空串时按估算公式计算管板外径）
+STRING_FIELDS = ('material', 'tube_layout_pattern')
+# 取整数值的字段（还原为 InputData 时转为 int）
+INT_FIELDS = ('passes', 'cooling_water_nozzle_count', 'input_tube_count', 'tube_count')
+# 计算结果字段
+OUTPUT_FIELDS = (
+    'saturation_temp', 'water_enthalpy', 'DUTY', 'LMTD', 'u_metric', 'u_btu',
+    'cooling_water_out_temp', 'cooling_water_temp_rise', 'water_correction_factor',
+    'material_coefficient', 'clean_factor_corrected', 'water_flow_kg_s', 'water_flow_m3_h',
+    'surface_area', 'design_surface_area', 'velocity', 'tube_length', 'tube_count',
+    'tube_sheet_diameter', 'condensate_outlet_inner_diameter', 'cooling_water_nozzle_diameter',
+    'tube_length_diameter_ratio', 'total_pressure_drop', 'terminal_temp_diff',
+)
+
+
+def _float_column(values, n):
+    if values is None:
+        return np.full(n, np.nan)
+    arr = np.asarray(values)
+    if arr.dtype == object:
+        arr = np.array([np.nan if v is None else v for v in arr.ravel()], dtype=float).reshape(arr.shape)
+    arr = arr.astype(float)
+    return np.broadcast_to(arr, (n,)).copy() if arr.ndim == 0 else arr
+
+
+def _length(columns):
+    for v in columns.values():
+        if v is not None and np.ndim(v) > 0:
+            return len(v)
+    return 1
+
+
+def as_columns(columns):
+    """
+    规范化列式输入
+
+    参数:
+        columns: 字段名 -> 序列/数组/标量（标量广播到所有工况）
+    返回:
+        dict: 数值字段为 float 数组，模式字段为 int 数组，
+              material、tube_layout_pattern 为字符串数组
+    """
+    n = _length(columns)
+    cols = {}
+    for name in INPUT_FIELDS:
+        cols[name] = _float_column(columns.get(name), n)
+    for name in MODE_FIELDS:
+        values = columns.get(name, 0)
+        cols[name] = np.broadcast_to(np.asarray(values, dtype=np.intp), (n,)).copy()
+    for name in STRING_FIELDS:
+        values = columns.get(name)
+        if values is None or isinstance(values, str):
+            values = [values or ''] * n
+        cols[name] = np.array(['' if v is None else str(v) for v in values], dtype=object)
+    return cols
+
+
+def columns_from_inputs(inputs):
+    """
+    InputData 列表 -> 列式输入
+
+    参数:
+        inputs: InputData 列表
+    返回:
+        dict: 规范化后的列式输入
+    """
+    raw = {name: [getattr(d, name) for d in inputs] for name in INPUT_FIELDS + MODE_FIELDS + STRING_FIELDS}
+    return as_columns(raw)
+
+
+def take(columns, rows):
+    """按行下标抽取子批次"""
+    return {k: v[rows] for k, v in columns.items()}
+
+
+def inputs_from_columns(columns, results=None):
+    """
+    列式数据 -> InputData 列表（NaN 还原为 None）
+
+    参数:
+        columns: 列式输入
+        results: 可选的列式计算结果，一并写入
+    返回:
+        list[InputData]
+    """
+    merged = dict(columns)
+    if results:
+        merged.update(results)
+    n = len(merged['material'])
+    items = []
+    for i in range(n):
+        data = InputData()
+        for name, values in merged.items():
+            if not hasattr(data, name):
+                continue
+            v = values[i]
+            if isinstance(v, (float, np.floating)):
+                if np.isnan(v):
+                    v = None
+                else:
+                    v = int(v) if name in INT_FIELDS else float(v)
+            elif isinstance(v, np.integer):
+                v = int(v)
+            elif name == 'tube_layout_pattern' and v == '':
+                v = None
+            setattr(data, name, v)
+        items.append(data)
+    return items
@@ -0,0 +1,372 @@
+"""
+凝汽器-冷却塔耦合平衡计算
+闭式循环中冷却水进口温度不是输入：冷却塔按凝汽器排热量与环境湿球温度决定
+出塔（即凝汽器进口）水温，进口水温又决定凝汽器背压与排热量。本模块：
+- 凝汽器按固定几何校核（管数、管长、材料、清洁系数取自设计工况）：给定进口水温，
+  传热系数与引擎相同（HEI 未修正 U × 水温修正 × 材料修正 × 清洁系数），
+  由 ε-NTU 关系（与 LMTD 式等价）求饱和温度；给定蒸汽流量时排热量随饱和水焓
+  变化，饱和温度满足一个二次方程，直接求解；
+- 冷却塔为 Merkel 模型：塔特性 KaV/L = C·(L/G)^-n，Merkel 积分用 Chebyshev
+  四点法，进塔空气焓取湿球温度下的饱和空气焓；
+- 每个环境工况只剩进口水温一个未知量（背压由它直接算出），对
+  "塔所需 Merkel 数 − 塔特性" 残差做带区间保护的割线迭代，整列同时迭代，
+  逐元素判断收敛，一般 10 次残差计算以内收敛；全年 8760 小时一次求解为毫秒级。
+
+背压按 IAPWS-IF97 饱和压力方程由饱和温度求得：引擎中简化的饱和温度关联式
+在凝汽器常见的温度范围内没有反函数。
+"""
+import numpy as np
+
+from . import vectorized as vec
+from .material_coefficient import material_coeff
+
+# IAPWS-IF97 第4区（饱和线）系数
+_IF97_N = (0.11670521452767e4, -0.72421316703206e6, -0.17073846940092e2, 0.12020824702470e5,
+           -0.32325550322333e7, 0.14915108613530e2, -0.48232657361591e4, 0.40511340542057e6,
+           -0.23855557567849, 0.65017534844798e3)
+
+CP_AIR = 1.006          # 干空气比热 kJ/(kg·K)
+CP_VAPOR = 1.86         # 水蒸气比热 kJ/(kg·K)
+H_FG0 = 2501.0          # 0 °C 汽化潜热 kJ/kg
+ATMOSPHERE = 101.325    # 标准大气压 kPa
+
+# Chebyshev 四点积分的取点位置（占冷却幅高的比例）
+_CHEBYSHEV = (0.1, 0.4, 0.6, 0.9)
+
+# 水温修正系数表覆盖的进口水温范围 (°C)
+_T_MIN = (vec._FW_TEMPS[0] - 32) * 5 / 9
+_T_MAX = (vec._FW_TEMPS[-1] - 32) * 5 / 9
+
+
+def saturation_pressure(t_celsius):
+    """
+    饱和压力 (MPa)（IAPWS-IF97 第4区，0~373.946 °C）
+
+    参数:
+        t_celsius: 温度 (°C)，标量或数组
+    返回:
+        ndarray: 饱和压力 (MPa)
+    """
+    n = _IF97_N
+    t = np.asarray(t_celsius, dtype=float) + 273.15
+    theta = t + n[8] / (t - n[9])
+    a = theta ** 2 + n[0] * theta + n[1]
+    b = n[2] * theta ** 2 + n[3] * theta + n[4]
+    c = n[5] * theta ** 2 + n[6] * theta + n[7]
+    return (2 * c / (-b + np.sqrt(b ** 2 - 4 * a * c))) ** 4
+
+
+def saturated_air_enthalpy(t_celsius, pressure_kpa=ATMOSPHERE):
+    """
+    饱和湿空气焓 (kJ/kg 干空气)
+
+    参数:
+        t_celsius: 温度 (°C)
+        pressure_kpa: 大气压 (kPa)
+    """
+    t = np.asarray(t_celsius, dtype=float)
+    p_ws = saturation_pressure(t) * 1000
+    humidity = 0.622 * p_ws / (pressure_kpa - p_ws)
+    return CP_AIR * t + humidity * (H_FG0 + CP_VAPOR * t)
+
+
+def merkel_number(cold_water, hot_water, wet_bulb, lg_ratio, cp_water=4.179, pressure_kpa=ATMOSPHERE):
+    """
+    冷却所需的 Merkel 数 KaV/L（Chebyshev 四点积分）
+
+    参数:
+        cold_water: 出塔水温 (°C)
+        hot_water: 进塔水温 (°C)
+        wet_bulb: 湿球温度 (°C)
+        lg_ratio: 水气比 L/G
+        cp_water: 水比热 kJ/(kg·K)
+        pressure_kpa: 大气压 (kPa)
+    返回:
+        ndarray: KaV/L；空气焓在塔内任一点达到饱和（冷却不可行）时为 inf
+    """
+    t_c = np.asarray(cold_water, dtype=float)
+    span = np.asarray(hot_water, dtype=float) - t_c
+    h_in = saturated_air_enthalpy(wet_bulb, pressure_kpa)
+    total = 0.0
+    feasible = True
+    for fraction in _CHEBYSHEV:
+        t = t_c + fraction * span
+        h_air = h_in + lg_ratio * cp_water * fraction * span
+        driving = saturated_air_enthalpy(t, pressure_kpa) - h_air
+        feasible = feasible & (driving > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            total = total + 1 / driving
+    return np.where(feasible, cp_water * span / 4 * total, np.inf)
+
+
+def rated_saturation_temp(t_in, u_base, area, mcp, duty=None, steam_flow=None, steam_enthalpy=None):
+    """
+    固定几何凝汽器：给定进口水温求饱和温度与排热量（各参数可按广播规则为数组）
+
+    参数:
+        t_in: 进口水温 (°C)
+        u_base: 不含水温修正的传热系数 W/(m²·K)（U × 材料修正 × 清洁系数）
+        area: 换热面积 (m²)
+        mcp: 冷却水热容流量 kW/K
+        duty: 排热量 (kW)；为 None 时按 steam_flow、steam_enthalpy 与饱和水焓计算
+        steam_flow: 蒸汽流量 (kg/s)
+        steam_enthalpy: 蒸汽焓 (kJ/kg)
+    返回:
+        tuple: (饱和温度 °C, 排热量 kW)，水温超出水温修正系数表范围为 NaN
+    """
+    t_in = np.asarray(t_in, dtype=float)
+    u = u_base * vec.water_correction_factor(t_in)
+    effectiveness = -np.expm1(-u * area / (mcp * 1000))
+    if duty is not None:
+        t_sat = t_in + duty / (mcp * effectiveness)
+        return t_sat, np.broadcast_to(np.asarray(duty, dtype=float), t_sat.shape)
+    # Q = m·(h - 4.2·Ts - 0.0015·Ts²)，Ts = t_in + Q/(mcp·ε)：关于 Ts 的二次方程
+    k = steam_flow / (mcp * effectiveness)
+    a = 0.0015 * k
+    b = 1 + 4.2 * k
+    c = t_in + k * steam_enthalpy
+    t_sat = 2 * c / (b + np.sqrt(b ** 2 + 4 * a * c))
+    return t_sat, (t_sat - t_in) * mcp * effectiveness
+
+
+class CoolingTower:
+    """Merkel 冷却塔：塔特性 KaV/L = coefficient·(L/G)^-exponent"""
+
+    def __init__(self, water_flow, air_flow, coefficient, exponent=0.6, pressure_kpa=ATMOSPHERE):
+        """
+        参数:
+            water_flow: 设计循环水量 (kg/s)
+            air_flow: 干空气流量 (kg/s)，风机定速时为常数
+            coefficient: 塔特性系数 C
+            exponent: 塔特性指数 n
+            pressure_kpa: 大气压 (kPa)
+        """
+        if water_flow <= 0 or air_flow <= 0:
+            raise ValueError("冷却塔水量与风量必须>0")
+        self.water_flow = float(water_flow)
+        self.air_flow = float(air_flow)
+        self.coefficient = float(coefficient)
+        self.exponent = float(exponent)
+        self.pressure_kpa = pressure_kpa
+
+    @classmethod
+    def from_design(cls, water_flow, wet_bulb, cold_water, hot_water, lg_ratio=1.2, exponent=0.6,
+                    cp_water=4.179, pressure_kpa=ATMOSPHERE):
+        """
+        按设计点标定塔特性系数
+
+        参数:
+            water_flow: 设计循环水量 (kg/s)
+            wet_bulb: 设计湿球温度 (°C)
+            cold_water: 设计出塔水温 (°C)
+            hot_water: 设计进塔水温 (°C)
+            lg_ratio: 设计水气比 L/G
+            exponent: 塔特性指数 n
+        """
+        me = float(merkel_number(cold_water, hot_water, wet_bulb, lg_ratio, cp_water, pressure_kpa))
+        if not np.isfinite(me):
+            raise ValueError("设计点不可行：出塔水温须高于湿球温度且空气未饱和")
+        return cls(water_flow, water_flow / lg_ratio, me * lg_ratio ** exponent, exponent, pressure_kpa)
+
+    def lg_ratio(self, water_flow=None):
+        """水气比 L/G"""
+        return (self.water_flow if water_flow is None else water_flow) / self.air_flow
+
+    def available_merkel(self, water_flow=None):
+        """塔特性给出的 KaV/L"""
+        return self.coefficient * self.lg_ratio(water_flow) ** -self.exponent
+
+
+class CondenserRating:
+    """固定几何的凝汽器校核模型（数组版本）"""
+
+    def __init__(self, design, cleanliness=None, water_flow=None):
+        """
+        参数:
+            design: 已完成 calculate_all() 的设计工况 InputData
+            cleanliness: 运行清洁系数，默认取设计工况的修正清洁系数
+            water_flow: 循环水量 (kg/s)，默认取设计水量
+        """
+        do = float(design.tube_diameter)
+        wall = float(design.tube_wall_thickness)
+        self.cp_water = float(design.cp_water)
+        self.water_flow = float(design.water_flow_kg_s if water_flow is None else water_flow)
+        self.area = np.pi * do / 1000 * float(design.tube_length) / 1000 * int(design.tube_count)
+        di_m = (do - 2 * wall) / 1000
+        flow_area = np.pi * (di_m / 2) ** 2 * int(design.tube_count) / int(design.passes)
+        self.velocity = self.water_flow / float(design.rho_water) / flow_area
+        clean = float(cleanliness if cleanliness is not None else design.clean_factor_corrected)
+        u = float(vec.uncorrected_u(do, self.velocity)) * vec.U_BTU_TO_METRIC
+        if not np.isfinite(u):
+            raise ValueError(f"管内流速 {self.velocity:.3f} m/s 超出传热系数表范围")
+        # 未含水温修正的传热系数 W/(m²·K)
+        self.u_base = u * material_coeff(design.material, wall / 25.4) * clean
+        self.steam_enthalpy = float(design.steam_enthalpy)
+
+    def saturation_temp(self, t_in, duty=None, steam_flow=None):
+        """
+        给定进口水温求饱和温度与排热量
+
+        参数:
+            t_in: 进口水温 (°C)
+            duty: 排热量 (kW)；为 None 时按 steam_flow 与饱和水焓计算
+            steam_flow: 蒸汽流量 (kg/s)
+        返回:
+            tuple: (饱和温度 °C, 排热量 kW)，水温超出水温修正系数表范围为 NaN
+        """
+        return rated_saturation_temp(t_in, self.u_base, self.area, self.water_flow * self.cp_water,
+                                     duty, None if steam_flow is None else np.asarray(steam_flow, dtype=float),
+                                     self.steam_enthalpy)
+
+
+class CoupledResult:
+    """耦合计算结果：各字段为与环境工况同形状的数组"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
+def solve_coupled(condenser, tower, wet_bulb, duty=None, steam_flow=None, pressure_kpa=None,
+                  tol=1e-6, max_iter=50):
+    """
+    求凝汽器-冷却塔平衡点（对全部环境工况同时迭代）
+
+    参数:
+        condenser: CondenserRating
+        tower: CoolingTower
+        wet_bulb: 湿球温度 (°C)，标量或数组
+        duty: 排热量 (kW)，标量或数组；与 steam_flow 二选一
+        steam_flow: 蒸汽流量 (kg/s)，排热量随背压下的饱和水焓变化
+        pressure_kpa: 大气压 (kPa)，标量或数组，默认取冷却塔设定值
+        tol: 进口水温收敛容差 (°C)
+        max_iter: 最大迭代次数
+    返回:
+        CoupledResult: cooling_water_in_temp, cooling_water_out_temp, saturation_temp,
+                       back_pressure (MPa), DUTY (kW), approach, range, iterations, converged
+    """
+    if (duty is None) == (steam_flow is None):
+        raise ValueError("排热量与蒸汽流量须给定其一")
+    pressure = tower.pressure_kpa if pressure_kpa is None else pressure_kpa
+    arrays = np.broadcast_arrays(np.asarray(wet_bulb, dtype=float),
+                                 np.asarray(duty if duty is not None else steam_flow, dtype=float),
+                                 np.asarray(pressure, dtype=float))
+    wb, load, pressure = (a.ravel().copy() for a in arrays)
+    shape = arrays[0].shape
+    lg = tower.lg_ratio(condenser.water_flow)
+    target = tower.available_merkel(condenser.water_flow)
+    mcp = condenser.water_flow * condenser.cp_water
+
+    def residual(t_in, rows):
+        if duty is not None:
+            t_sat, q = condenser.saturation_temp(t_in, duty=load[rows])
+        else:
+            t_sat, q = condenser.saturation_temp(t_in, steam_flow=load[rows])
+        hot = t_in + q / mcp
+        with np.errstate(invalid='ignore', over='ignore'):
+            r = merkel_number(t_in, hot, wb[rows], lg, condenser.cp_water, pressure[rows]) - target
+        # 水温超出修正系数表范围：按所在一侧给出残差符号，使迭代退回表内
+        r = np.where(t_in < _T_MIN, np.inf, np.where(t_in > _T_MAX, -np.inf, r))
+        return r, t_sat, q
+
+    # 初值：近似 5 °C 与 8 °C 的逼近度；区间下限为湿球温度（此处残差为 +inf）
+    n = wb.size
+    lo = np.maximum(wb, _T_MIN)
+    hi = np.full(n, np.nan)
+    x0 = lo + 5.0
+    x1 = x0 + 3.0
+    r0 = residual(x0, slice(None))[0]
+    r1 = residual(x1, slice(None))[0]
+    for x, r in ((x0, r0), (x1, r1)):
+        lo = np.where(r > 0, np.maximum(lo, x), lo)
+        hi = np.where(r <= 0, np.fmin(hi, x), hi)
+    iterations = np.full(n, 2)
+    converged = np.zeros(n, dtype=bool)
+    active = np.flatnonzero(np.isfinite(wb) & np.isfinite(load) & np.isfinite(pressure))
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        a0, a1, b0, b1 = x0[active], x1[active], r0[active], r1[active]
+        lo_a, hi_a = lo[active], hi[active]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = np.where(np.isfinite(b0) & np.isfinite(b1) & (b1 != b0), b1 * (a1 - a0) / (b1 - b0), np.nan)
+        x = a1 - step
+        # 割线步落在区间外（或无法计算）时：有上界取中点，否则向上扩展
+        bad = ~((x > lo_a) & ((x < hi_a) | np.isnan(hi_a)))
+        x = np.where(bad, np.where(np.isnan(hi_a), np.maximum(a1, lo_a) + 5.0, (lo_a + hi_a) / 2), x)
+        r = residual(x, active)[0]
+        lo[active] = np.where(r > 0, np.maximum(lo_a, x), lo_a)
+        hi[active] = np.where(r <= 0, np.fmin(hi_a, x), hi_a)
+        x0[active], r0[active] = a1, b1
+        x1[active], r1[active] = x, r
+        iterations[active] += 1
+        width = np.where(np.isnan(hi[active]), np.inf, hi[active] - lo[active])
+        finished = (np.abs(x - a1) < tol) | (r == 0) | (width < tol)
+        # 收敛到表格边界（残差仍为 ±inf）的工况无解，不计为收敛
+        converged[active[finished & np.isfinite(r)]] = True
+        active = active[~finished]
+
+    t_in = np.where(converged, x1, np.nan)
+    t_sat, q = residual(t_in, slice(None))[1:]
+    t_out = t_in + q / mcp
+    return CoupledResult(
+        cooling_water_in_temp=t_in.reshape(shape),
+        cooling_water_out_temp=t_out.reshape(shape),
+        saturation_temp=t_sat.reshape(shape),
+        back_pressure=saturation_pressure(t_sat).reshape(shape),
+        DUTY=q.reshape(shape),
+        approach=(t_in - wb).reshape(shape),
+        range=(t_out - t_in).reshape(shape),
+        iterations=iterations.reshape(shape),
+        converged=converged.reshape(shape),
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    from .calculator import CondenserCalculator
+    from .data_model import InputData
+
+    design = CondenserCalculator(InputData.from_dict(dict(
+        steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+        tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+        material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+        cooling_water_in_temp=25, cooling_water_temp_rise=8,
+        cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85))).calculate_all()
+    condenser = CondenserRating(design)
+    # 设计点：湿球 20 °C 时出塔 25 °C、进塔 33 °C
+    tower = CoolingTower.from_design(design.water_flow_kg_s, 20.0, 25.0, 33.0)
+
+    one = solve_coupled(condenser, tower, 20.0, duty=design.DUTY)
+    print(f"设计湿球 20 °C：进口水温 {float(one.cooling_water_in_temp):.3f} °C，"
+          f"出口 {float(one.cooling_water_out_temp):.3f} °C，饱和温度 {float(one.saturation_temp):.3f} °C，"
+          f"背压 {float(one.back_pressure) * 1000:.2f} kPa，迭代 {int(one.iterations)} 次")
+
+    # 全年逐时湿球温度与负荷
+    hours = np.arange(8760)
+    rng = np.random.default_rng(0)
+    wet_bulb = 12 + 10 * np.sin(2 * np.pi * (hours / 8760 - 0.3)) + 3 * np.sin(2 * np.pi * hours / 24) \
+        + rng.normal(0, 1.0, 8760)
+    steam_flow = 600000 / 3600 * rng.uniform(0.6, 1.0, 8760)
+    t0 = time.perf_counter()
+    year = solve_coupled(condenser, tower, wet_bulb, steam_flow=steam_flow)
+    elapsed = time.perf_counter() - t0
+    print(f"全年 8760 小时：{elapsed * 1000:.1f} ms，收敛 {int(year.converged.sum())} 小时，"
+          f"迭代次数 中位 {int(np.median(year.iterations))} / 最多 {int(year.iterations.max())}")
+    print(f"背压 {np.nanmin(year.back_pressure) * 1000:.2f} ~ {np.nanmax(year.back_pressure) * 1000:.2f} kPa，"
+          f"进口水温 {np.nanmin(year.cooling_water_in_temp):.1f} ~ {np.nanmax(year.cooling_water_in_temp):.1f} °C")
+
+    # 校核：平衡点上塔特性与所需 Merkel 数一致，凝汽器满足 Q = U·A·LMTD
+    lg = tower.lg_ratio(condenser.water_flow)
+    me = merkel_number(year.cooling_water_in_temp, year.cooling_water_out_temp, wet_bulb, lg)
+    print("塔特性残差最大：", float(np.nanmax(np.abs(me - tower.available_merkel()))))
+    u = condenser.u_base * vec.water_correction_factor(year.cooling_water_in_temp)
+    lmtd = (year.range / np.log((year.saturation_temp - year.cooling_water_in_temp)
+                                / (year.saturation_temp - year.cooling_water_out_temp)))
+    print("凝汽器热平衡相对误差最大：",
+          float(np.nanmax(np.abs(u * condenser.area * lmtd / 1000 - year.DUTY) / year.DUTY)))
@@ -0,0 +1,154 @@
+"""
+全寿命周期费用模块
+把批量计算结果换算为费用（数组版本，可直接作为大规模扫描的目标函数）：
+- 初投资：换热管质量 × 材料单价 × 加工系数 + 面积 × 壳体等单位面积造价；
+- 污垢裕量费用：设计面积中超出洁净所需面积部分对应的初投资；
+- 泵耗：冷却水量 × 水阻 / 泵效率 × 年运行小时 × 电价；
+- 净现值：初投资 + 年运行费用按折现率折算到投运年。
+"""
+import numpy as np
+
+from . import vectorized as vec
+from .material_coefficient import _VALID_MATERIALS
+from .optimizer import tube_mass
+
+# 管材单价 (元/kg)
+MATERIAL_PRICE = {
+    "Cu Fe 194": 75.0,
+    "Arsenical Cu": 72.0,
+    "Admiralty": 65.0,
+    "Al Brass": 62.0,
+    "Al Bronze": 70.0,
+    "Carbon Steel": 8.0,
+    "Cu Ni 90-10": 110.0,
+    "Cu Ni 70-30": 150.0,
+    "SS(UNS S43035)": 30.0,
+    "Titanium Grades 1 &2": 220.0,
+    "SS (UNS S44660)": 55.0,
+    "SS (UNS S44735)": 55.0,
+    "SS TP 304": 25.0,
+    "SS TP 316/317": 40.0,
+    "SS (UNS N08367)": 120.0,
+    "ATI 2003 (UNS S32003)": 45.0,
+    "2205 (UNS S31803, S32205)": 45.0,
+    "2507 (UNS S32750)": 70.0,
+}
+
+# 默认经济参数
+DEFAULT_COST_PARAMETERS = {
+    'tube_fabrication_factor': 1.3,   # 管材加工、安装系数
+    'area_cost': 800.0,               # 壳体、水室、管板等单位面积造价 (元/m²)
+    'pump_efficiency': 0.8,           # 循环水泵效率
+    'operating_hours': 7500.0,        # 年运行小时 (h)
+    'energy_price': 0.4,              # 电价 (元/kWh)
+    'discount_rate': 0.08,            # 折现率
+    'years': 30,                      # 经济寿命 (年)
+}
+
+COST_FIELDS = ('tube_mass', 'tube_cost', 'capital_cost', 'fouling_margin_cost', 'pumping_power',
+               'annual_energy', 'annual_energy_cost', 'npv_cost')
+
+
+def _price_table(prices):
+    table = dict(MATERIAL_PRICE)
+    if prices:
+        table.update(prices)
+    return np.array([table[m] for m in _VALID_MATERIALS], dtype=float)
+
+
+def annuity_factor(discount_rate, years):
+    """等额年值现值系数 Σ 1/(1+r)^t，t = 1..years"""
+    r = np.asarray(discount_rate, dtype=float)
+    n = np.asarray(years, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (1 - (1 + r) ** -n) / r
+    return np.where(r == 0, n, factor)
+
+
+def lifecycle_cost(columns, results, params=None, prices=None):
+    """
+    批量计算全寿命周期费用
+
+    参数:
+        columns: 列式输入（使用 tube_diameter, tube_wall_thickness, material；
+                 material 也可直接给材料下标数组以省去名称查找）
+        results: 批量计算结果（calculate_batch 的返回值）
+        params: 经济参数，覆盖 DEFAULT_COST_PARAMETERS 中的同名项（可为数组）
+        prices: 材料单价 (元/kg)，覆盖 MATERIAL_PRICE 中的同名项
+    返回:
+        dict: tube_mass (kg), tube_cost, capital_cost, fouling_margin_cost (元),
+              pumping_power (kW), annual_energy (kWh), annual_energy_cost, npv_cost (元)
+    """
+    p = dict(DEFAULT_COST_PARAMETERS)
+    if params:
+        unknown = set(params) - set(p)
+        if unknown:
+            raise ValueError(f"未知的经济参数：{', '.join(sorted(unknown))}")
+        p.update(params)
+
+    material = columns['material']
+    if isinstance(material, np.ndarray) and material.dtype.kind == 'i':
+        idx = material
+    else:
+        idx = vec.material_index(material)
+    price = np.where(idx >= 0, _price_table(prices)[np.maximum(idx, 0)], np.nan)
+
+    with np.errstate(invalid='ignore'):
+        mass = tube_mass(columns['tube_diameter'], columns['tube_wall_thickness'],
+                         results['tube_length'], results['tube_count'], idx)
+        tube_cost = mass * price * p['tube_fabrication_factor']
+        design = results['design_surface_area']
+        capital = tube_cost + design * p['area_cost']
+
+        # 洁净管所需面积 = 计算面积 × 清洁系数，其余面积为污垢裕量
+        clean_area = results['surface_area'] * results['clean_factor_corrected']
+        fouling_margin = capital * np.clip(1 - clean_area / design, 0, 1)
+
+        # 水阻 (kPa) × 体积流量 (m³/s) = kW
+        power = results['water_flow_m3_h'] / 3600 * results['total_pressure_drop'] / p['pump_efficiency']
+        energy = power * p['operating_hours']
+        energy_cost = energy * p['energy_price']
+        npv = capital + energy_cost * annuity_factor(p['discount_rate'], p['years'])
+
+    return {
+        'tube_mass': mass,
+        'tube_cost': tube_cost,
+        'capital_cost': capital,
+        'fouling_margin_cost': fouling_margin,
+        'pumping_power': power,
+        'annual_energy': energy,
+        'annual_energy_cost': energy_cost,
+        'npv_cost': npv,
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    from .batch import calculate_batch
+    from .columns import as_columns
+
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    cols = as_columns({
+        'steam_pressure': 0.12, 'steam_mass_flow': 600000, 'steam_enthalpy': 2400,
+        'tube_diameter': rng.choice([19.05, 22.225, 25.4, 28.575, 31.75], n),
+        'tube_wall_thickness': rng.choice([0.508, 0.559, 0.711, 0.889, 1.245], n),
+        'tube_pitch': 40, 'material': np.array(_VALID_MATERIALS, dtype=object)[rng.integers(0, 18, n)],
+        'passes': rng.choice([1, 2, 4], n), 'cooling_water_nozzle_count': 2,
+        'cooling_water_in_temp': 25, 'cooling_water_temp_rise': rng.uniform(6, 12, n),
+        'cp_water': 4.179, 'rho_water': 997, 'velocity': rng.uniform(1.0, 3.5, n),
+        'cleanliness_factor': 0.85,
+    })
+    t0 = time.perf_counter()
+    res = calculate_batch(cols)
+    t1 = time.perf_counter()
+    cost = lifecycle_cost(cols, res)
+    t2 = time.perf_counter()
+    print(f"{n} 个方案：批量计算 {t1 - t0:.2f} s，费用计算 {t2 - t1:.2f} s")
+    best = int(np.nanargmin(cost['npv_cost']))
+    print(f"净现值最低：{cols['material'][best]} Ø{cols['tube_diameter'][best]} "
+          f"壁厚 {cols['tube_wall_thickness'][best]} {int(cols['passes'][best])}流程 "
+          f"v={cols['velocity'][best]:.2f} m/s")
+    for key in COST_FIELDS:
+        print(f"  {key}: {cost[key][best]:,.1f}")
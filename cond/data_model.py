@@ -63,6 +63,9 @@ class InputData:
         self.input_tube_length = None
         self.input_design_surface = None
 
+        # 管板排管方式：None=经验公式估算，'triangular'/'square'=按实际排管计算
+        self.tube_layout_pattern = None
+
     def to_dict(self):
         """转换为字典"""
         return {k: v for k, v in self.__dict__.items()}
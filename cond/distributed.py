@@ -0,0 +1,353 @@
+"""
+分布式参数扫描（协调器 / 工作进程）
+单机放不下的大规模扫描（上亿个点）按块分发到多台机器上的工作进程：
+- 协调器监听 TCP 端口（multiprocessing.connection，authkey 握手认证），
+  把扫描定义发给连上来的工作进程，再按需租出块编号；
+- 租约带超时：工作进程断线时其租约立即收回，超时未交回的块重新分发；
+- 同一块可能被计算多次（超时后原工作进程仍交回结果），只接受第一份，
+  其余计为重复丢弃；
+- 所有结果按扫描点下标写入同一个 SweepStore。
+工作进程之间不通信，只与协调器交换块编号与该块结果，吞吐量随工作进程数
+近似线性增长（受协调器写入结果的带宽限制）。
+
+认证密钥：协调器只监听本机回环地址时可省略，每次运行随机生成
+（Coordinator.authkey，本机工作进程由 start_local_workers 传入）；监听其他地址时
+必须显式提供密钥，并在其他机器上用同一密钥启动工作进程：
+    python -m cond.distributed worker 协调器地址:端口 认证密钥
+"""
+import ipaddress
+import itertools
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+import numpy as np
+
+from . import precision
+from .sweep import Sweep, SweepStore, compute_chunk
+from .validation import FATAL_MASK
+
+# 随机生成的认证密钥长度（字节）
+AUTHKEY_BYTES = 32
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class Coordinator:
+    """扫描协调器：租出块编号、回收超时租约、合并结果"""
+
+    def __init__(self, sweep, store=None, address=('127.0.0.1', 0), authkey=None,
+                 lease_timeout=60.0, backend='numpy'):
+        """
+        参数:
+            sweep: Sweep
+            store: SweepStore，None 为保存全部结果字段的内存存储；
+                   磁盘存储已有检查点时只分发未完成的块
+            address: 监听地址 (主机, 端口)，端口 0 为自动分配
+            authkey: 认证密钥（bytes）；None 时随机生成，仅允许监听本机回环地址
+            lease_timeout: 租约超时 (s)，应明显大于单块计算时间
+            backend: 工作进程的计算后端，须与 store 记录的后端一致
+        """
+        self.sweep = sweep
+        self.store = store if store is not None else SweepStore(sweep, backend=backend)
+        if self.store.backend != backend:
+            raise ValueError(f"结果存储按 backend={self.store.backend} 计算，与指定的 {backend} 不一致")
+        self.lease_timeout = lease_timeout
+        self.backend = backend
+        if authkey is None:
+            if not _is_loopback(address[0]):
+                raise ValueError(f"监听非本机地址 {address[0]} 时必须显式提供认证密钥")
+            authkey = os.urandom(AUTHKEY_BYTES)
+        elif not authkey:
+            raise ValueError("认证密钥不能为空")
+        self.authkey = authkey
+        self._listener = Listener(address, backlog=64, authkey=authkey)
+        self.address = self._listener.address
+        self._lock = threading.Lock()
+        self._queue = deque(self.store.pending())
+        self._leases = {}                       # 块编号 -> (工作进程编号, 到期时间)
+        self._finished = threading.Event()
+        self._closed = threading.Event()
+        self._worker_ids = itertools.count(1)
+        self.stats = {'workers': 0, 'dispatched': 0, 'redispatched': 0, 'duplicates': 0}
+        self._unreported = [0, 0]               # 上次报告进度后新完成的 (点数, 失败数)
+        if self.store.complete:
+            self._finished.set()
+
+    def _expire(self, now):
+        """收回超时租约（调用方持有锁）"""
+        for chunk_id, (_, deadline) in list(self._leases.items()):
+            if deadline < now:
+                del self._leases[chunk_id]
+                self._queue.appendleft(chunk_id)
+                self.stats['redispatched'] += 1
+
+    def _lease(self, worker):
+        with self._lock:
+            if self._closed.is_set():
+                # 已取消或超时：通知工作进程退出
+                return ('done',)
+            self._expire(time.monotonic())
+            while self._queue:
+                chunk_id = self._queue.popleft()
+                if self.store.done[chunk_id]:
+                    continue
+                self._leases[chunk_id] = (worker, time.monotonic() + self.lease_timeout)
+                self.stats['dispatched'] += 1
+                return ('chunk', chunk_id)
+            if self._finished.is_set():
+                return ('done',)
+            return ('wait', min(0.1, self.lease_timeout / 10))
+
+    def _complete(self, worker, chunk_id, results):
+        with self._lock:
+            if self._leases.get(chunk_id, (None,))[0] == worker:
+                del self._leases[chunk_id]
+            if self.store.write(chunk_id, results):
+                codes = results['error_code']
+                self._unreported[0] += len(codes)
+                self._unreported[1] += int(np.count_nonzero(codes & FATAL_MASK))
+            else:
+                self.stats['duplicates'] += 1
+            if self.store.complete:
+                self._finished.set()
+
+    def _release(self, worker):
+        """工作进程断线：立即收回其全部租约"""
+        with self._lock:
+            for chunk_id, (owner, _) in list(self._leases.items()):
+                if owner == worker:
+                    del self._leases[chunk_id]
+                    self._queue.appendleft(chunk_id)
+                    self.stats['redispatched'] += 1
+
+    def _serve_worker(self, conn):
+        worker = next(self._worker_ids)
+        with self._lock:
+            self.stats['workers'] += 1
+        try:
+            # 工作进程按结果存储记录的精度策略计算
+            conn.send(('sweep', self.sweep.to_spec(), self.store.fields, self.backend,
+                       self.store.precision))
+            while True:
+                message = conn.recv()
+                if message[0] == 'lease':
+                    reply = self._lease(worker)
+                    conn.send(reply)
+                    if reply[0] == 'done':
+                        break
+                elif message[0] == 'result':
+                    self._complete(worker, message[1], message[2])
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._release(worker)
+            conn.close()
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                # 监听已关闭，或客户端认证失败
+                continue
+            threading.Thread(target=self._serve_worker, args=(conn,), daemon=True).start()
+
+    def _report(self, tracker):
+        with self._lock:
+            (points, failed), self._unreported = self._unreported, [0, 0]
+        tracker.update(points, failed)
+
+    def serve(self, timeout=None, progress=None, cancel=None):
+        """
+        运行直到全部块完成
+
+        参数:
+            timeout: 最长等待时间 (s)，None 为不限；超时抛出 TimeoutError
+            progress: 进度回调 callback(ProgressInfo)，在协调器线程中调用
+            cancel: CancelToken；取消时停止分发并保存检查点，抛出 CancelledError
+        返回:
+            SweepStore
+        """
+        tracker = self.store.progress(progress, cancel)
+        threading.Thread(target=self._accept, daemon=True).start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while not self._finished.wait(0.2):
+                with self._lock:
+                    self._expire(time.monotonic())
+                self._report(tracker)
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"扫描未在 {timeout} s 内完成，剩余 {len(self.store.pending())} 块")
+        finally:
+            self.close()
+            with self._lock:
+                self.store.flush()
+        self._report(tracker)
+        tracker.finish()
+        return self.store
+
+    def close(self):
+        """停止接受新连接（已连接的工作进程在下次租块时收到完成通知）"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            self._listener.close()
+            # 唤醒阻塞在 accept() 上的监听线程
+            socket.create_connection(self.address, timeout=1).close()
+        except OSError:
+            pass
+
+
+def run_worker(address, authkey, retry=5.0):
+    """
+    工作进程主循环：连接协调器，循环租块、计算、交回结果，直到协调器通知完成
+
+    参数:
+        address: 协调器地址 (主机, 端口)
+        authkey: 认证密钥（与协调器相同）
+        retry: 连接失败时的重试时长 (s)
+    返回:
+        int: 本进程计算的块数
+    """
+    deadline = time.monotonic() + retry
+    while True:
+        try:
+            conn = Client(tuple(address), authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+    computed = 0
+    try:
+        _, spec, fields, backend, mode = conn.recv()
+        sweep = Sweep.from_spec(spec)
+        with precision.precision(mode):
+            while True:
+                conn.send(('lease',))
+                reply = conn.recv()
+                if reply[0] == 'done':
+                    break
+                if reply[0] == 'wait':
+                    time.sleep(reply[1])
+                    continue
+                chunk_id = reply[1]
+                conn.send(('result', chunk_id, compute_chunk(sweep, chunk_id, fields, backend)))
+                computed += 1
+    except (EOFError, OSError):
+        # 协调器已关闭
+        pass
+    finally:
+        conn.close()
+    return computed
+
+
+def start_local_workers(address, count, authkey):
+    """在本机启动 count 个工作进程，返回 Process 列表"""
+    processes = [multiprocessing.Process(target=run_worker, args=(address, authkey), daemon=True)
+                 for _ in range(count)]
+    for p in processes:
+        p.start()
+    return processes
+
+
+def run_distributed(sweep, workers=2, fields=None, path=None, lease_timeout=60.0, backend='numpy',
+                    timeout=None, progress=None, cancel=None):
+    """
+    在本机以协调器 + 多个工作进程执行扫描（多机部署时工作进程另行启动）
+
+    参数:
+        sweep: Sweep
+        workers: 本机工作进程数
+        fields: 保存的结果字段
+        path: 结果目录（None 为内存）
+        lease_timeout: 租约超时 (s)
+        backend: 计算后端
+        timeout: 最长运行时间 (s)
+        progress: 进度回调
+        cancel: CancelToken
+    返回:
+        tuple: (SweepStore, 统计信息 dict)
+    """
+    coordinator = Coordinator(sweep, SweepStore(sweep, fields, path, backend=backend),
+                              lease_timeout=lease_timeout, backend=backend)
+    processes = start_local_workers(coordinator.address, workers, coordinator.authkey)
+    try:
+        store = coordinator.serve(timeout, progress, cancel)
+    finally:
+        # 已连接的工作进程收到完成通知后退出；扫描结束后才启动好的进程直接终止
+        deadline = time.monotonic() + 2.0
+        for p in processes:
+            p.join(max(deadline - time.monotonic(), 0))
+            if p.is_alive():
+                p.terminate()
+    return store, dict(coordinator.stats)
+
+
+def _stalled_worker(address, authkey):
+    """演示用：租到一块后不交回（模拟卡死的节点）"""
+    conn = Client(address, authkey=authkey)
+    conn.recv()
+    conn.send(('lease',))
+    conn.recv()
+    time.sleep(3600)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+        if len(sys.argv) != 4 or not sys.argv[3]:
+            sys.exit("用法：python -m cond.distributed worker 协调器地址:端口 认证密钥")
+        host, port = sys.argv[2].rsplit(':', 1)
+        print(f"完成 {run_worker((host, int(port)), sys.argv[3].encode())} 块")
+        sys.exit(0)
+
+    base = dict(steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+                tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+                material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+                cooling_water_in_temp=25, cooling_water_temp_rise=8,
+                cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85)
+    sweep = Sweep(base, {'cooling_water_in_temp': np.linspace(5, 33, 200),
+                         'velocity': np.linspace(1.0, 3.0, 200),
+                         'tube_diameter': [19.05, 22.225, 25.4, 28.575, 31.75],
+                         'passes': [1, 2, 4]}, chunk_size=20_000)
+    fields = ('design_surface_area', 'total_pressure_drop', 'tube_count')
+
+    t0 = time.perf_counter()
+    from .sweep import run_sweep
+    local = run_sweep(sweep, fields)
+    print(f"单进程：{sweep.size:,} 点 {time.perf_counter() - t0:.2f} s")
+
+    for n in (1, 2, 4):
+        t0 = time.perf_counter()
+        store, stats = run_distributed(sweep, workers=n, fields=fields)
+        same = all(np.array_equal(store.arrays[k], local.arrays[k], equal_nan=True) for k in store.fields)
+        print(f"{n} 个工作进程：{time.perf_counter() - t0:.2f} s，结果一致：{same}，{stats}")
+
+    # 卡死的节点：租约超时后其块重新分发
+    coordinator = Coordinator(sweep, SweepStore(sweep, fields), lease_timeout=1.0)
+    stalled = multiprocessing.Process(target=_stalled_worker, args=(coordinator.address, coordinator.authkey),
+                                      daemon=True)
+    stalled.start()
+    time.sleep(0.5)
+    workers = start_local_workers(coordinator.address, 2, coordinator.authkey)
+    store = coordinator.serve(timeout=120)
+    stalled.terminate()
+    for p in workers:
+        p.join()
+    same = all(np.array_equal(store.arrays[k], local.arrays[k], equal_nan=True) for k in store.fields)
+    print(f"含卡死节点：结果一致：{same}，{coordinator.stats}")
@@ -0,0 +1,174 @@
+"""
+多工况包络选型
+一台凝汽器需同时满足夏季、冬季、部分负荷、单侧停运等多个工况：
+1. 全部工况按结构模式0整批计算，找出面积、管数、水阻的控制工况；
+2. 取包络管数与管长作为选定结构；
+3. 以结构模式1（给定管数、管长）整批校核每个工况。
+
+单侧停运等部分管束退出的工况以在役管比例表示：选型时该工况所需管数与
+面积按比例折算为全部管数，校核时只有在役管参与换热与通水。
+校核时先由选定管数求出各工况的实际流速，再按实际流速重算所需面积，
+因此所需面积与水阻均对应实际运行流速。
+管间距与排管方式错误位只影响管板外径（见 validation 模块），不使选型失败。
+"""
+import numpy as np
+
+from .batch import calculate_batch
+from .columns import columns_from_inputs
+from .validation import ERROR_CODES, FATAL_MASK, SHEET_CODES, ValidationResult
+
+# 全部工况必须一致的结构参数
+_GEOMETRY_FIELDS = ('tube_diameter', 'tube_wall_thickness', 'tube_pitch', 'passes')
+
+
+class EnvelopeResult:
+    """包络选型结果：sizing/verification 为各工况的列式计算结果"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+    @property
+    def feasible(self):
+        """选定结构是否满足全部工况"""
+        return bool(self.passed.all())
+
+
+def _check_geometry(inputs):
+    first = inputs[0]
+    for data in inputs[1:]:
+        for name in _GEOMETRY_FIELDS + ('material',):
+            if getattr(data, name) != getattr(first, name):
+                raise ValueError(f"包络选型要求各工况结构参数一致：{name}")
+
+
+def size_envelope(inputs, max_pressure_drop=None, min_terminal_diff=None, length_step=None,
+                  in_service=None):
+    """
+    多工况包络选型
+
+    参数:
+        inputs: 工况 InputData 列表（管径、壁厚、管间距、流程数、材料须一致）
+        max_pressure_drop: 可选水阻上限 (kPa)
+        min_terminal_diff: 可选最小端差 (°C)
+        length_step: 可选管长圆整步长 (mm)，向上圆整
+        in_service: 可选各工况在役管比例 (0, 1]，如单侧停运为 0.5；默认全部在役
+    返回:
+        EnvelopeResult: tube_count, tube_length, design_surface_area,
+                        governing（控制工况下标）, velocity（各工况实际流速）,
+                        in_service_tubes（各工况在役管数）,
+                        sizing, verification, required_surface_area, area_margin,
+                        passed, failures（各工况不满足的约束名，校验错误同 ERROR_CODES）
+    """
+    if not inputs:
+        raise ValueError("工况列表不能为空")
+    _check_geometry(inputs)
+    fraction = np.ones(len(inputs)) if in_service is None else np.asarray(in_service, dtype=float)
+    if fraction.shape != (len(inputs),):
+        raise ValueError("在役管比例须与工况一一对应")
+    if not ((fraction > 0) & (fraction <= 1)).all():
+        raise ValueError("在役管比例必须在 (0, 1] 内")
+
+    columns = columns_from_inputs(inputs)
+    columns['structure_mode'][:] = 0
+    sizing = calculate_batch(columns)
+    bad = np.flatnonzero(sizing['error_code'] & FATAL_MASK)
+    if bad.size:
+        reasons = ValidationResult.describe(sizing['error_code'][bad[0]] & FATAL_MASK)
+        raise ValueError(f"工况 {bad[0]} 计算失败：{'；'.join(reasons)}")
+
+    # 各工况所需的全部管数与面积（部分管束退出的工况按在役比例折算）
+    count_needed = np.ceil(sizing['tube_count'] / fraction - 1e-9)
+    area_needed = sizing['design_surface_area'] / fraction
+    governing = {
+        'area': int(np.argmax(area_needed)),
+        'tube_count': int(np.argmax(count_needed)),
+        'pressure_drop': int(np.argmax(sizing['total_pressure_drop'])),
+    }
+
+    # 包络结构：最多管数，管长满足最大设计面积
+    do = columns['tube_diameter'][0]
+    tube_count = int(count_needed.max())
+    design_area = float(area_needed.max())
+    tube_length = design_area / (np.pi * (do / 1000) * tube_count) * 1000
+    if length_step:
+        tube_length = np.ceil(tube_length / length_step) * length_step
+    tube_length = float(tube_length)
+
+    # 结构模式1校核：先求实际流速，再按实际流速重算
+    columns['structure_mode'][:] = 1
+    in_service_tubes = np.floor(tube_count * fraction + 1e-9)
+    columns['input_tube_count'][:] = in_service_tubes
+    columns['input_tube_length'][:] = tube_length
+    first_pass = calculate_batch(columns)
+    columns['velocity'] = first_pass['velocity']
+    verification = calculate_batch(columns)
+
+    margin = np.where(np.isnan(columns['fouling_factor']), 1.05, 1.0)
+    required = verification['surface_area'] * margin
+    installed = verification['design_surface_area']
+    codes = verification['error_code']
+    with np.errstate(invalid='ignore'):
+        checks = {name: (codes & bit) != 0 for name, (bit, _) in ERROR_CODES.items()
+                  if name not in SHEET_CODES}
+        checks['area'] = installed < required
+        if max_pressure_drop is not None:
+            checks['pressure_drop'] = verification['total_pressure_drop'] > max_pressure_drop
+        if min_terminal_diff is not None:
+            checks['terminal_diff'] = verification['terminal_temp_diff'] < min_terminal_diff
+
+    checks = {name: mask for name, mask in checks.items() if mask.any()}
+    failures = [[name for name, mask in checks.items() if mask[i]] for i in range(len(inputs))]
+    passed = np.array([not f for f in failures])
+
+    return EnvelopeResult(
+        tube_count=tube_count,
+        tube_length=tube_length,
+        design_surface_area=float(np.pi * (do / 1000) * (tube_length / 1000) * tube_count),
+        governing=governing,
+        velocity=first_pass['velocity'],
+        in_service_tubes=in_service_tubes.astype(int),
+        sizing=sizing,
+        verification=verification,
+        required_surface_area=required,
+        area_margin=installed / required - 1,
+        passed=passed,
+        failures=failures,
+    )
+
+
+if __name__ == "__main__":
+    from .data_model import InputData
+
+    def condition(name, **kw):
+        d = InputData.from_dict({**dict(
+            steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+            tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+            material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+            cooling_water_in_temp=25, cooling_water_temp_rise=8,
+            cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85), **kw})
+        d.working_condition = name
+        return d
+
+    conditions = [
+        condition("夏季", cooling_water_in_temp=32, cooling_water_temp_rise=7),
+        condition("冬季", cooling_water_in_temp=12, cooling_water_temp_rise=10, velocity=1.8),
+        condition("部分负荷", steam_mass_flow=360000, velocity=1.6),
+        condition("低负荷", steam_mass_flow=300000, velocity=2.4),
+        condition("单侧停运", steam_mass_flow=300000, velocity=2.0),
+    ]
+    # 单侧停运：一半管束（一侧水室）隔离检修，降负荷运行
+    result = size_envelope(conditions, max_pressure_drop=150, length_step=100,
+                           in_service=[1, 1, 1, 1, 0.5])
+    print(f"管数 {result.tube_count}，管长 {result.tube_length:.0f} mm，"
+          f"面积 {result.design_surface_area:.1f} m²")
+    for key, i in result.governing.items():
+        print(f"  {key} 控制工况：{conditions[i].working_condition}")
+    v = result.verification
+    for i, d in enumerate(conditions):
+        print(f"  {d.working_condition}: 在役管 {result.in_service_tubes[i]}，流速 {result.velocity[i]:.3f} m/s，"
+              f"面积裕量 {result.area_margin[i]:.1%}，水阻 {v['total_pressure_drop'][i]:.1f} kPa，"
+              f"{'通过' if result.passed[i] else '不通过 ' + ','.join(result.failures[i])}")
@@ -1,6 +1,7 @@
 """
 污垢系数与清洁系数转换模块
 """
+import math
 
 
 def fouling_to_clean(f, do_mm, t_mm, u_w_m2k):
@@ -31,9 +32,31 @@ def fouling_to_clean(f, do_mm, t_mm, u_w_m2k):
     return 1 / (1 + u_w_m2k * f * ar)
 
 
+def kern_seaton(days, rf_max, time_constant):
+    """
+    Kern–Seaton 渐近污垢模型：沉积速率恒定、剥蚀速率与污垢厚度成正比
+
+    参数:
+        days: 距上次清洗的运行天数
+        rf_max: 渐近污垢系数，m²·K/W
+        time_constant: 时间常数，天
+
+    返回:
+        float: 污垢系数 Rf = Rf∞·(1 - e^(-t/τ))，m²·K/W
+    """
+    if time_constant <= 0:
+        raise ValueError("时间常数必须>0")
+    if days < 0:
+        raise ValueError("运行天数不能为负")
+    return rf_max * -math.expm1(-days / time_constant)
+
+
 if __name__ == "__main__":
     rf = 0.000343
     do = 25.0
     t = 1.0
     u = 4011.55 * 1.0788 * 0.80146175
     print("清洁系数:", round(fouling_to_clean(rf, do, t, u), 4))
+    for days in (30, 90, 180, 365):
+        rf_t = kern_seaton(days, rf, 120)
+        print(f"运行 {days} 天：污垢系数 {rf_t:.6f}，清洁系数 {fouling_to_clean(rf_t, do, t, u):.4f}")
@@ -1,6 +1,8 @@
 """
 传热系数计算模块
 """
+from . import precision
+
 
 # 直径 mm -> 各流速对应 U 值 (Btu/(h·ft²·°F))
 _RAW = {
@@ -69,7 +71,7 @@ def uncorrected_u(diameter_mm, velocity):
         diameter_mm: 换热管外径 (mm)，范围 [15.875, 50.800]
         velocity: 管内水流速 (m/s)，范围 [0.91, 3.66]
     返回:
-        float: 未修正传热系数 U (Btu/(h·ft²·°F))，保留1位小数
+        float: 未修正传热系数 U (Btu/(h·ft²·°F))，按精度策略舍入（compat 为1位小数）
     """
     # 类型校验
     try:
@@ -94,7 +96,7 @@ def uncorrected_u(diameter_mm, velocity):
 
     # 对流速方向插值
     u = _linear_interp(velocity_fps, _VELOCITIES, u_vs_v)
-    return round(u, 1)
+    return round(u, 1) if precision.compat else u
 
 
 if __name__ == "__main__":
@@ -0,0 +1,377 @@
+"""
+运行历史数据清洁系数反算模块
+按块流式读取历史库导出的 CSV/Parquet 运行数据，对机组固定几何
+逐时刻反解换热面积公式得到实际清洁系数，并按块追加写出结果。
+
+内存占用只与块大小有关；材料修正系数、传热系数表、水温修正系数表
+与 CondenserCalculator 使用同一套查表函数。
+已安装 pyarrow 时 CSV 读写使用其流式读写器，否则退回标准库 csv；
+Parquet 读写需要 pyarrow。
+"""
+import csv
+import itertools
+import math
+import os
+
+import numpy as np
+
+from . import vectorized as vec
+from .material_coefficient import material_coeff
+from .validation import ERROR_CODES
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+# 历史数据默认列名
+DEFAULT_COLUMNS = {
+    'timestamp': 'timestamp',
+    'steam_pressure': 'steam_pressure',
+    'cooling_water_in_temp': 'cooling_water_in_temp',
+    'cooling_water_out_temp': 'cooling_water_out_temp',
+    'water_flow_m3_h': 'water_flow_m3_h',
+}
+OUTPUT_COLUMNS = ('timestamp', 'cleanliness_factor', 'DUTY', 'LMTD', 'velocity',
+                  'terminal_temp_diff', 'error_code')
+
+
+class UnitGeometry:
+    """机组固定几何及与运行工况无关的常量"""
+
+    def __init__(self, design):
+        """
+        参数:
+            design: 已完成 calculate_all() 的设计工况 InputData
+                    （使用管径、壁厚、材料、流程数、管数、管长、cp、密度）
+        """
+        self.tube_diameter = float(design.tube_diameter)
+        self.tube_wall_thickness = float(design.tube_wall_thickness)
+        self.passes = int(design.passes)
+        self.tube_count = int(design.tube_count)
+        self.tube_length = float(design.tube_length)
+        self.cp_water = float(design.cp_water)
+        self.rho_water = float(design.rho_water)
+        self.material_coefficient = material_coeff(design.material, self.tube_wall_thickness / 25.4)
+        # 实际布置的换热面积 (m²)
+        self.surface_area = (math.pi * self.tube_diameter / 1000 * self.tube_length / 1000
+                             * self.tube_count)
+
+
+def back_calculate_cleanliness(geometry, steam_pressure, t_in, t_out, water_flow_m3_h):
+    """
+    由运行数据反算清洁系数（数组版本）
+
+    热负荷取水侧 Q = m·cp·(t_out - t_in)，再由
+    A = Q / (LMTD·U·fw·fm·CF) 解出 CF。
+
+    参数:
+        geometry: UnitGeometry
+        steam_pressure: 蒸汽压力 (MPa)
+        t_in: 冷却水进口温度 (°C)
+        t_out: 冷却水出口温度 (°C)
+        water_flow_m3_h: 冷却水量 (m³/h)
+    返回:
+        dict: cleanliness_factor, DUTY, LMTD, velocity, terminal_temp_diff, error_code
+    """
+    g = geometry
+    p = np.asarray(steam_pressure, dtype=float)
+    t_in = np.asarray(t_in, dtype=float)
+    t_out = np.asarray(t_out, dtype=float)
+    flow = np.asarray(water_flow_m3_h, dtype=float)
+
+    with np.errstate(all='ignore'):
+        t_sat, _ = vec.saturation_properties(p)
+        duty = flow * g.rho_water / 3600 * g.cp_water * (t_out - t_in)
+        velocity = vec.velocity_from_tube_count(flow, g.tube_count, g.tube_diameter,
+                                                g.tube_wall_thickness, g.passes)
+        u_metric = vec.uncorrected_u(g.tube_diameter, velocity) * vec.U_BTU_TO_METRIC
+        fw = vec.water_correction_factor(t_in)
+        lmtd_value = vec.lmtd(t_sat, t_in, t_out)
+        cf = 1000 * duty / (g.surface_area * lmtd_value * u_metric * fw * g.material_coefficient)
+
+        codes = np.zeros(p.shape, dtype=np.uint32)
+        checks = (
+            ('missing_input', np.isnan(p) | np.isnan(t_in) | np.isnan(t_out) | np.isnan(flow)),
+            ('steam_pressure', ~np.isnan(p) & np.isnan(t_sat)),
+            ('water_temp', ~np.isnan(t_in) & np.isnan(fw)),
+            ('velocity', (velocity > 0) & np.isnan(u_metric)),
+            ('water_properties', flow <= 0),
+            ('temp_order', ~((t_sat > t_out) & (t_out > t_in))),
+            ('terminal_diff', (t_sat > t_out) & (t_sat - t_out < 2.8)),
+        )
+        for name, mask in checks:
+            codes[mask] |= np.uint32(ERROR_CODES[name][0])
+
+    return {
+        'cleanliness_factor': np.where(codes == 0, cf, np.nan),
+        'DUTY': duty,
+        'LMTD': lmtd_value,
+        'velocity': velocity,
+        'terminal_temp_diff': t_sat - t_out,
+        'error_code': codes,
+    }
+
+
+def _to_float(values):
+    """字符串列 -> 浮点数组，空字段或无法解析的字段为 NaN"""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    out = np.empty(len(values))
+    for i, v in enumerate(values):
+        try:
+            out[i] = float(v)
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+def _arrow_to_float(values):
+    """arrow 列 -> 浮点数组：null 为 NaN，字符串列中无法解析的字段为 NaN（同 _to_float）"""
+    if not (pa.types.is_floating(values.type) or pa.types.is_integer(values.type)):
+        try:
+            values = pa_compute.cast(values, pa.float64())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return _to_float(values.to_pylist())
+    return values.to_numpy(zero_copy_only=False).astype(float)
+
+
+def _batch_to_chunk(batch, names):
+    """pyarrow RecordBatch -> {逻辑列名: 数组}（时间戳保持 arrow 数组原样透传）"""
+    available = set(batch.schema.names)
+    chunk = {}
+    for key, col in names.items():
+        if col in available:
+            values = batch.column(col)
+            chunk[key] = values if key == 'timestamp' else _arrow_to_float(values)
+    return chunk
+
+
+def _iter_csv(path, names, chunk_size):
+    """按块读取 CSV，返回 {逻辑列名: 数组}"""
+    if pa is not None:
+        # 按块大小估算字节数（每行约100字节），pyarrow 按字节分块。
+        # 列类型只按第一块推断，后续块中出现非数值字段会使读取中断，因此数值列
+        # 一律按字符串读入（空字段为 null），逐块转换为浮点，无法解析的字段为 NaN
+        reader = pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(block_size=max(chunk_size * 100, 1 << 20)),
+            # 列数不符的行跳过（与标准库读取一致）
+            parse_options=pa_csv.ParseOptions(invalid_row_handler=lambda row: 'skip'),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=list(names.values()), include_missing_columns=False,
+                column_types={col: pa.string() for col in names.values()},
+                strings_can_be_null=True))
+        for batch in reader:
+            yield _batch_to_chunk(batch, names)
+        return
+
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader([f.readline()]))
+        index = {key: header.index(col) for key, col in names.items() if col in header}
+        width = max(index.values(), default=-1) + 1
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            # 列数不足的行（空行、截断行）跳过；空字段或非数值字段为 NaN
+            rows = [row for row in csv.reader(lines) if len(row) >= width]
+            chunk = {key: _to_float([row[i] for row in rows])
+                     for key, i in index.items() if key != 'timestamp'}
+            if 'timestamp' in index:
+                chunk['timestamp'] = np.array([row[index['timestamp']] for row in rows], dtype=str)
+            yield chunk
+
+
+def _iter_parquet(path, names, chunk_size):
+    """按块读取 Parquet（需要 pyarrow）"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("读取 Parquet 需要安装 pyarrow")
+    pf = pq.ParquetFile(path)
+    available = set(pf.schema_arrow.names)
+    wanted = [col for col in names.values() if col in available]
+    for batch in pf.iter_batches(batch_size=chunk_size, columns=wanted):
+        yield _batch_to_chunk(batch, names)
+
+
+def iter_chunks(path, column_map=None, chunk_size=200000):
+    """
+    按块读取历史数据文件
+
+    参数:
+        path: .csv 或 .parquet 文件路径
+        column_map: 逻辑列名 -> 文件列名（覆盖 DEFAULT_COLUMNS）
+        chunk_size: 每块行数
+    返回:
+        迭代器，每块为 {逻辑列名: 数组}
+    """
+    names = dict(DEFAULT_COLUMNS)
+    if column_map:
+        names.update(column_map)
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        return _iter_parquet(path, names, chunk_size)
+    return _iter_csv(path, names, chunk_size)
+
+
+class CsvSink:
+    """按块追加写出 CSV"""
+
+    def __init__(self, path):
+        self._path = path
+        self._writer = None
+        self._file = None
+
+    def write(self, chunk):
+        names = [k for k in OUTPUT_COLUMNS if k in chunk]
+        if pa is not None:
+            table = pa.table({k: chunk[k] for k in names})
+            if self._writer is None:
+                self._writer = pa_csv.CSVWriter(self._path, table.schema)
+            self._writer.write_table(table)
+            return
+        if self._file is None:
+            self._file = open(self._path, 'w', newline='', encoding='utf-8')
+            self._file.write(','.join(names) + '\n')
+        columns = [chunk[k] if k == 'timestamp' else map('{:.10g}'.format, chunk[k].tolist())
+                   for k in names]
+        self._file.write('\n'.join(map(','.join, zip(*columns))))
+        self._file.write('\n')
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class ParquetSink:
+    """按块追加写出 Parquet（需要 pyarrow）"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("写出 Parquet 需要安装 pyarrow")
+        self._pq = pq
+        self._table = pyarrow.table
+        self._path = path
+        self._writer = None
+
+    def write(self, chunk):
+        names = [k for k in OUTPUT_COLUMNS if k in chunk]
+        table = self._table({k: chunk[k] for k in names})
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def process_historian(source, output, design, column_map=None, chunk_size=200000):
+    """
+    流式反算清洁系数：读取 -> 逐块计算 -> 逐块写出
+
+    参数:
+        source: 历史数据文件（.csv / .parquet）
+        output: 结果文件（.csv / .parquet）
+        design: 机组设计工况 InputData（已计算）或 UnitGeometry
+        column_map: 逻辑列名 -> 文件列名
+        chunk_size: 每块行数
+    返回:
+        dict: 汇总（总行数、有效行数、清洁系数均值/最小/最大）
+    """
+    geometry = design if isinstance(design, UnitGeometry) else UnitGeometry(design)
+    is_parquet = os.path.splitext(output)[1].lower() in ('.parquet', '.pq')
+    sink = ParquetSink(output) if is_parquet else CsvSink(output)
+
+    rows = valid = 0
+    cf_sum = 0.0
+    cf_min, cf_max = np.inf, -np.inf
+    try:
+        for chunk in iter_chunks(source, column_map, chunk_size):
+            result = back_calculate_cleanliness(
+                geometry, chunk['steam_pressure'], chunk['cooling_water_in_temp'],
+                chunk['cooling_water_out_temp'], chunk['water_flow_m3_h'])
+            if 'timestamp' in chunk:
+                result['timestamp'] = chunk['timestamp']
+            sink.write(result)
+
+            cf = result['cleanliness_factor']
+            ok = ~np.isnan(cf)
+            rows += cf.size
+            valid += int(ok.sum())
+            if ok.any():
+                cf_sum += float(cf[ok].sum())
+                cf_min = min(cf_min, float(cf[ok].min()))
+                cf_max = max(cf_max, float(cf[ok].max()))
+    finally:
+        sink.close()
+
+    return {
+        'rows': rows,
+        'valid_rows': valid,
+        'mean_cleanliness': cf_sum / valid if valid else None,
+        'min_cleanliness': cf_min if valid else None,
+        'max_cleanliness': cf_max if valid else None,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    from .calculator import CondenserCalculator
+    from .data_model import InputData
+
+    design = CondenserCalculator(InputData.from_dict(dict(
+        steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+        tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+        material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+        cooling_water_in_temp=25, cooling_water_temp_rise=8,
+        cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85))).calculate_all()
+    geometry = UnitGeometry(design)
+
+    # 混合好坏数据：空字段、非数值字段（含质量标记 Bad）、截断行与空行，
+    # 坏值既出现在第一块内，也出现在 pyarrow 按第一块推断列类型之后的后续块中
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    bad = {7: '2024-01-01 00:00:07,0.12,,33.1,{flow}',
+           11: '2024-01-01 00:00:11,abc,25.0,33.1,{flow}',
+           13: '2024-01-01 00:00:13,0.12,25.0,Bad,{flow}',
+           17: '2024-01-01 00:00:17,0.12,25.0',
+           19: '',
+           n - 5: '2024-01-02 00:00:00,0.12,25.0,33.1,Bad'}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'history.csv')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(','.join(DEFAULT_COLUMNS.values()) + '\n')
+            for i in range(n):
+                flow = design.water_flow_m3_h * (1 + 0.1 * math.sin(i / 500))
+                t_out = 25 + 8.1 * design.water_flow_m3_h / flow
+                line = bad.get(i, f'2024-01-01 00:00:{i},0.12,25.0,{t_out:.4f},{{flow}}')
+                f.write(line.format(flow=f'{flow:.2f}') + '\n')
+
+        readers = {'pyarrow': pa, '标准库 csv': None} if pa is not None else {'标准库 csv': None}
+        columns = {}
+        for label, module in readers.items():
+            pa, saved = module, pa
+            try:
+                chunks = list(iter_chunks(source, chunk_size=50000))
+                summary = process_historian(source, os.path.join(tmp, 'cf.csv'), geometry, chunk_size=50000)
+            finally:
+                pa = saved
+            columns[label] = {key: np.concatenate([c[key] for c in chunks])
+                              for key in DEFAULT_COLUMNS if key != 'timestamp'}
+            print(f"{label}：{summary['rows']} 行，有效 {summary['valid_rows']} 行，"
+                  f"清洁系数均值 {summary['mean_cleanliness']:.4f}")
+        first, *others = columns.values()
+        same = all(np.array_equal(first[k], other[k], equal_nan=True) for other in others for k in first)
+        print(f"两种读取方式结果一致：{same}")
@@ -3,6 +3,8 @@
 """
 import math
 
+from . import precision
+
 
 def lmtd(t_sat, t_in, t_out):
     """
@@ -14,7 +16,7 @@ def lmtd(t_sat, t_in, t_out):
         t_in: 冷却水进水温度 (°C)，必须< t_out
         t_out: 冷却水出水温度 (°C)，必须> t_in 且 < t_sat
     返回:
-        float: LMTD值 (°C)，保留4位小数
+        float: LMTD值 (°C)，按精度策略舍入（compat 为4位小数）
     """
     # 类型校验
     try:
@@ -43,7 +45,7 @@ def lmtd(t_sat, t_in, t_out):
     else:
         lmtd_value = (t_out - t_in) / math.log(dt1 / dt2)
 
-    return round(lmtd_value, 4)
+    return round(lmtd_value, 4) if precision.compat else lmtd_value
 
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 """
 换热管材料修正系数模块
 """
+from . import precision
+
 
 # 壁厚序列（英寸）
 _THICKNESS = [0.020, 0.022, 0.025, 0.028, 0.035,
@@ -49,13 +51,13 @@ def _linear_interp(x, x_list, y_list):
 
 def material_coeff(material, thickness_in):
     """
-    换热管材料修正系数（线性插值，保留4位小数）
+    换热管材料修正系数（线性插值，按精度策略舍入）
 
     参数:
         material: 材料名称
         thickness_in: 壁厚 (英寸)，范围 [0.020, 0.109]
     返回:
-        float: 材料修正系数（4位小数）
+        float: 材料修正系数（compat 为4位小数）
     """
     # 类型校验
     try:
@@ -82,7 +84,7 @@ def material_coeff(material, thickness_in):
 
     # 线性插值
     coeff = _linear_interp(thickness_in, _THICKNESS, _COEFF[key])
-    return round(coeff, 4)
+    return round(coeff, 4) if precision.compat else coeff
 
 
 def get_material_list():
@@ -0,0 +1,315 @@
+"""
+约束设计优化模块
+在给定工况下同时选择流速（连续）、流程数、换热管外径与壁厚（离散，
+取标准管径与 BWG 壁厚），使设计面积或换热管质量最小，并满足：
+- 长径比在 [2, 3] 内（与结果面板的红绿判定一致）；
+- 水阻不超过上限；
+- 端差不小于下限（端差只取决于工况，不满足时任何结构都不可行）。
+
+与结构无关的阶段结果（热负荷、水量、对数平均温差、水温修正系数）
+只计算一次，材料修正系数按壁厚预先查表，候选方案按数组整批评估。
+搜索有时间预算：先对全部离散组合做粗网格扫描，再对排名靠前的组合
+逐轮细化流速，预算耗尽时返回当前找到的最优可行方案。
+"""
+import math
+import time
+
+import numpy as np
+
+from . import vectorized as vec
+from .batch import calculate_batch
+from .columns import INPUT_FIELDS, MODE_FIELDS, columns_from_inputs
+from .data_model import InputData
+from .heat_transfer_coefficient import _DIAMETERS, _MIN_VEL_FPS, _MAX_VEL_FPS, FPS_TO_MPS
+from .material_coefficient import _THICKNESS, _VALID_MATERIALS
+from .progress import Progress
+from .validation import ValidationResult
+
+# 写入优化方案时从原工况复制的输入字段（不复制计算结果）
+_COPIED_INPUTS = ('project_name', 'working_condition', 'material', 'tube_layout_pattern') + INPUT_FIELDS + MODE_FIELDS
+
+# 管材密度 (kg/m³)
+MATERIAL_DENSITY = {
+    "Cu Fe 194": 8910,
+    "Arsenical Cu": 8940,
+    "Admiralty": 8530,
+    "Al Brass": 8330,
+    "Al Bronze": 7800,
+    "Carbon Steel": 7850,
+    "Cu Ni 90-10": 8940,
+    "Cu Ni 70-30": 8950,
+    "SS(UNS S43035)": 7700,
+    "Titanium Grades 1 &2": 4510,
+    "SS (UNS S44660)": 7700,
+    "SS (UNS S44735)": 7750,
+    "SS TP 304": 7900,
+    "SS TP 316/317": 8000,
+    "SS (UNS N08367)": 8060,
+    "ATI 2003 (UNS S32003)": 7800,
+    "2205 (UNS S31803, S32205)": 7800,
+    "2507 (UNS S32750)": 7800,
+}
+_DENSITY_TABLE = np.array([MATERIAL_DENSITY[m] for m in _VALID_MATERIALS], dtype=float)
+
+PASS_OPTIONS = (1, 2, 4)
+VELOCITY_RANGE = (math.ceil(_MIN_VEL_FPS * FPS_TO_MPS * 1000) / 1000,
+                  math.floor(_MAX_VEL_FPS * FPS_TO_MPS * 1000) / 1000)
+OBJECTIVES = ('design_surface_area', 'tube_mass')
+
+
+def tube_mass(tube_od_mm, wall_thickness_mm, tube_length_mm, tube_count, material):
+    """
+    换热管总质量（数组版本）
+
+    参数:
+        tube_od_mm: 外径 (mm)
+        wall_thickness_mm: 壁厚 (mm)
+        tube_length_mm: 单根管长 (mm)
+        tube_count: 管数 (根)
+        material: 材料名称、名称序列或材料下标数组
+    返回:
+        ndarray: 质量 (kg)，未知材料为 NaN
+    """
+    idx = material if isinstance(material, np.ndarray) and material.dtype.kind == 'i' \
+        else vec.material_index(material)
+    density = np.where(idx >= 0, _DENSITY_TABLE[np.maximum(idx, 0)], np.nan)
+    do = np.asarray(tube_od_mm, dtype=float) / 1000
+    di = do - 2 * np.asarray(wall_thickness_mm, dtype=float) / 1000
+    section = math.pi / 4 * (do ** 2 - di ** 2)
+    return section * np.asarray(tube_length_mm, dtype=float) / 1000 * tube_count * density
+
+
+class DesignEvaluator:
+    """固定工况下的结构方案批量评估器（缓存与结构无关的阶段结果）"""
+
+    def __init__(self, data):
+        """
+        参数:
+            data: 工况 InputData（结构按模式0计算；管间距按与外径的比例随外径缩放）
+        """
+        base = columns_from_inputs([data])
+        base['structure_mode'][:] = 0
+        r = calculate_batch(base)
+        code = int(r['error_code'][0])
+        if code:
+            raise ValueError(f"工况无效：{'；'.join(ValidationResult.describe(code))}")
+
+        self.material = data.material
+        self.material_idx = int(vec.material_index(data.material))
+        self.duty = r['DUTY'][0]
+        self.lmtd = r['LMTD'][0]
+        self.fw = r['water_correction_factor'][0]
+        self.water_flow_m3_h = r['water_flow_m3_h'][0]
+        self.terminal_temp_diff = r['terminal_temp_diff'][0]
+        self.temp_c = (data.cooling_water_in_temp + r['cooling_water_out_temp'][0]) / 2
+        self.cleanliness = data.cleanliness_factor
+        self.fouling = data.fouling_factor
+        self.margin = 1.05 if data.fouling_factor is None else 1.0
+        self.pitch_ratio = data.tube_pitch / data.tube_diameter
+        # 材料修正系数表 [材料, 标准壁厚]
+        self.mat_table = vec.material_coeff(np.arange(len(_VALID_MATERIALS))[:, None],
+                                            np.array(_THICKNESS)[None, :])
+        self.evaluations = 0
+
+    def evaluate(self, tube_diameter, gauge, passes, velocity, material=None):
+        """
+        批量评估结构方案
+
+        参数:
+            tube_diameter: 外径 (mm)
+            gauge: 壁厚下标（_THICKNESS 中的位置）
+            passes: 流程数
+            velocity: 管内流速 (m/s)
+            material: 材料下标（_VALID_MATERIALS 中的位置），默认为工况材料
+        返回:
+            dict: design_surface_area, tube_count, tube_length, tube_sheet_diameter,
+                  tube_length_diameter_ratio, total_pressure_drop, tube_mass 等数组
+        """
+        do = np.asarray(tube_diameter, dtype=float)
+        gauge = np.asarray(gauge, dtype=np.intp)
+        wall = np.asarray(_THICKNESS)[gauge] * 25.4
+        passes = np.asarray(passes, dtype=float)
+        v = np.asarray(velocity, dtype=float)
+        material = np.asarray(self.material_idx if material is None else material, dtype=np.intp)
+
+        with np.errstate(all='ignore'):
+            mat = self.mat_table[material, gauge]
+            u_metric = vec.uncorrected_u(do, v) * vec.U_BTU_TO_METRIC
+            if self.fouling is not None and self.fouling > 0:
+                clean = vec.fouling_to_clean(self.fouling, do, wall, u_metric * self.fw * mat)
+            else:
+                clean = self.cleanliness
+            area = vec.heat_transfer_area(self.duty, self.lmtd, u_metric, self.fw, mat, clean)
+            design = np.ceil(area * self.margin / 50) * 50
+            count = vec.tube_count_from_flow(self.water_flow_m3_h, v, do, wall, passes)
+            length = vec.tube_length_from_area(design, count, do)
+            sheet = np.ceil(np.sqrt(count / 0.6) * (1 + 0.05 * passes) * self.pitch_ratio * do)
+            dp = 1.2 * 0.001 * vec.hei_water_resistance(do - 2 * wall, v, length, passes, self.temp_c)
+
+        self.evaluations += int(np.size(area))
+        return {
+            'tube_diameter': do, 'tube_wall_thickness': wall, 'passes': passes, 'velocity': v,
+            'surface_area': area, 'design_surface_area': design, 'tube_count': count,
+            'tube_length': length, 'tube_sheet_diameter': sheet,
+            'tube_length_diameter_ratio': vec.apply_precision(length / sheet, 2),
+            'total_pressure_drop': dp,
+            'tube_mass': tube_mass(do, wall, length, count, material),
+        }
+
+
+class OptimizationResult:
+    """优化结果"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+    def to_input(self, data):
+        """把最优方案的结构参数写入新工况（只复制原工况的输入，结构模式0）"""
+        if self.best is None:
+            raise ValueError("没有可行方案")
+        result = InputData.from_dict({k: getattr(data, k) for k in _COPIED_INPUTS})
+        result.tube_diameter = self.best['tube_diameter']
+        result.tube_wall_thickness = self.best['tube_wall_thickness']
+        result.passes = int(self.best['passes'])
+        result.velocity = self.best['velocity']
+        result.tube_pitch = round(data.tube_pitch / data.tube_diameter * result.tube_diameter, 3)
+        result.structure_mode = 0
+        return result
+
+
+def _violation(r, ld_range, max_pressure_drop):
+    """约束违反量（0 为可行，NaN 视为不可行）"""
+    ld = r['tube_length_diameter_ratio']
+    v = np.maximum(ld_range[0] - ld, 0) + np.maximum(ld - ld_range[1], 0)
+    if max_pressure_drop is not None:
+        v = v + np.maximum(r['total_pressure_drop'] - max_pressure_drop, 0) / max_pressure_drop
+    return np.where(np.isnan(v) | np.isnan(r['design_surface_area']), np.inf, v)
+
+
+def optimize_design(data, objective='design_surface_area', ld_range=(2.0, 3.0),
+                    max_pressure_drop=None, min_terminal_diff=None,
+                    diameters=None, gauges=None, passes=PASS_OPTIONS,
+                    time_budget=1.0, grid=24, beam=24, progress=None, cancel=None):
+    """
+    约束设计优化（有时间预算，随时返回当前最优）
+
+    参数:
+        data: 工况 InputData（蒸汽、冷却水、材料、清洁系数等）
+        objective: 'design_surface_area' 或 'tube_mass'
+        ld_range: 长径比允许范围
+        max_pressure_drop: 水阻上限 (kPa)，None 为不限
+        min_terminal_diff: 端差下限 (°C)，None 为不限
+        diameters: 候选外径 (mm)，默认全部标准管径
+        gauges: 候选壁厚 (英寸)，默认全部 BWG 壁厚
+        passes: 候选流程数
+        time_budget: 时间预算 (s)
+        grid: 粗扫描的流速点数
+        beam: 细化阶段保留的离散组合数
+        progress: 进度回调 callback(ProgressInfo)，以轮为单位（粗扫描一轮，之后每轮细化一轮）
+        cancel: CancelToken，每轮之间检查，取消时抛出 CancelledError
+    返回:
+        OptimizationResult: best（最优可行方案 dict，无可行方案为 None）, objective,
+                            feasible, evaluations, elapsed, converged, history
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"无效的优化目标：{objective}")
+    start = time.perf_counter()
+    deadline = start + time_budget
+    # 细化时流速步长每轮除以 4，降到 1e-4 以下即收敛，总轮数可预先算出
+    rounds, s = 1, (VELOCITY_RANGE[1] - VELOCITY_RANGE[0]) / (grid - 1)
+    while s / 4 >= 1e-4:
+        s /= 4
+        rounds += 1
+    tracker = Progress(rounds, progress, cancel)
+    tracker.check()
+    evaluator = DesignEvaluator(data)
+
+    def result(best, converged, history):
+        tracker.finish()
+        return OptimizationResult(
+            best=best, objective=None if best is None else best[objective],
+            feasible=best is not None, evaluations=evaluator.evaluations,
+            elapsed=time.perf_counter() - start, converged=converged, history=history)
+
+    if min_terminal_diff is not None and evaluator.terminal_temp_diff < min_terminal_diff:
+        return result(None, True, [])
+
+    diameters = list(_DIAMETERS if diameters is None else diameters)
+    gauge_idx = list(range(len(_THICKNESS))) if gauges is None else [_THICKNESS.index(g) for g in gauges]
+    combos = np.array([(d, g, p) for d in diameters for g in gauge_idx for p in passes], dtype=float)
+    v_lo, v_hi = VELOCITY_RANGE
+
+    best = None
+    history = []
+
+    def consider(r):
+        """更新最优可行方案，返回每个候选的排序值（可行为目标值，不可行加罚）"""
+        nonlocal best
+        viol = _violation(r, ld_range, max_pressure_drop)
+        obj = r[objective]
+        feasible = viol == 0
+        if feasible.any():
+            i = int(np.argmin(np.where(feasible, obj, np.inf)))
+            if best is None or obj[i] < best[objective]:
+                best = {k: float(v[i]) for k, v in r.items()}
+                best['passes'] = int(best['passes'])
+                best['tube_count'] = int(best['tube_count'])
+                history.append((time.perf_counter() - start, best[objective]))
+        return np.where(feasible, obj, obj * (1 + viol) + 1e12 * np.isinf(viol))
+
+    # 粗扫描：全部离散组合 × 流速网格
+    step = (v_hi - v_lo) / (grid - 1)
+    velocities = np.linspace(v_lo, v_hi, grid)
+    c = np.repeat(combos, grid, axis=0)
+    v = np.tile(velocities, len(combos))
+    rank = consider(evaluator.evaluate(c[:, 0], c[:, 1], c[:, 2], v)).reshape(len(combos), grid)
+    j = np.argmin(rank, axis=1)
+    score = rank[np.arange(len(combos)), j]
+    centre = velocities[j]
+    tracker.update(1)
+
+    # 细化：对排名靠前的组合在当前最优流速附近逐轮加密
+    keep = np.argsort(score)[:beam]
+    combos, centre, score = combos[keep], centre[keep], score[keep]
+    offsets = np.linspace(-1, 1, 9)
+    converged = False
+    while time.perf_counter() < deadline:
+        step /= 4
+        if step < 1e-4:
+            converged = True
+            break
+        v = np.clip(centre[:, None] + offsets * 4 * step, v_lo, v_hi)
+        c = np.repeat(combos, v.shape[1], axis=0)
+        rank = consider(evaluator.evaluate(c[:, 0], c[:, 1], c[:, 2], v.ravel())).reshape(v.shape)
+        j = np.argmin(rank, axis=1)
+        improved = rank[np.arange(len(combos)), j] < score
+        centre = np.where(improved, v[np.arange(len(combos)), j], centre)
+        score = np.minimum(score, rank[np.arange(len(combos)), j])
+        tracker.update(1)
+
+    return result(best, converged, history)
+
+
+if __name__ == "__main__":
+    d = InputData.from_dict(dict(
+        steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+        tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+        material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+        cooling_water_in_temp=25, cooling_water_temp_rise=8,
+        cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85))
+
+    for objective in OBJECTIVES:
+        res = optimize_design(d, objective=objective, max_pressure_drop=80, min_terminal_diff=3)
+        b = res.best
+        print(f"[{objective}] 可行={res.feasible} 收敛={res.converged} "
+              f"评估 {res.evaluations} 次，用时 {res.elapsed * 1000:.0f} ms")
+        if b:
+            print(f"  外径 {b['tube_diameter']} mm，壁厚 {b['tube_wall_thickness']:.3f} mm，"
+                  f"{b['passes']} 流程，流速 {b['velocity']:.3f} m/s")
+            print(f"  面积 {b['design_surface_area']:.0f} m²，管数 {b['tube_count']}，"
+                  f"长径比 {b['tube_length_diameter_ratio']:.2f}，水阻 {b['total_pressure_drop']:.1f} kPa，"
+                  f"管重 {b['tube_mass'] / 1000:.1f} t")
@@ -0,0 +1,224 @@
+"""
+多壳体并联凝汽器的冷却水流量分配
+大机组的冷却水在 2~4 台并联壳体间分配，各壳体管数、管长或堵管数不同时，
+流量按各壳体水阻相等自然分配。本模块对给定总水量求各壳体流量、水阻与背压：
+- 水阻与引擎相同（HEI，含 1.2 系数，见 pressure_drop.calculate_hei_water_resistance），
+  写成 Δp = a·v^1.75 + b·v²（a 含管长、流程、内径与温度修正，b 为局部阻力），
+  计算中不做 7 位小数舍入，保证导数连续；
+- 未知量为各壳体流量与公共水阻，牛顿迭代使用解析导数 dΔp/dQ = (1.75·a·v^0.75 + 2·b·v)/A；
+  雅可比矩阵为箭形（各壳体方程只含自身流量与公共水阻），每步直接消元求解；
+  初值取纯 1.75 次方律的分配比例，外层更新时以上次解热启动，几步即收敛；
+- 温度修正系数取各壳体平均水温，外层按热力解更新（弱耦合，两三次即收敛）；
+- 背压按固定几何校核（见 cooling_tower.rated_saturation_temp），传热系数按分配后的流速查表，
+  蒸汽按各壳体设计汽量比例分配；
+- 全部运行点按 [运行点, 壳体] 数组同时迭代，便于快速生成运行图。
+"""
+import numpy as np
+
+from . import vectorized as vec
+from .annual import _design_arrays
+from .cooling_tower import rated_saturation_temp, saturation_pressure
+
+SHELL_FIELDS = ('water_flow', 'velocity', 'pressure_drop', 'saturation_temp', 'back_pressure',
+                'cooling_water_out_temp', 'DUTY')
+
+
+class ShellFlowResult:
+    """
+    并联壳体流量分配结果
+
+    shells: 各壳体字段 -> [运行点, 壳体] 数组（见 SHELL_FIELDS；water_flow 为 m³/h，DUTY 为 kW）
+    pressure_drop: 公共水阻 (kPa) [运行点]
+    iterations: 牛顿迭代总步数 [运行点]
+    converged: 是否收敛 [运行点]
+    运行点参数均为标量时去掉运行点维。
+    """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
+class _Shells:
+    """各壳体与流量无关的部分（[1, 壳体] 行，便于与运行点广播）"""
+
+    def __init__(self, designs, plugged_tubes):
+        d = _design_arrays(designs)
+        row = {k: v.reshape(1, -1) for k, v in d.items()}
+        plugged = np.broadcast_to(np.asarray(plugged_tubes, dtype=float), row['tube_count'].shape)
+        count = row['tube_count'].astype(float) - plugged
+        if (plugged < 0).any() or (count < 1).any():
+            raise ValueError("堵管数必须≥0且小于管数")
+        self.do = row['tube_diameter'].astype(float)
+        wall = row['tube_wall_thickness'].astype(float)
+        self.di = self.do - 2 * wall
+        self.passes = row['passes'].astype(float)
+        length = row['tube_length'].astype(float)
+        if not np.isin(self.passes, (1, 2, 4)).all():
+            raise ValueError("流程数必须是1、2或4")
+        # 每流程流通面积 (m²) 与换热面积 (m²)
+        self.flow_area = np.pi * (self.di / 2000) ** 2 * count / self.passes
+        self.area = np.pi * self.do / 1000 * length / 1000 * count
+        # Δp = a·Rt·v^1.75 + b·v²（a、b 已含 1.2·0.001 系数）
+        self.a = 1.2 * 0.001 * length / 1000 * self.passes * 28.72 / (self.di / 1000) ** 1.25
+        self.b = 1.2 * 0.001 * 0.1 * self.passes
+        self.rho = row['rho_water'].astype(float)
+        self.cp = row['cp_water'].astype(float)
+        mat = vec.material_coeff(vec.material_index(d['material']), d['tube_wall_thickness'] / 25.4)
+        self.u_factor = vec.U_BTU_TO_METRIC * mat.reshape(1, -1) * row['clean_factor_corrected'].astype(float)
+        steam = row['steam_mass_flow'].astype(float)
+        self.steam_share = steam / steam.sum()
+        self.design_water_flow = row['water_flow_kg_s'].astype(float) / self.rho * 3600
+        self.design_steam_flow = float(steam.sum())
+        self.design_enthalpy = float(row['steam_enthalpy'].astype(float).mean())
+        self.design_t_in = float(row['cooling_water_in_temp'].astype(float).mean())
+
+    def drop(self, q, rt):
+        """各壳体水阻 (kPa) 及其对流量 (m³/s) 的导数"""
+        v = q / self.flow_area
+        a = self.a * rt
+        v75 = v ** 0.75
+        dp = a * v75 * v + self.b * v * v
+        return dp, (1.75 * a * v75 + 2 * self.b * v) / self.flow_area
+
+
+def _newton(shells, q_total, q, rt, tol, max_iter):
+    """
+    水阻相等的牛顿迭代（[运行点, 壳体]）
+
+    方程 Δp_i(Q_i) = P，ΣQ_i = Q；线性化后 Q_i += (P - Δp_i)/Δp_i'，
+    代入流量守恒直接得到 P，即箭形雅可比矩阵的消元解。
+    """
+    iterations = np.zeros(q.shape[0], dtype=int)
+    converged = np.zeros(q.shape[0], dtype=bool)
+    for _ in range(max_iter):
+        dp, slope = shells.drop(q, rt)
+        common = dp.mean(axis=1, keepdims=True)
+        converged = (np.abs(dp - common).max(axis=1) <= tol * common[:, 0]) & \
+                    (np.abs(q.sum(axis=1) - q_total[:, 0]) <= tol * q_total[:, 0])
+        if converged.all():
+            break
+        inv = 1 / slope
+        p = (q_total - q.sum(axis=1, keepdims=True) + (dp * inv).sum(axis=1, keepdims=True)) / \
+            inv.sum(axis=1, keepdims=True)
+        step = (p - dp) * inv
+        # 流量保持为正：步长过大时减半
+        q = np.where(q + step > 0, q + step, q / 2)
+        iterations += ~converged
+    return q, iterations, converged
+
+
+def solve_parallel_shells(designs, water_flow=None, cooling_water_in_temp=None, steam_mass_flow=None,
+                          steam_enthalpy=None, plugged_tubes=0, tol=1e-10, max_iter=50, max_outer=10):
+    """
+    并联壳体的流量分配与各壳体背压
+
+    参数:
+        designs: 各壳体已完成 calculate_all() 的 InputData 序列（2~4 台，单台亦可）
+        water_flow: 总冷却水量 (m³/h)，标量或运行点数组，缺省为各壳体设计水量之和
+        cooling_water_in_temp: 冷却水进口温度 (°C)，缺省为设计值
+        steam_mass_flow: 总蒸汽流量 (kg/h)，按各壳体设计汽量比例分配，缺省为设计值之和
+        steam_enthalpy: 蒸汽焓 (kJ/kg)，缺省为设计值
+        plugged_tubes: 各壳体堵管数（标量或按壳体的序列），按各流程均匀堵管计
+        tol: 各壳体水阻的相对偏差收敛限
+        max_iter: 每次水力求解的最大牛顿步数
+        max_outer: 温度修正系数的最大外层更新次数
+    返回:
+        ShellFlowResult
+    """
+    shells = _Shells(list(designs), plugged_tubes)
+    points = {
+        'water_flow': shells.design_water_flow.sum() if water_flow is None else water_flow,
+        't_in': shells.design_t_in if cooling_water_in_temp is None else cooling_water_in_temp,
+        'steam': shells.design_steam_flow if steam_mass_flow is None else steam_mass_flow,
+        'enthalpy': shells.design_enthalpy if steam_enthalpy is None else steam_enthalpy,
+    }
+    single = all(np.ndim(v) == 0 for v in points.values())
+    points = np.broadcast_arrays(*[np.asarray(v, dtype=float).ravel() for v in points.values()])
+    flow, t_in, steam, enthalpy = (x.reshape(-1, 1) for x in points)
+    if (flow <= 0).any():
+        raise ValueError("总冷却水量必须>0")
+
+    q_total = flow / 3600
+    # 初值：纯 v^1.75 律下 Q_i ∝ A_i·a_i^(-1/1.75)
+    weight = shells.flow_area * shells.a ** (-1 / 1.75)
+    q = q_total * weight / weight.sum()
+    rt = vec.temperature_factor(t_in) * np.ones_like(q)
+    iterations = np.zeros(q.shape[0], dtype=int)
+    for _ in range(max_outer):
+        q, steps, converged = _newton(shells, q_total, q, rt, tol, max_iter)
+        iterations += steps
+        velocity = q / shells.flow_area
+        mcp = q * shells.rho * shells.cp
+        u_base = vec.uncorrected_u(shells.do, velocity) * shells.u_factor
+        t_sat, duty = rated_saturation_temp(t_in, u_base, shells.area, mcp,
+                                            steam_flow=steam / 3600 * shells.steam_share,
+                                            steam_enthalpy=enthalpy)
+        t_out = t_in + duty / mcp
+        updated = vec.temperature_factor(np.where(np.isnan(t_out), t_in, (t_in + t_out) / 2))
+        if np.abs(updated - rt).max() <= tol:
+            break
+        rt = updated
+
+    dp = shells.drop(q, rt)[0]
+    fields = {
+        'shells': {'water_flow': q * 3600, 'velocity': velocity, 'pressure_drop': dp,
+                   'saturation_temp': t_sat, 'back_pressure': saturation_pressure(t_sat),
+                   'cooling_water_out_temp': t_out, 'DUTY': duty},
+        'pressure_drop': dp.mean(axis=1),
+        'iterations': iterations,
+        'converged': converged,
+    }
+    if single:
+        fields = {k: ({f: a[0] for f, a in v.items()} if k == 'shells' else v[0]) for k, v in fields.items()}
+    return ShellFlowResult(**fields)
+
+
+if __name__ == "__main__":
+    import time
+
+    from .calculator import CondenserCalculator
+    from .data_model import InputData
+
+    base = dict(steam_pressure=0.12, steam_mass_flow=300000, steam_enthalpy=2400,
+                tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+                material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+                cooling_water_in_temp=25, cooling_water_temp_rise=8,
+                cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85)
+    design = CondenserCalculator(InputData.from_dict(base)).calculate_all()
+    # 第二台壳体管子加长 10%、少 5% 管数（结构模式1重算），第三台同第一台但堵管 8%
+    longer = CondenserCalculator(InputData.from_dict(dict(
+        base, structure_mode=1, input_tube_count=round(design.tube_count * 0.95),
+        input_tube_length=design.tube_length * 1.1))).calculate_all()
+    shells = [design, longer, design]
+    plugged = [0, 0, round(design.tube_count * 0.08)]
+
+    r = solve_parallel_shells(shells, plugged_tubes=plugged)
+    print(f"设计工况：{r.iterations} 步，公共水阻 {r.pressure_drop:.3f} kPa")
+    for i in range(len(shells)):
+        print(f"  壳体 {i + 1}：水量 {r.shells['water_flow'][i]:,.0f} m³/h，流速 {r.shells['velocity'][i]:.3f} m/s，"
+              f"水阻 {r.shells['pressure_drop'][i]:.6f} kPa，背压 {r.shells['back_pressure'][i] * 1000:.2f} kPa")
+
+    # 单台壳体：与按求得流速、平均水温直接调用 HEI 水阻公式一致
+    from .pressure_drop import calculate_hei_water_resistance
+
+    one = solve_parallel_shells([design])
+    t_mean = (design.cooling_water_in_temp + float(one.shells['cooling_water_out_temp'][0])) / 2
+    hei = 1.2 * 0.001 * calculate_hei_water_resistance(
+        design.tube_diameter - 2 * design.tube_wall_thickness, float(one.shells['velocity'][0]),
+        design.tube_length, design.passes, t_mean)
+    print("单台壳体与 HEI 水阻公式相对偏差：", f"{one.pressure_drop / hei - 1:+.1e}")
+
+    # 运行图：总水量 × 进口水温 × 负荷
+    q, t, load = np.meshgrid(np.linspace(0.6, 1.1, 51) * sum(d.water_flow_m3_h for d in shells),
+                             np.linspace(5, 32, 28), np.linspace(0.4, 1.0, 13), indexing='ij')
+    t0 = time.perf_counter()
+    m = solve_parallel_shells(shells, water_flow=q.ravel(), cooling_water_in_temp=t.ravel(),
+                              steam_mass_flow=load.ravel() * 900000, plugged_tubes=plugged)
+    print(f"{q.size:,} 个运行点：{(time.perf_counter() - t0) * 1000:.0f} ms，全部收敛：{m.converged.all()}，"
+          f"最大迭代步数 {m.iterations.max()}")
+    share = m.shells['water_flow'] / m.shells['water_flow'].sum(axis=1, keepdims=True)
+    print("各壳体水量占比范围：", [f"{share[:, i].min():.4f}~{share[:, i].max():.4f}" for i in range(len(shells))])
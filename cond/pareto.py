@@ -0,0 +1,382 @@
+"""
+多目标 Pareto 前沿搜索
+以 NSGA-II 在计算输入上同时最小化设计面积、水阻与管数：
+- 决策变量可为连续量（流速、管径、壁厚、温升等）或离散选项
+  （流程数、材料），基因统一编码在 [0, 1] 内，离散变量按区间解码；
+- 每代种群整体作为一个批次交给批量计算引擎，可分块提交到进程池并行计算；
+- 校验失败或违反长径比、水阻等约束的个体按约束支配规则排在可行个体之后；
+- 可行个体持续并入非支配存档，存档随每代增量更新。
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import precision
+from .batch import calculate_batch
+from .columns import INPUT_FIELDS, MODE_FIELDS, columns_from_inputs
+from .heat_transfer_coefficient import _MIN_DIAM, _MAX_DIAM
+from .material_coefficient import _MIN_THICK, _MAX_THICK, _VALID_MATERIALS
+from .optimizer import VELOCITY_RANGE
+from .progress import Progress
+
+OBJECTIVE_FIELDS = ('design_surface_area', 'total_pressure_drop', 'tube_count')
+
+# 默认决策变量：(字段名, 类型, 范围或选项)
+DEFAULT_VARIABLES = (
+    ('velocity', 'float', VELOCITY_RANGE),
+    ('tube_diameter', 'float', (_MIN_DIAM, _MAX_DIAM)),
+    ('tube_wall_thickness', 'float', (_MIN_THICK * 25.4, _MAX_THICK * 25.4)),
+    ('cooling_water_temp_rise', 'float', (6.0, 12.0)),
+    ('passes', 'choice', (1, 2, 4)),
+    ('material', 'choice', tuple(_VALID_MATERIALS)),
+)
+
+
+class ParetoArchive:
+    """非支配解存档（只保存可行解，按需用拥挤距离截断）"""
+
+    def __init__(self, max_size=2000):
+        self.max_size = max_size
+        self.objectives = np.empty((0, len(OBJECTIVE_FIELDS)))
+        self.records = {}
+
+    def __len__(self):
+        return self.objectives.shape[0]
+
+    def add(self, objectives, records):
+        """
+        并入一批可行解
+
+        参数:
+            objectives: [n, 目标数] 目标值
+            records: 字段 -> 长度 n 的数组（决策变量与计算结果）
+        返回:
+            int: 新进入存档的解数
+        """
+        f = np.asarray(objectives, dtype=float)
+        if f.shape[0] == 0:
+            return 0
+        # 新解自身去除被支配者与重复者
+        keep = _nondominated_mask(f)
+        f = f[keep]
+        records = {k: v[keep] for k, v in records.items()}
+        _, first = np.unique(f, axis=0, return_index=True)
+        f = f[np.sort(first)]
+        records = {k: v[np.sort(first)] for k, v in records.items()}
+
+        if len(self):
+            a = self.objectives
+            # new_dominated[j]：新解 j 被存档中某解支配或与之重合
+            same = np.ones((a.shape[0], f.shape[0]), dtype=bool)
+            for k in range(a.shape[1]):
+                same &= a[:, k, None] == f[None, :, k]
+            new_dominated = _dominates(a, f).any(axis=0) | same.any(axis=0)
+            f = f[~new_dominated]
+            records = {k: v[~new_dominated] for k, v in records.items()}
+            # 存档中被新解支配的解移除
+            old_dominated = _dominates(f, a).any(axis=0)
+            self.objectives = a[~old_dominated]
+            self.records = {k: v[~old_dominated] for k, v in self.records.items()}
+
+        added = f.shape[0]
+        if added:
+            self.objectives = np.vstack([self.objectives, f])
+            if self.records:
+                self.records = {k: np.concatenate([self.records[k], records[k]]) for k in self.records}
+            else:
+                self.records = records
+        if len(self) > self.max_size:
+            order = np.argsort(-_crowding_distance(self.objectives), kind='stable')[:self.max_size]
+            self.objectives = self.objectives[order]
+            self.records = {k: v[order] for k, v in self.records.items()}
+        return added
+
+
+def _dominates(a, b):
+    """支配矩阵：[i, j] 为 a 的第 i 点是否支配 b 的第 j 点（逐目标比较，避免三维中间数组）"""
+    le = np.ones((a.shape[0], b.shape[0]), dtype=bool)
+    lt = np.zeros_like(le)
+    for k in range(a.shape[1]):
+        x, y = a[:, k, None], b[None, :, k]
+        le &= x <= y
+        lt |= x < y
+    return le & lt
+
+
+def _nondominated_mask(f):
+    """返回不被集合内其他点支配的点"""
+    return ~_dominates(f, f).any(axis=0)
+
+
+def _nondominated_sort(f):
+    """快速非支配排序，返回每个点的前沿层号（0 为第一层）"""
+    n = f.shape[0]
+    dom = _dominates(f, f)                # dom[i, j]：i 支配 j
+    count = dom.sum(axis=0)               # 支配 j 的点数
+    rank = np.full(n, -1)
+    front = np.flatnonzero(count == 0)
+    level = 0
+    while front.size:
+        rank[front] = level
+        count = count - dom[front].sum(axis=0)
+        count[rank >= 0] = -1
+        front = np.flatnonzero(count == 0)
+        level += 1
+    return rank
+
+
+def _crowding_distance(f):
+    """拥挤距离（各目标归一化后的相邻间距之和，边界点为无穷大）"""
+    n, m = f.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for k in range(m):
+        order = np.argsort(f[:, k], kind='stable')
+        span = f[order[-1], k] - f[order[0], k]
+        distance[order[[0, -1]]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (f[order[2:], k] - f[order[:-2], k]) / span
+    return distance
+
+
+def _evaluate_chunk(columns, mode):
+    """进程池任务：按给定精度策略计算一块种群，只返回需要的字段"""
+    with precision.precision(mode):
+        r = calculate_batch(columns)
+    return {k: r[k] for k in OBJECTIVE_FIELDS + ('tube_length_diameter_ratio', 'tube_length', 'velocity',
+                                                  'error_code')}
+
+
+class _Problem:
+    """决策变量编码、解码与种群评估"""
+
+    def __init__(self, data, variables, ld_range, max_pressure_drop, executor, workers):
+        self.base = columns_from_inputs([data])
+        self.base['structure_mode'][:] = 0
+        self.variables = variables
+        self.names = [v[0] for v in variables]
+        self.pitch_ratio = data.tube_pitch / data.tube_diameter
+        self.ld_range = ld_range
+        self.max_pressure_drop = max_pressure_drop
+        self.executor = executor
+        self.workers = workers
+        self.evaluations = 0
+
+    def decode(self, genes):
+        """基因 [n, 变量数] -> 决策变量值"""
+        values = {}
+        for j, (name, kind, spec) in enumerate(self.variables):
+            g = genes[:, j]
+            if kind == 'choice':
+                idx = np.minimum((g * len(spec)).astype(np.intp), len(spec) - 1)
+                values[name] = np.asarray(spec, dtype=object if name == 'material' else float)[idx]
+            else:
+                lo, hi = spec
+                values[name] = lo + g * (hi - lo)
+        return values
+
+    def columns(self, values, n):
+        cols = {k: np.repeat(v, n) for k, v in self.base.items()}
+        for k, v in values.items():
+            cols[k] = v
+        if 'tube_diameter' in values and 'tube_pitch' not in values:
+            cols['tube_pitch'] = values['tube_diameter'] * self.pitch_ratio
+        return cols
+
+    def evaluate(self, genes):
+        """
+        评估种群
+
+        返回:
+            tuple: (目标值 [n, 3], 约束违反量 [n]（0 为可行）, 记录 dict)
+        """
+        n = genes.shape[0]
+        values = self.decode(genes)
+        cols = self.columns(values, n)
+        if self.executor is None or self.workers <= 1:
+            r = _evaluate_chunk(cols, precision.get_precision())
+        else:
+            bounds = np.linspace(0, n, self.workers + 1).astype(int)
+            chunks = [{k: v[a:b] for k, v in cols.items()} for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+            # 工作进程不继承调用方的精度策略，随任务传入
+            mode = precision.get_precision()
+            parts = list(self.executor.map(_evaluate_chunk, chunks, [mode] * len(chunks)))
+            r = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        self.evaluations += n
+
+        f = np.column_stack([r[k] for k in OBJECTIVE_FIELDS])
+        ld = r['tube_length_diameter_ratio']
+        with np.errstate(invalid='ignore'):
+            violation = np.maximum(self.ld_range[0] - ld, 0) + np.maximum(ld - self.ld_range[1], 0)
+            if self.max_pressure_drop is not None:
+                violation += np.maximum(r['total_pressure_drop'] - self.max_pressure_drop, 0) \
+                    / self.max_pressure_drop
+        violation = np.where((r['error_code'] != 0) | np.isnan(violation), 1e6, violation)
+        records = dict(values)
+        records.update(r)
+        return f, violation, records
+
+
+def _rank(f, violation):
+    """约束支配排序：可行解按非支配层与拥挤距离，不可行解按违反量排在其后"""
+    n = f.shape[0]
+    rank = np.empty(n)
+    crowd = np.zeros(n)
+    feasible = violation == 0
+    idx = np.flatnonzero(feasible)
+    if idx.size:
+        r = _nondominated_sort(f[idx])
+        rank[idx] = r
+        for level in np.unique(r):
+            members = idx[r == level]
+            crowd[members] = _crowding_distance(f[members])
+        offset = r.max() + 1
+    else:
+        offset = 0
+    bad = np.flatnonzero(~feasible)
+    rank[bad] = offset + 1 + violation[bad]
+    return rank, crowd
+
+
+def _select(rank, crowd, size):
+    order = np.lexsort((-crowd, rank))
+    return order[:size]
+
+
+def _tournament(rank, crowd, n, rng):
+    a = rng.integers(0, rank.size, n)
+    b = rng.integers(0, rank.size, n)
+    a_wins = (rank[a] < rank[b]) | ((rank[a] == rank[b]) & (crowd[a] > crowd[b]))
+    return np.where(a_wins, a, b)
+
+
+def _variation(parents, rng, eta_c=15.0, eta_m=20.0, p_cross=0.9):
+    """模拟二进制交叉 + 多项式变异（基因范围 [0, 1]）"""
+    n, m = parents.shape
+    n -= n % 2
+    p1, p2 = parents[0:n:2], parents[1:n:2]
+    u = rng.random(p1.shape)
+    beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta_c + 1)), (1 / (2 * (1 - u))) ** (1 / (eta_c + 1)))
+    cross = (rng.random((p1.shape[0], 1)) < p_cross) & (rng.random(p1.shape) < 0.5)
+    c1 = np.where(cross, 0.5 * ((1 + beta) * p1 + (1 - beta) * p2), p1)
+    c2 = np.where(cross, 0.5 * ((1 - beta) * p1 + (1 + beta) * p2), p2)
+    children = np.vstack([c1, c2])
+
+    mutate = rng.random(children.shape) < 1.0 / m
+    u = rng.random(children.shape)
+    delta = np.where(u < 0.5, (2 * u) ** (1 / (eta_m + 1)) - 1, 1 - (2 * (1 - u)) ** (1 / (eta_m + 1)))
+    children = np.where(mutate, children + delta, children)
+    return np.clip(children, 0.0, 1.0 - 1e-12)
+
+
+class ParetoResult:
+    """Pareto 搜索结果"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
+def pareto_search(data, variables=DEFAULT_VARIABLES, population=400, generations=100,
+                  time_budget=60.0, ld_range=(2.0, 3.0), max_pressure_drop=None,
+                  workers=None, archive_size=2000, seed=None, progress=None, cancel=None):
+    """
+    NSGA-II 多目标搜索（面积、水阻、管数同时最小）
+
+    参数:
+        data: 基准工况 InputData（未作为变量的字段取其值；结构按模式0计算）
+        variables: 决策变量定义 (字段名, 'float'|'choice', 范围或选项)
+        population: 种群规模
+        generations: 最大代数
+        time_budget: 时间预算 (s)
+        ld_range: 长径比允许范围
+        max_pressure_drop: 水阻上限 (kPa)
+        workers: 进程数，None 为 CPU 核数，1 为不使用进程池
+        archive_size: 非支配存档容量
+        seed: 随机种子
+        progress: 进度回调 callback(ProgressInfo)，以代为单位（见 progress 模块）
+        cancel: CancelToken，每代之间检查，取消时抛出 CancelledError
+    返回:
+        ParetoResult: objectives（存档目标值 [n, 3]）, designs（存档决策变量与结果）,
+                      generations, evaluations, elapsed
+    """
+    for name, kind, _ in variables:
+        if name not in INPUT_FIELDS + MODE_FIELDS + ('material',):
+            raise ValueError(f"无效的决策变量：{name}")
+        if kind not in ('float', 'choice'):
+            raise ValueError(f"无效的变量类型：{kind}")
+    start = time.perf_counter()
+    deadline = start + time_budget
+    rng = np.random.default_rng(seed)
+    workers = (os.cpu_count() or 1) if workers is None else max(int(workers), 1)
+    # 小种群的进程间传输开销大于计算量，不值得并行
+    workers = min(workers, max(population // 2000, 1))
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+
+    archive = ParetoArchive(archive_size)
+    done = 0
+    tracker = Progress(generations, progress, cancel)
+    try:
+        problem = _Problem(data, variables, ld_range, max_pressure_drop, executor, workers)
+        genes = rng.random((population, len(variables)))
+        f, violation, records = problem.evaluate(genes)
+        feasible = violation == 0
+        archive.add(f[feasible], {k: v[feasible] for k, v in records.items()})
+        rank, crowd = _rank(f, violation)
+
+        while done < generations and time.perf_counter() < deadline:
+            parents = genes[_tournament(rank, crowd, population, rng)]
+            children = _variation(parents, rng)
+            cf, cv, crec = problem.evaluate(children)
+            ok = cv == 0
+            archive.add(cf[ok], {k: v[ok] for k, v in crec.items()})
+
+            genes = np.vstack([genes, children])
+            f = np.vstack([f, cf])
+            violation = np.concatenate([violation, cv])
+            rank, crowd = _rank(f, violation)
+            keep = _select(rank, crowd, population)
+            genes, f, violation = genes[keep], f[keep], violation[keep]
+            rank, crowd = _rank(f, violation)
+            done += 1
+            tracker.update(1)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    tracker.finish()
+    order = np.lexsort(archive.objectives.T[::-1]) if len(archive) else np.array([], dtype=int)
+    return ParetoResult(
+        objectives=archive.objectives[order],
+        designs={k: v[order] for k, v in archive.records.items()},
+        generations=done,
+        evaluations=problem.evaluations,
+        elapsed=time.perf_counter() - start,
+    )
+
+
+if __name__ == "__main__":
+    from .data_model import InputData
+
+    d = InputData.from_dict(dict(
+        steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+        tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+        material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+        cooling_water_in_temp=25, cooling_water_temp_rise=8,
+        cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85))
+
+    res = pareto_search(d, population=400, generations=200, max_pressure_drop=150, seed=1)
+    print(f"{res.generations} 代，评估 {res.evaluations} 个方案，用时 {res.elapsed:.1f} s，"
+          f"Pareto 解 {len(res.objectives)} 个")
+    for i in np.linspace(0, len(res.objectives) - 1, min(8, len(res.objectives))).astype(int):
+        area, dp, count = res.objectives[i]
+        x = res.designs
+        print(f"  面积 {area:7.0f} m²  水阻 {dp:6.1f} kPa  管数 {count:6.0f}  "
+              f"Ø{x['tube_diameter'][i]:.1f} v={x['velocity'][i]:.2f} {int(x['passes'][i])}流程 "
+              f"{x['material'][i]}")
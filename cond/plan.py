@@ -0,0 +1,557 @@
+"""
+工况计算计划编译器
+CondenserCalculator.calculate_all() 每次调用都要判断计算模式与结构模式、
+逐阶段检查输入是否为 None，并在各阶段函数中重复类型转换与单位换算。
+对同一“形状”（模式组合 + 给定字段 + 精度策略）的大量单工况调用，
+可预先把这些分支与检查在编译期确定，生成一个直线执行的专用函数：
+- 按模式拼接各阶段代码片段，只保留该模式实际执行的路径；
+- 必要字段是否给定在编译时检查，运行时不再判断 None；
+- 查表插值改为二分定位，材料名称改为字典查找；
+- 保留各阶段函数的数值校验与错误信息，结果与 calculate_all() 完全一致。
+"""
+import math
+from bisect import bisect_left
+
+from . import precision
+from .calculator import CondenserCalculator
+from .progress import Progress
+from .heat_transfer_coefficient import (_RAW, _DIAMETERS, _VELOCITIES, _MIN_DIAM, _MAX_DIAM,
+                                        _MIN_VEL_FPS, _MAX_VEL_FPS, _MIN_VEL_MPS, _MAX_VEL_MPS, MPS_TO_FPS)
+from .material_coefficient import _THICKNESS, _COEFF as _MAT_COEFF, _MIN_THICK, _MAX_THICK
+from .tube_structure import M3_H_TO_M3_S
+from .water_correction import _TEMP_FW, _COEFF as _FW_COEFF, _MIN_F, _MAX_F, _MIN_C, _MAX_C
+
+# 各模式下的必要字段
+_COMMON_FIELDS = ('steam_pressure', 'steam_enthalpy', 'steam_mass_flow', 'cp_water', 'rho_water',
+                  'cooling_water_in_temp', 'material', 'tube_wall_thickness', 'tube_diameter',
+                  'velocity', 'passes', 'cooling_water_nozzle_count')
+_CALC_FIELDS = {0: ('cooling_water_temp_rise',), 1: ('water_flow_input',)}
+_STRUCT_FIELDS = {0: (), 1: ('input_tube_count', 'input_tube_length'),
+                  2: ('input_design_surface', 'input_tube_count')}
+# 影响计划形状的可选字段（未给管间距时同 calculate_all() 跳过管板外径与长径比）
+_OPTIONAL_FIELDS = ('cleanliness_factor', 'fouling_factor', 'tube_pitch', 'tube_layout_pattern')
+
+_U_COLUMNS = [[_RAW[d][i] for d in _DIAMETERS] for i in range(len(_VELOCITIES))]
+_MATERIALS = {k.lower(): v for k, v in _MAT_COEFF.items()}
+
+
+def _interp(x, xs, ys):
+    """与各阶段模块 _linear_interp 逐位一致的线性插值（二分定位区间）"""
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[-1]:
+        return ys[-1]
+    i = bisect_left(xs, x) - 1
+    t = (x - xs[i]) / (xs[i + 1] - xs[i])
+    return ys[i] + t * (ys[i + 1] - ys[i])
+
+
+def _u_value(diameter_mm, velocity_fps):
+    """未修正传热系数：只对流速区间两端的两列做管径插值"""
+    vs = _VELOCITIES
+    if velocity_fps <= vs[0]:
+        return _interp(diameter_mm, _DIAMETERS, _U_COLUMNS[0])
+    if velocity_fps >= vs[-1]:
+        return _interp(diameter_mm, _DIAMETERS, _U_COLUMNS[-1])
+    j = bisect_left(vs, velocity_fps) - 1
+    u0 = _interp(diameter_mm, _DIAMETERS, _U_COLUMNS[j])
+    u1 = _interp(diameter_mm, _DIAMETERS, _U_COLUMNS[j + 1])
+    t = (velocity_fps - vs[j]) / (vs[j + 1] - vs[j])
+    return u0 + t * (u1 - u0)
+
+
+# ---------- 各阶段代码片段（函数体内，d 为 InputData） ----------
+
+_STEAM = '''
+    p = d.steam_pressure
+    h = d.steam_enthalpy
+    flow_s = d.steam_mass_flow / 3600
+    if p <= 0:
+        raise ValueError(f"工作压力({float(p)} MPa)必须>0")
+    if h <= 0:
+        raise ValueError(f"蒸汽焓值({float(h)} kJ/kg)必须>0")
+    if flow_s <= 0:
+        raise ValueError(f"蒸汽流量({flow_s} kg/s)必须>0")
+    if p > 22.064:
+        raise Exception("饱和水计算失败：压力超过临界压力")
+    if p * 1000 < 1:
+        raise Exception("饱和水计算失败：压力过低")
+    if p <= 0.1:
+        t_sat = 10.1967 * (p ** 0.25) - 0.3667
+    elif p <= 1.0:
+        t_sat = 45.0 + 45.0 * log10(p * 10)
+    else:
+        t_sat = 100.0 + 50.0 * log10(p)
+    h_w = 4.2 * t_sat + 0.0015 * (t_sat ** 2)
+'''
+_STEAM_ROUND = '''
+    t_sat = round(t_sat, 3)
+    h_w = round(h_w, 3)
+    duty = round((h - h_w) * flow_s, 3)
+'''
+_STEAM_FULL = '''
+    duty = (h - h_w) * flow_s
+'''
+_STEAM_SAVE = '''
+    d.saturation_temp = t_sat
+    d.water_enthalpy = h_w
+    d.DUTY = duty
+'''
+
+_WATER = {
+    0: '''
+    cp = d.cp_water
+    rho = d.rho_water
+    rise = d.cooling_water_temp_rise
+    m_kg_s = duty / (cp * rise)
+    m3_h = (m_kg_s / rho) * 3600
+''',
+    1: '''
+    cp = d.cp_water
+    rho = d.rho_water
+    m3_h = d.water_flow_input
+    m_kg_s = (m3_h * rho) / 3600
+    rise = duty / (m_kg_s * cp)
+''',
+}
+_WATER_SAVE = '''
+    t_in = d.cooling_water_in_temp
+    t_out = t_in + rise
+    d.water_flow_kg_s = m_kg_s
+    d.water_flow_m3_h = m3_h
+    d.cooling_water_temp_rise = rise
+    d.cooling_water_out_temp = t_out
+'''
+
+_MATERIAL = '''
+    do = d.tube_diameter
+    wall = d.tube_wall_thickness
+    material = d.material
+    coeffs = MATERIALS.get(material.strip().lower())
+    if coeffs is None:
+        raise ValueError(f"未知材料：{{material}}")
+    th_in = wall / 25.4
+    if not (MIN_THICK <= th_in <= MAX_THICK):
+        raise ValueError(f"壁厚超出范围！允许范围：[{{MIN_THICK}}, {{MAX_THICK}}] 英寸")
+    mat = interp(th_in, THICKNESS, coeffs){round4_mat}
+    d.material_coefficient = mat
+    t_f = t_in * 9 / 5 + 32
+    if not (MIN_F <= t_f <= MAX_F):
+        raise ValueError(f"温度超出范围！°C范围：[{{MIN_C}}, {{MAX_C}}]，当前：{{t_in}}°C")
+    fw = interp(t_f, TEMP_FW, FW_COEFF){round4_fw}
+    d.water_correction_factor = fw
+'''
+
+_U = '''
+    v = d.velocity
+    if not (MIN_DIAM <= do <= MAX_DIAM):
+        raise ValueError(f"管径超出范围！允许范围：[{{MIN_DIAM}}, {{MAX_DIAM}}] mm")
+    v_fps = v * MPS_TO_FPS
+    if not (MIN_VEL_FPS <= v_fps <= MAX_VEL_FPS):
+        raise ValueError(f"流速超出范围！m/s范围：[{{MIN_VEL_MPS}}, {{MAX_VEL_MPS}}]")
+    u_btu = u_value(do, v_fps){round1_u}
+    u_metric = u_btu * 5.678
+    d.u_btu = u_btu
+    d.u_metric = u_metric
+'''
+
+_LMTD = '''
+    if not (t_sat > t_out > t_in):
+        raise ValueError("温度顺序错误！必须满足 t_sat > t_out > t_in")
+    if not (t_sat - t_out >= 2.8):
+        raise ValueError("终端温差太小！必须满足 t_sat - t_out >= 2.8°C")
+    dt1 = t_sat - t_in
+    dt2 = t_sat - t_out
+    if abs(dt1 - dt2) < 0.001:
+        lmtd_value = dt1
+    else:
+        lmtd_value = (t_out - t_in) / log(dt1 / dt2){round4_lmtd}
+    d.cooling_water_out_temp = t_out
+    d.LMTD = lmtd_value
+'''
+
+_CLEAN = {
+    'cleanliness': '''
+    clean = d.cleanliness_factor
+''',
+    'fouling': '''
+    f = d.fouling_factor
+    if f > 0:
+        do_m = do * 1e-3
+        di_m = do_m - 2 * wall * 1e-3
+        if di_m <= 0:
+            raise ValueError("壁厚过大，导致内径≤0")
+        clean = 1 / (1 + u_metric * fw * mat * f * (do_m / di_m))
+    else:
+        clean = d.cleanliness_factor
+''',
+}
+
+_AREA = '''
+    d.clean_factor_corrected = clean
+    if duty <= 0:
+        raise ValueError(f"热负荷({{duty}} kW)必须>0")
+    if lmtd_value <= 0:
+        raise ValueError(f"对数平均温差({{lmtd_value}} °C)必须>0")
+    if u_metric <= 0:
+        raise ValueError(f"未修正传热系数({{u_metric}})必须>0")
+    if fw <= 0:
+        raise ValueError(f"水温修正系数({{fw}})必须>0")
+    if mat <= 0:
+        raise ValueError(f"材料修正系数({{mat}})必须>0")
+    if clean <= 0:
+        raise ValueError(f"清洁系数({{clean}})必须>0")
+    area = 1000 * duty / (lmtd_value * u_metric * fw * mat * clean){round2_area}
+    d.surface_area = area
+    passes = d.passes
+'''
+
+_STRUCTURE = {
+    0: '''
+    design = d.design_surface_area
+    if design is None:
+        design = ceil(area{margin} / 50) * 50
+        d.design_surface_area = design
+    n_pass = int(passes)
+    if m3_h <= 0:
+        raise ValueError("体积流量必须>0")
+    if v <= 0:
+        raise ValueError("目标流速必须>0")
+    if wall <= 0:
+        raise ValueError("管壁厚度必须>0")
+    if do <= 2 * wall:
+        raise ValueError("外径必须大于2倍壁厚")
+    if n_pass < 1:
+        raise ValueError("流程数必须≥1")
+    di = (do - 2 * wall) * 1e-3
+    count = max(ceil((m3_h * M3_H_TO_M3_S / v) / (pi * (di / 2) ** 2) * n_pass), 1)
+    d.tube_count = count
+    if design <= 0:
+        raise ValueError("总换热面积必须>0")
+    length = max(1.0, floor(design / (pi * (do * 1e-3) * count) * 1000))
+    d.tube_length = length
+''',
+    1: '''
+    count = d.input_tube_count
+    length = d.input_tube_length
+    d.tube_count = count
+    d.tube_length = length
+    d.design_surface_area = pi * (do / 1000) * (length / 1000) * count
+{velocity}''',
+    2: '''
+    design = d.input_design_surface
+    count = d.input_tube_count
+    d.design_surface_area = design
+    d.tube_count = count
+    length = design / (pi * (do / 1000) * count) * 1000
+    d.tube_length = length
+{velocity}''',
+}
+_VELOCITY = '''
+    di = (do - 2 * wall) / 1000
+    v = ((m3_h / 3600) * passes) / (pi * (di / 2) ** 2 * count){round3_v}
+    d.velocity = v
+'''
+
+_SHEET = {
+    'formula': '''
+    pitch = d.tube_pitch
+    n_tube = int(count)
+    n_pass = int(passes)
+    if do <= 0:
+        sheet_error = "换热管外径必须>0"
+    elif n_tube < 1:
+        sheet_error = "换热管数量必须≥1"
+    elif n_pass < 1:
+        sheet_error = "流程数必须≥1"
+    elif pitch <= do:
+        sheet_error = "管间距必须大于管外径"
+    else:
+        sheet_error = None
+    if sheet_error is None:
+        sheet = ceil(sqrt(n_tube / 0.6) * (1 + 0.05 * n_pass) * pitch)
+    else:
+        print(f"计算管板外径失败：{sheet_error}")
+        sheet = None
+    d.tube_sheet_diameter = sheet
+''',
+    'layout': '''
+    try:
+        sheet = ceil(min_tube_sheet_diameter(do, int(count), int(passes), d.tube_pitch,
+                                             d.tube_layout_pattern))
+    except Exception as e:
+        print(f"计算管板外径失败：{e}")
+        sheet = None
+    d.tube_sheet_diameter = sheet
+''',
+    'none': '''
+    sheet = d.tube_sheet_diameter
+''',
+}
+
+_PIPES = '''
+    d.condensate_outlet_inner_diameter = int(ceil(
+        sqrt((4 * (flow_s / 1000.0)) / (pi * 1)) * 1000 / 50) * 50)
+    nozzle_flow = m_kg_s / d.cooling_water_nozzle_count
+    if nozzle_flow <= 0:
+        raise ValueError("质量流量必须>0")
+    if rho <= 0:
+        raise ValueError("流体密度必须>0")
+    d.cooling_water_nozzle_diameter = int(ceil(
+        sqrt((4 * (nozzle_flow / rho)) / (pi * 2.5)) * 1000 / 50) * 50)
+    if length and sheet:
+        d.tube_length_diameter_ratio = {ratio}
+'''
+
+_PRESSURE = '''
+    temp_c = (t_in + t_out) / 2
+    di_mm = do - 2 * wall
+    if di_mm <= 0:
+        raise ValueError("管内径必须>0")
+    if v <= 0:
+        raise ValueError("流速必须>0")
+    if length <= 0:
+        raise ValueError("管长必须>0")
+    if passes not in (1, 2, 4):
+        raise ValueError("流程数必须是1、2或4")
+    dpl = 28.72 * (v ** 1.75) / ((di_mm / 1000.0) ** 1.25)
+    rt = 1.0 - 0.002 * (temp_c - 20)
+    rt = max(0.9, min(1.1, rt))
+    dpa = (length / 1000.0) * passes * dpl * rt
+    pb = 0.5 * (v ** 2) * passes * 0.1
+    pc = 0.3 * (v ** 2) * passes * 0.1
+    pd = 0.2 * (v ** 2) * passes * 0.1
+    d.total_pressure_drop = 1.2 * 0.001 * round(dpa + pb + pc + pd, 7)
+    d.terminal_temp_diff = t_sat - t_out
+    return d
+'''
+
+_NAMESPACE = {
+    'ceil': math.ceil, 'floor': math.floor, 'log': math.log, 'log10': math.log10,
+    'sqrt': math.sqrt, 'pi': math.pi,
+    'interp': _interp, 'u_value': _u_value, 'MATERIALS': _MATERIALS,
+    'THICKNESS': _THICKNESS, 'MIN_THICK': _MIN_THICK, 'MAX_THICK': _MAX_THICK,
+    'TEMP_FW': _TEMP_FW, 'FW_COEFF': _FW_COEFF, 'MIN_F': _MIN_F, 'MAX_F': _MAX_F,
+    'MIN_C': _MIN_C, 'MAX_C': _MAX_C,
+    'MIN_DIAM': _MIN_DIAM, 'MAX_DIAM': _MAX_DIAM, 'MIN_VEL_FPS': _MIN_VEL_FPS,
+    'MAX_VEL_FPS': _MAX_VEL_FPS, 'MIN_VEL_MPS': _MIN_VEL_MPS, 'MAX_VEL_MPS': _MAX_VEL_MPS,
+    'MPS_TO_FPS': MPS_TO_FPS, 'M3_H_TO_M3_S': M3_H_TO_M3_S,
+}
+
+# 已编译计划缓存：形状 -> CasePlan
+_PLANS = {}
+
+
+class CasePlan:
+    """编译后的单工况计算计划，调用方式 plan(data) -> data"""
+
+    def __init__(self, key, source, function):
+        self.key = key              # (计算模式, 结构模式, 给定的可选字段, 精度策略)
+        self.source = source        # 生成的函数源码（便于检查）
+        self._function = function
+
+    def __call__(self, data):
+        return self._function(data)
+
+
+def shape_of(data):
+    """
+    工况的计划形状
+
+    返回:
+        tuple: (计算模式, 结构模式, 给定的可选字段)
+    """
+    provided = {k for k in ('cleanliness_factor', 'fouling_factor', 'tube_pitch') if getattr(data, k) is not None}
+    if data.tube_layout_pattern:
+        provided.add('tube_layout_pattern')
+    calc_mode = 0 if data.calculation_mode == 0 else 1
+    struct_mode = data.structure_mode if data.structure_mode in (0, 1) else 2
+    return calc_mode, struct_mode, frozenset(provided)
+
+
+def compile_plan(calculation_mode=0, structure_mode=0, provided=()):
+    """
+    编译指定形状的计算计划
+
+    参数:
+        calculation_mode: 计算模式（0 输入温升，1 输入水量）
+        structure_mode: 结构模式（0 自动，1 给定管数管长，2 固定面积）
+        provided: 给定值（非 None）的可选字段：cleanliness_factor、fouling_factor、
+                  tube_pitch、tube_layout_pattern；其余必要字段由调用方保证给定。
+                  不含 tube_pitch 时不计算管板外径与长径比（同 calculate_all()）
+    返回:
+        CasePlan（按形状与当前精度策略缓存）
+    说明:
+        计划不再对输入做 float() 转换，数值字段须为 int/float。
+    """
+    if calculation_mode not in _CALC_FIELDS:
+        raise ValueError(f"无效的计算模式：{calculation_mode}")
+    if structure_mode not in _STRUCT_FIELDS:
+        raise ValueError(f"无效的结构模式：{structure_mode}")
+    provided = frozenset(provided)
+    unknown = provided - set(_OPTIONAL_FIELDS)
+    if unknown:
+        raise ValueError(f"无效的可选字段：{', '.join(sorted(unknown))}")
+    if not provided & {'cleanliness_factor', 'fouling_factor'}:
+        raise ValueError("缺少必要输入参数：cleanliness_factor 或 fouling_factor")
+
+    compat = precision.compat
+    key = (calculation_mode, structure_mode, provided, precision.get_precision())
+    plan = _PLANS.get(key)
+    if plan is not None:
+        return plan
+
+    def rounding(digits):
+        return f'\n    {{0}} = round({{0}}, {digits})'.format if compat else (lambda name: '')
+
+    fouling = 'fouling_factor' in provided
+    if 'tube_pitch' not in provided:
+        sheet = 'none'
+    else:
+        sheet = 'layout' if 'tube_layout_pattern' in provided else 'formula'
+    parts = [
+        'def _plan(d):',
+        _STEAM, _STEAM_ROUND if compat else _STEAM_FULL, _STEAM_SAVE,
+        _WATER[calculation_mode], _WATER_SAVE,
+        _MATERIAL.format(round4_mat=rounding(4)('mat'), round4_fw=rounding(4)('fw')),
+        _U.format(round1_u=rounding(1)('u_btu')),
+        _LMTD.format(round4_lmtd=rounding(4)('lmtd_value')),
+        _CLEAN['fouling' if fouling else 'cleanliness'],
+        _AREA.format(round2_area=rounding(2)('area')),
+        _STRUCTURE[structure_mode].format(
+            margin='' if fouling else ' * (1 + 0.05)',
+            velocity=_VELOCITY.format(round3_v=rounding(3)('v'))),
+        _SHEET[sheet],
+        _PIPES.format(ratio='round(length / sheet, 2)' if compat else 'length / sheet'),
+        _PRESSURE,
+    ]
+    source = ''.join(parts)
+
+    namespace = dict(_NAMESPACE)
+    if sheet == 'layout':
+        from .tube_layout import min_tube_sheet_diameter
+        namespace['min_tube_sheet_diameter'] = min_tube_sheet_diameter
+    exec(compile(source, f'<plan {key[:2]}>', 'exec'), namespace)
+    plan = CasePlan(key, source, namespace['_plan'])
+    _PLANS[key] = plan
+    return plan
+
+
+def plan_for(data):
+    """按工况形状取（必要时编译）计算计划，并检查必要字段"""
+    calc_mode, struct_mode, provided = shape_of(data)
+    required = _COMMON_FIELDS + _CALC_FIELDS.get(calc_mode, ()) + _STRUCT_FIELDS.get(struct_mode, ())
+    missing = [k for k in required if getattr(data, k) is None]
+    if missing:
+        raise ValueError(f"缺少必要输入参数：{', '.join(missing)}")
+    return compile_plan(calc_mode, struct_mode, provided)
+
+
+def calculate_fast(data):
+    """
+    单工况快速计算（结果与 CondenserCalculator(data).calculate_all() 一致）
+
+    同一形状的大量调用建议先 plan = plan_for(data)，再对每个工况直接调用 plan(d)。
+    """
+    return plan_for(data)(data)
+
+
+def calculate_many(cases, progress=None, cancel=None, chunk_size=1000):
+    """
+    逐工况快速计算一组工况（纯 Python，不需要 numpy），同形状的工况共用计算计划；
+    计划不支持的字段组合退回 CondenserCalculator，各工况结果与单工况计算一致
+
+    参数:
+        cases: InputData 序列（结果写回各自对象）
+        progress: 进度回调 callback(ProgressInfo)，每 chunk_size 个工况之后按间隔调用
+        cancel: CancelToken，每 chunk_size 个工况之间检查，取消时抛出 CancelledError
+        chunk_size: 报告进度与检查取消的间隔工况数
+    返回:
+        list: 各工况计算后的 InputData，输入无效或计算失败的工况为 None
+    """
+    if chunk_size < 1:
+        raise ValueError("分块大小必须≥1")
+    tracker = Progress(len(cases), progress, cancel)
+    tracker.check()
+    results = []
+    for start in range(0, len(cases), chunk_size):
+        chunk = cases[start:start + chunk_size]
+        failed = 0
+        for data in chunk:
+            try:
+                try:
+                    plan = plan_for(data)
+                except ValueError:
+                    # 缺少计划的必要字段：退回 calculate_all()，由其给出结果或错误
+                    results.append(CondenserCalculator(data).calculate_all())
+                else:
+                    results.append(plan(data))
+            except Exception:
+                # 蒸汽阶段与 steam_duty 一致，压力超出饱和计算范围时抛出 Exception
+                results.append(None)
+                failed += 1
+        tracker.update(len(chunk), failed)
+    tracker.finish()
+    return results
+
+
+if __name__ == "__main__":
+    import time
+
+    from .data_model import InputData
+
+    base = dict(steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+                tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+                material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+                cooling_water_in_temp=25, cooling_water_temp_rise=8,
+                cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85)
+    cases = [InputData.from_dict(dict(base, velocity=1.0 + 0.0001 * i)) for i in range(20000)]
+    plan = plan_for(cases[0])
+
+    t0 = time.perf_counter()
+    for d in cases:
+        CondenserCalculator(InputData.from_dict(d.to_dict())).calculate_all()
+    t1 = time.perf_counter()
+    for d in cases:
+        plan(InputData.from_dict(d.to_dict()))
+    t2 = time.perf_counter()
+    copy_cost = time.perf_counter()
+    for d in cases:
+        InputData.from_dict(d.to_dict())
+    copy_cost = time.perf_counter() - copy_cost
+    n = len(cases)
+    scalar = (t1 - t0 - copy_cost) / n * 1e6
+    fast = (t2 - t1 - copy_cost) / n * 1e6
+    print(f"calculate_all: {scalar:.1f} µs/工况，编译计划: {fast:.1f} µs/工况，加速 {scalar / fast:.1f} 倍")
+
+    # 混合输入一致性检查：模式、管间距（含未给定）、排管方式、污垢热阻与越界输入随机组合
+    import contextlib
+    import io
+    import random
+
+    def outcome(calculate, values):
+        d = InputData.from_dict(values)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return calculate(d).to_dict()
+        except Exception as e:
+            return type(e).__name__
+
+    rng = random.Random(0)
+    mismatched = failed = 0
+    total = 3000
+    for _ in range(total):
+        values = dict(base, velocity=rng.choice([0.5, 1.2, 2.0, 2.5, 3.0]),
+                      steam_pressure=rng.choice([0.0005, 0.12, 0.12, 0.3]),
+                      tube_pitch=rng.choice([None, 20, 32, 40]),
+                      tube_layout_pattern=rng.choice([None, 'triangular', 'square']),
+                      calculation_mode=rng.choice([0, 1]), structure_mode=rng.choice([0, 1, 2]),
+                      water_flow_input=rng.uniform(40000, 100000),
+                      input_tube_count=rng.randint(8000, 20000), input_tube_length=rng.uniform(6000, 12000),
+                      input_design_surface=rng.uniform(5000, 12000))
+        if rng.random() < 0.3:
+            values['fouling_factor'] = rng.choice([0.0, 0.00009])
+        expected = outcome(lambda d: CondenserCalculator(d).calculate_all(), values)
+        mismatched += expected != outcome(calculate_fast, values)
+        failed += isinstance(expected, str)
+    print(f"混合输入 {total} 个工况（calculate_all 失败 {failed} 个）：与 calculate_all 不一致 {mismatched} 个")
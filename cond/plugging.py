@@ -0,0 +1,202 @@
+"""
+堵管影响分析
+凝汽器运行中陆续堵管，有效管数减少：管内流速升高、水阻增大，
+传热面积减少（流速升高又使传热系数增大），背压随之变化。本模块在
+结构模式1（给定管数、管长）的计算路径上整批分析 0~15% 的堵管率：
+- 每个流程作为一个单流程工况（passes=1，管数为该流程的有效管数）计算，
+  各流程串联：水阻相加，传热按 Σ U_i·A_i 合成（凝结侧温度均匀，各流程 NTU 相加），
+  因此堵管可以均匀分布在各流程，也可以集中在某一流程；
+- 与包络选型相同，先由有效管数求实际流速，再按实际流速重算传热系数与所需面积；
+- 全部 (分布方式, 堵管率, 流程) 组合为一个批次计算；
+- 背压按固定几何校核（见 cooling_tower.rated_saturation_temp），进口水温与
+  蒸汽流量取设计工况；
+- 对每种分布方式给出约束开始不满足前的最大堵管率及首先不满足的约束。
+"""
+import numpy as np
+
+from .batch import calculate_batch
+from .columns import INPUT_FIELDS, MODE_FIELDS, as_columns
+from .cooling_tower import rated_saturation_temp, saturation_pressure
+from .validation import ERROR_CODES
+
+# 堵管分布方式：uniform 各流程均匀；first_pass 全部集中在第一流程（进水侧冲蚀）
+PATTERNS = ('uniform', 'first_pass')
+DEFAULT_FRACTIONS = np.round(np.arange(0, 0.15 + 1e-9, 0.0025), 4)
+
+
+class PluggingResult:
+    """
+    堵管分析结果
+
+    fractions: 堵管率数组
+    patterns: 分布方式 -> 各堵管率下的结果字段数组
+              (plugged_tubes, velocity（最大流程流速）, pressure_drop, u_metric（等效）,
+               required_area, available_area, area_margin, saturation_temp, back_pressure,
+               error_code, passed)
+    failures: 分布方式 -> 各堵管率下不满足的约束名称列表
+    limits: 分布方式 -> {'fraction': 全部约束满足的最大堵管率（0% 即不满足时为 None）,
+                        'constraint': 超过该堵管率后首先不满足的约束（全部满足时为 None）}
+    """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
+def _split(total, passes):
+    """把整数根数尽量均匀地分到各流程 [..., 流程数]"""
+    total = np.asarray(total, dtype=np.int64)[..., None]
+    return total // passes + (np.arange(passes) < total % passes)
+
+
+def _pass_counts(tube_count, passes, plugged, pattern):
+    """各流程有效管数（整数）[堵管率数, 流程数]"""
+    if pattern == 'uniform':
+        # 堵管先落在管数较多的流程，剩余管数在各流程间仍尽量均匀
+        return _split(tube_count - plugged, passes)
+    per_pass = np.repeat(_split(tube_count, passes)[None, :], plugged.size, axis=0)
+    if pattern == 'first_pass':
+        per_pass[:, 0] -= plugged
+    else:
+        raise ValueError(f"无效的堵管分布方式：{pattern}")
+    return per_pass
+
+
+def plugging_analysis(design, fractions=DEFAULT_FRACTIONS, patterns=PATTERNS, max_pressure_drop=None,
+                      max_velocity=None, max_back_pressure=None):
+    """
+    堵管影响分析
+
+    参数:
+        design: 已完成 calculate_all() 的设计工况 InputData
+        fractions: 堵管率序列（0~1），按管数取整为堵管根数
+        patterns: 堵管分布方式（见 PATTERNS）
+        max_pressure_drop: 水阻上限 (kPa)
+        max_velocity: 管内流速上限 (m/s)，如材料的冲蚀限值
+        max_back_pressure: 背压上限 (MPa)
+    返回:
+        PluggingResult
+    """
+    fractions = np.asarray(fractions, dtype=float)
+    if fractions.size == 0 or (fractions < 0).any() or (fractions >= 1).any():
+        raise ValueError("堵管率必须在 [0, 1) 范围内")
+    tube_count = int(design.tube_count)
+    passes = int(design.passes)
+    plugged = np.round(fractions * tube_count).astype(np.int64)
+    counts = {pattern: _pass_counts(tube_count, passes, plugged, pattern) for pattern in patterns}
+    for pattern, c in counts.items():
+        if (c < 1).any():
+            raise ValueError(f"堵管率过大：{pattern} 分布下有流程已无可用管")
+
+    # 全部 (分布方式, 堵管率, 流程) 组合为一个批次，每行为一个单流程工况
+    rows = np.concatenate([c.ravel() for c in counts.values()])
+    values = design.to_dict()
+    base = {k: values.get(k) for k in INPUT_FIELDS + MODE_FIELDS + ('material',)}
+    columns = as_columns(dict(base, passes=1, calculation_mode=1, structure_mode=1,
+                              water_flow_input=design.water_flow_m3_h,
+                              input_tube_count=rows, input_tube_length=float(design.tube_length),
+                              velocity=np.full(rows.size, float(design.velocity))))
+    # 先求实际流速，再按实际流速重算传热系数
+    columns['velocity'] = calculate_batch(columns)['velocity']
+    r = calculate_batch(columns)
+
+    t_in = float(design.cooling_water_in_temp)
+    steam_flow = float(design.steam_mass_flow) / 3600
+    mcp = float(design.water_flow_kg_s) * float(design.cp_water)
+    margin = 1.05 if design.fouling_factor is None else 1.0
+    results, failures, limits = {}, {}, {}
+    offset = 0
+    for pattern in patterns:
+        size = fractions.size * passes
+
+        def per_pass(name):
+            return r[name][offset:offset + size].reshape(fractions.size, passes)
+
+        area = per_pass('design_surface_area')
+        u = per_pass('u_metric')
+        available = area.sum(axis=1)
+        u_eff = (u * area).sum(axis=1) / available
+        # 各行所需面积与该流程的 U 成反比：合成后 A_req = A / Σ(A_i / A_req,i)
+        required = available / (area / per_pass('surface_area')).sum(axis=1)
+        codes = np.bitwise_or.reduce(per_pass('error_code'), axis=1)
+        u_base = u_eff * r['material_coefficient'][offset] * r['clean_factor_corrected'][offset]
+        t_sat = rated_saturation_temp(t_in, u_base, available, mcp, steam_flow=steam_flow,
+                                      steam_enthalpy=float(design.steam_enthalpy))[0]
+        fields = {
+            'plugged_tubes': plugged,
+            'velocity': per_pass('velocity').max(axis=1),
+            'pressure_drop': per_pass('total_pressure_drop').sum(axis=1),
+            'u_metric': u_eff,
+            'required_area': required * margin,
+            'available_area': available,
+            'area_margin': available / (required * margin) - 1,
+            'saturation_temp': t_sat,
+            'back_pressure': saturation_pressure(t_sat),
+            'error_code': codes,
+        }
+        offset += size
+
+        with np.errstate(invalid='ignore'):
+            checks = {name: (codes & bit) != 0 for name, (bit, _) in ERROR_CODES.items()}
+            checks['area'] = ~(fields['area_margin'] >= 0)
+            if max_pressure_drop is not None:
+                checks['pressure_drop'] = ~(fields['pressure_drop'] <= max_pressure_drop)
+            if max_velocity is not None:
+                checks['max_velocity'] = ~(fields['velocity'] <= max_velocity)
+            if max_back_pressure is not None:
+                checks['back_pressure'] = ~(fields['back_pressure'] <= max_back_pressure)
+        checks = {name: mask for name, mask in checks.items() if mask.any()}
+        failed = [[name for name, mask in checks.items() if mask[i]] for i in range(fractions.size)]
+        fields['passed'] = np.array([not f for f in failed])
+
+        # 按堵管率从小到大找第一个不满足约束的点
+        order = np.argsort(fractions, kind='stable')
+        bad = [i for i in order if failed[i]]
+        if not bad:
+            limit = {'fraction': float(fractions.max()), 'constraint': None}
+        else:
+            first = bad[0]
+            ok = fractions[order][fractions[order] < fractions[first]]
+            limit = {'fraction': float(ok.max()) if ok.size else None, 'constraint': failed[first][0]}
+        results[pattern], failures[pattern], limits[pattern] = fields, failed, limit
+
+    return PluggingResult(fractions=fractions, patterns=results, failures=failures, limits=limits)
+
+
+if __name__ == "__main__":
+    import time
+
+    from .calculator import CondenserCalculator
+    from .data_model import InputData
+
+    design = CondenserCalculator(InputData.from_dict(dict(
+        steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+        tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+        material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+        cooling_water_in_temp=25, cooling_water_temp_rise=8,
+        cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85))).calculate_all()
+
+    t0 = time.perf_counter()
+    res = plugging_analysis(design, max_pressure_drop=110, max_velocity=2.4)
+    print(f"{res.fractions.size} 个堵管率 × {len(res.patterns)} 种分布：{(time.perf_counter() - t0) * 1000:.1f} ms")
+    for pattern, f in res.patterns.items():
+        print(f"\n{pattern}：{res.limits[pattern]}")
+        for i in range(0, res.fractions.size, 10):
+            print(f"  {res.fractions[i]:6.2%} 堵 {f['plugged_tubes'][i]:5.0f} 根：流速 {f['velocity'][i]:.3f} m/s，"
+                  f"水阻 {f['pressure_drop'][i]:6.2f} kPa，面积裕量 {f['area_margin'][i]:+.2%}，"
+                  f"背压 {f['back_pressure'][i] * 1000:.2f} kPa  {res.failures[pattern][i] or ''}")
+
+    # 均匀堵管与直接按结构模式1计算（多流程、总有效管数）对比，差别仅来自各流程管数取整
+    check = CondenserCalculator(InputData.from_dict(dict(
+        design.to_dict(), structure_mode=1, calculation_mode=1, water_flow_input=design.water_flow_m3_h,
+        input_tube_count=design.tube_count - res.patterns['uniform']['plugged_tubes'][-1],
+        input_tube_length=design.tube_length))).calculate_all()
+    check = CondenserCalculator(InputData.from_dict(dict(check.to_dict(), velocity=check.velocity))).calculate_all()
+    uniform = res.patterns['uniform']
+    print("\n均匀堵管 15% 与结构模式1直接计算的相对偏差：流速",
+          f"{uniform['velocity'][-1] / check.velocity - 1:+.2e}，水阻",
+          f"{uniform['pressure_drop'][-1] / check.total_pressure_drop - 1:+.2e}，所需面积",
+          f"{uniform['required_area'][-1] / (check.surface_area * 1.05) - 1:+.2e}")
@@ -0,0 +1,55 @@
+"""
+计算精度策略
+- 'full'（默认）：各阶段计算保留完整浮点精度，只在显示时按格式舍入，
+  响应曲线连续，便于求根与优化；
+- 'compat'：兼容旧版本，各阶段按原有位数舍入
+  （饱和温度/焓/热负荷3位、U值1位、LMTD 4位、面积2位、反算流速3位等）。
+
+策略对整个计算引擎生效（标量阶段函数、CondenserCalculator 与数组版本）。
+"""
+from contextlib import contextmanager
+
+FULL = 'full'
+COMPAT = 'compat'
+
+# 当前是否按旧版本位数舍入（阶段函数直接读取此标志）
+compat = False
+
+
+def set_precision(mode):
+    """
+    设置精度策略
+
+    参数:
+        mode: 'full' 或 'compat'
+    """
+    global compat
+    if mode not in (FULL, COMPAT):
+        raise ValueError(f"无效的精度策略：{mode}")
+    compat = mode == COMPAT
+
+
+def get_precision():
+    """返回当前精度策略"""
+    return COMPAT if compat else FULL
+
+
+@contextmanager
+def precision(mode):
+    """临时切换精度策略"""
+    previous = get_precision()
+    set_precision(mode)
+    try:
+        yield
+    finally:
+        set_precision(previous)
+
+
+if __name__ == "__main__":
+    # 以 python -m 运行时本模块为 __main__，需使用包内的同一个模块实例
+    from . import precision as policy
+    from .lmtd import lmtd
+
+    print(policy.get_precision(), lmtd(45.0, 25.0, 33.0))
+    with policy.precision(policy.COMPAT):
+        print(policy.get_precision(), lmtd(45.0, 25.0, 33.0))
@@ -0,0 +1,166 @@
+"""
+进度报告与协作式取消
+长时间的批量计算、扫描与优化按块执行，每完成一块向 Progress 报告一次：
+- 回调按时间节流（默认至多每 0.5 s 一次，另在开始与结束时各一次），
+  块之间只做一次计时与计数，开销相对整块计算可以忽略；
+- 报告已处理、失败（未通过校验）与剩余工况数、吞吐量和预计剩余时间；
+- CancelToken 可在任意线程（界面、作业调度器）中取消，计算在块之间检查，
+  已完成的块保留（磁盘扫描结果可从检查点续算），随后抛出 CancelledError。
+"""
+import threading
+import time
+from concurrent.futures import CancelledError
+
+
+class CancelToken:
+    """取消令牌：调用 cancel() 后，使用该令牌的计算在下一个块边界处停止"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """请求取消（可从任意线程调用）"""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """已请求取消时抛出 CancelledError"""
+        if self._event.is_set():
+            raise CancelledError("计算已取消")
+
+
+class ProgressInfo:
+    """进度快照"""
+
+    def __init__(self, total, processed, failed, elapsed, rate, finished=False):
+        self.total = total                  # 工况（或代）总数
+        self.processed = processed          # 已处理数（含续算前已完成的部分）
+        self.failed = failed                # 其中失败数
+        self.remaining = total - processed
+        self.elapsed = elapsed              # 本次运行已用时间 (s)
+        self.throughput = rate              # 本次运行的吞吐量 (个/s)
+        # 预计剩余时间 (s)，尚无吞吐量数据时为 None
+        if self.remaining <= 0:
+            self.eta = 0.0
+        else:
+            self.eta = self.remaining / rate if rate > 0 else None
+        self.finished = finished
+
+    @property
+    def fraction(self):
+        """完成比例 0~1"""
+        return self.processed / self.total if self.total else 1.0
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__, fraction=self.fraction)
+
+    def __str__(self):
+        eta = '-' if self.eta is None else f'{self.eta:.1f} s'
+        return (f"{self.processed:,}/{self.total:,}（失败 {self.failed:,}），"
+                f"{self.throughput:,.0f} 个/s，剩余 {eta}")
+
+
+class Progress:
+    """
+    进度报告器
+
+    计算循环每完成一块调用 update()；回调与取消检查都在这里，
+    未给回调与令牌时 update() 只做计数。
+    """
+
+    def __init__(self, total, callback=None, cancel=None, interval=0.5, done=0, failed=0):
+        """
+        参数:
+            total: 总数
+            callback: 回调 callback(ProgressInfo)，None 为不报告
+            cancel: CancelToken，None 为不可取消
+            interval: 回调最小间隔 (s)
+            done: 开始前已完成的数量（续算），不计入吞吐量
+            failed: 其中失败数
+        """
+        self.total = int(total)
+        self.callback = callback
+        self.cancel = cancel
+        self.interval = interval
+        self.processed = int(done)
+        self.failed = int(failed)
+        self._initial = self.processed
+        self._start = time.monotonic()
+        self._last = self._start
+        self._finished = False
+        if callback is not None:
+            callback(self.snapshot())
+
+    def check(self):
+        """已请求取消时抛出 CancelledError"""
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def snapshot(self):
+        """当前进度 ProgressInfo"""
+        elapsed = time.monotonic() - self._start
+        rate = (self.processed - self._initial) / elapsed if elapsed > 0 else 0.0
+        return ProgressInfo(self.total, self.processed, self.failed, elapsed, rate, self._finished)
+
+    def update(self, processed, failed=0):
+        """
+        记录新完成的数量，到达间隔时调用回调，并检查取消
+
+        参数:
+            processed: 本次新完成的数量
+            failed: 其中失败数
+        """
+        self.processed += int(processed)
+        self.failed += int(failed)
+        if self.callback is not None:
+            now = time.monotonic()
+            if now - self._last >= self.interval:
+                self._last = now
+                self.callback(self.snapshot())
+        self.check()
+
+    def finish(self):
+        """结束：无论间隔如何都报告一次最终进度"""
+        self._finished = True
+        if self.callback is not None:
+            self.callback(self.snapshot())
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    from .batch import calculate_batch
+    from .columns import as_columns
+
+    n = 2_000_000
+    rng = np.random.default_rng(0)
+    cols = as_columns(dict(
+        steam_pressure=rng.uniform(0.008, 0.3, n), steam_mass_flow=rng.uniform(2e5, 9e5, n),
+        steam_enthalpy=2400, tube_diameter=rng.choice([19.05, 25.4, 31.75], n),
+        tube_wall_thickness=0.711, tube_pitch=40, material='SS TP 304',
+        passes=2, cooling_water_nozzle_count=2, cooling_water_in_temp=rng.uniform(-5, 30, n),
+        cooling_water_temp_rise=8, cp_water=4.179, rho_water=997, velocity=rng.uniform(1.0, 3.0, n),
+        cleanliness_factor=0.85))
+
+    t0 = time.perf_counter()
+    plain = calculate_batch(cols)
+    t1 = time.perf_counter()
+    reports = []
+    tracked = calculate_batch(cols, chunk_size=100_000, progress=reports.append, cancel=CancelToken())
+    t2 = time.perf_counter()
+    same = all(np.array_equal(plain[k], tracked[k], equal_nan=True) for k in plain)
+    print(f"{n:,} 工况：不报告进度 {t1 - t0:.2f} s，分块报告进度 {t2 - t1:.2f} s，结果一致：{same}")
+    for info in reports:
+        print("  ", info)
+
+    # 从另一个线程取消（如界面上的取消按钮）
+    token = CancelToken()
+    threading.Timer(0.3, token.cancel).start()
+    try:
+        calculate_batch(cols, chunk_size=100_000, progress=print, cancel=token)
+    except CancelledError as e:
+        print("已取消：", e)
@@ -0,0 +1,338 @@
+"""
+项目工况库
+用本地 SQLite 保存各项目的工况输入与计算结果：
+- 每个工况一行，输入以 JSON 保存，计算结果每个字段一列，关键结果建索引；
+- 打开项目只读取工况名称，工况数据在访问时才加载；
+- 输入变化的工况标记为待重算，可整批用向量化批量引擎重算（含给定排管方式的工况）；
+- 按结果字段过滤（如 total_pressure_drop > 60）走索引，毫秒级返回。
+"""
+import json
+import sqlite3
+import time
+
+from .batch import calculate_batch
+from .columns import INPUT_FIELDS, MODE_FIELDS, OUTPUT_FIELDS, as_columns, inputs_from_columns
+from .data_model import InputData
+from .validation import FATAL_MASK
+
+# 建索引的关键结果字段
+INDEXED_OUTPUTS = ('total_pressure_drop', 'design_surface_area', 'tube_count',
+                   'terminal_temp_diff', 'tube_length_diameter_ratio', 'velocity')
+_STORED_KEYS = INPUT_FIELDS + MODE_FIELDS + ('material', 'tube_layout_pattern')
+_OPERATORS = {'gt': '>', 'ge': '>=', 'lt': '<', 'le': '<=', 'eq': '=', 'ne': '!='}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS conditions (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    name TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    stale INTEGER NOT NULL DEFAULT 1,
+    error_code INTEGER,
+    updated_at REAL NOT NULL,
+    {outputs},
+    UNIQUE (project_id, name)
+);
+CREATE INDEX IF NOT EXISTS idx_conditions_stale ON conditions(stale) WHERE stale = 1;
+{indexes}
+""".format(
+    outputs=',\n    '.join(f'{name} REAL' for name in OUTPUT_FIELDS),
+    indexes='\n'.join(f'CREATE INDEX IF NOT EXISTS idx_conditions_{name} ON conditions({name});'
+                      for name in INDEXED_OUTPUTS),
+)
+
+
+def _inputs_json(data, calculated):
+    """
+    工况输入 -> JSON
+
+    calculate_all() 会覆盖两个输入字段：计算模式1的温升改为由水量推出的值
+    （该模式下温升不是输入，保存为空），结构模式1/2的流速改为由管数反算的值
+    （原流速用于计算传热系数，无法还原，须另外给出计算前的输入）。
+    """
+    inputs = {k: getattr(data, k) for k in _STORED_KEYS}
+    if calculated:
+        if data.structure_mode in (1, 2):
+            raise ValueError(f"工况 {data.working_condition} 已计算（结构模式{data.structure_mode}），"
+                             f"流速已被反算值覆盖，须同时给出计算前的输入")
+        if data.calculation_mode == 1:
+            inputs['cooling_water_temp_rise'] = None
+    return json.dumps(inputs, ensure_ascii=False)
+
+
+class ProjectStore:
+    """SQLite 工况库"""
+
+    def __init__(self, path):
+        """
+        参数:
+            path: 数据库文件路径（':memory:' 为内存库）
+        """
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 写入 ----------
+
+    def _project_id(self, name):
+        self.conn.execute('INSERT OR IGNORE INTO projects(name) VALUES (?)', (name,))
+        return self.conn.execute('SELECT id FROM projects WHERE name = ?', (name,)).fetchone()[0]
+
+    def save_conditions(self, items, inputs=None):
+        """
+        批量保存工况（按 项目名称+工况名称 覆盖）
+
+        已计算的工况（DUTY 不为 None）连同结果一起保存；未计算的工况
+        结果清空并标记为待重算。保存的输入须是计算前的输入（重算时据此计算），
+        结构模式1/2的已计算工况流速已被覆盖，须由 inputs 给出计算前的输入。
+
+        参数:
+            items: InputData 序列，须设置 project_name 与 working_condition
+            inputs: 与 items 一一对应的计算前 InputData 序列，None 为取 items 本身的输入
+        返回:
+            int: 保存的工况数
+        """
+        items = list(items)
+        if inputs is None:
+            inputs = [None] * len(items)
+        else:
+            inputs = list(inputs)
+            if len(inputs) != len(items):
+                raise ValueError("计算前的输入与工况数量不一致")
+        now = time.time()
+        project_ids = {}
+        rows = []
+        for data, original in zip(items, inputs):
+            if not data.project_name or not data.working_condition:
+                raise ValueError("工况必须包含项目名称和工况名称")
+            if data.project_name not in project_ids:
+                project_ids[data.project_name] = self._project_id(data.project_name)
+            calculated = data.DUTY is not None
+            outputs = [getattr(data, k) if calculated else None for k in OUTPUT_FIELDS]
+            stored = _inputs_json(data, calculated) if original is None else _inputs_json(original, False)
+            rows.append([project_ids[data.project_name], data.working_condition,
+                         stored, 0 if calculated else 1, now] + outputs)
+
+        placeholders = ', '.join('?' * (5 + len(OUTPUT_FIELDS)))
+        columns = ', '.join(OUTPUT_FIELDS)
+        updates = ', '.join(f'{k} = excluded.{k}' for k in ('inputs', 'stale', 'updated_at') + OUTPUT_FIELDS)
+        with self.conn:
+            self.conn.executemany(
+                f'INSERT INTO conditions(project_id, name, inputs, stale, updated_at, {columns}) '
+                f'VALUES ({placeholders}) '
+                f'ON CONFLICT(project_id, name) DO UPDATE SET {updates}, error_code = NULL',
+                rows)
+        return len(rows)
+
+    def save_condition(self, data, inputs=None):
+        """保存单个工况（inputs 为计算前的 InputData，见 save_conditions）"""
+        return self.save_conditions([data], None if inputs is None else [inputs])
+
+    def mark_stale(self, project=None):
+        """将项目（默认全部）的工况标记为待重算"""
+        with self.conn:
+            if project is None:
+                cur = self.conn.execute('UPDATE conditions SET stale = 1')
+            else:
+                cur = self.conn.execute(
+                    'UPDATE conditions SET stale = 1 WHERE project_id = '
+                    '(SELECT id FROM projects WHERE name = ?)', (project,))
+        return cur.rowcount
+
+    def delete_condition(self, project, condition):
+        with self.conn:
+            self.conn.execute(
+                'DELETE FROM conditions WHERE name = ? AND project_id = '
+                '(SELECT id FROM projects WHERE name = ?)', (condition, project))
+
+    # ---------- 读取 ----------
+
+    def projects(self):
+        """全部项目名称"""
+        return [r[0] for r in self.conn.execute('SELECT name FROM projects ORDER BY name')]
+
+    def condition_names(self, project):
+        """项目下的工况名称（只读名称，不加载工况数据）"""
+        return [r[0] for r in self.conn.execute(
+            'SELECT c.name FROM conditions c JOIN projects p ON p.id = c.project_id '
+            'WHERE p.name = ? ORDER BY c.name', (project,))]
+
+    def _row_to_data(self, project, name, inputs, outputs):
+        data = InputData.from_dict(json.loads(inputs))
+        data.project_name = project
+        data.working_condition = name
+        for key, value in zip(OUTPUT_FIELDS, outputs):
+            if value is not None:
+                setattr(data, key, int(value) if key == 'tube_count' else value)
+        return data
+
+    def load(self, project, condition):
+        """
+        加载单个工况（含计算结果）
+
+        返回:
+            InputData 或 None
+        """
+        row = self.conn.execute(
+            f'SELECT c.inputs, {", ".join("c." + k for k in OUTPUT_FIELDS)} '
+            'FROM conditions c JOIN projects p ON p.id = c.project_id '
+            'WHERE p.name = ? AND c.name = ?', (project, condition)).fetchone()
+        if row is None:
+            return None
+        return self._row_to_data(project, condition, row[0], row[1:])
+
+    def iter_conditions(self, project):
+        """逐个加载项目下的工况（游标迭代，不一次性读入内存）"""
+        cur = self.conn.execute(
+            f'SELECT c.name, c.inputs, {", ".join("c." + k for k in OUTPUT_FIELDS)} '
+            'FROM conditions c JOIN projects p ON p.id = c.project_id '
+            'WHERE p.name = ? ORDER BY c.name', (project,))
+        for row in cur:
+            yield self._row_to_data(project, row[0], row[1], row[2:])
+
+    def stale_count(self, project=None):
+        sql = 'SELECT COUNT(*) FROM conditions c JOIN projects p ON p.id = c.project_id WHERE c.stale = 1'
+        params = ()
+        if project is not None:
+            sql += ' AND p.name = ?'
+            params = (project,)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    # ---------- 重算与查询 ----------
+
+    def recalculate_stale(self, project=None, chunk_size=20000):
+        """
+        整批重算待重算工况（使用向量化批量引擎）
+
+        参数:
+            project: 项目名称，默认全部项目
+            chunk_size: 每批工况数
+        返回:
+            tuple: (重算工况数, 未通过校验的工况数（只有管板错误位的工况不计入）)
+        """
+        sql = ('SELECT c.id, c.inputs FROM conditions c JOIN projects p ON p.id = c.project_id '
+               'WHERE c.stale = 1')
+        params = ()
+        if project is not None:
+            sql += ' AND p.name = ?'
+            params = (project,)
+
+        total = failed = 0
+        assignments = ', '.join(f'{k} = ?' for k in OUTPUT_FIELDS)
+        while True:
+            rows = self.conn.execute(sql + ' LIMIT ?', params + (chunk_size,)).fetchall()
+            if not rows:
+                break
+            ids = [r[0] for r in rows]
+            raw = [json.loads(r[1]) for r in rows]
+            results = calculate_batch(as_columns({k: [d.get(k) for d in raw] for k in _STORED_KEYS}))
+
+            codes = results['error_code']
+            columns = [results[k] for k in OUTPUT_FIELDS]
+            updates = []
+            for i, cid in enumerate(ids):
+                values = [None if v != v else float(v) for v in (col[i] for col in columns)]
+                updates.append(values + [int(codes[i]), cid])
+            with self.conn:
+                self.conn.executemany(
+                    f'UPDATE conditions SET {assignments}, error_code = ?, stale = 0 WHERE id = ?',
+                    updates)
+            total += len(ids)
+            failed += int(((codes & FATAL_MASK) != 0).sum())
+        return total, failed
+
+    def query(self, project=None, order_by=None, limit=None, **filters):
+        """
+        按计算结果过滤工况
+
+        参数:
+            project: 项目名称，默认全部项目
+            order_by: 排序字段（结果字段名，前缀 '-' 表示降序）
+            limit: 返回条数上限
+            filters: 字段__运算符=值，运算符为 gt/ge/lt/le/eq/ne，
+                     如 total_pressure_drop__gt=60
+        返回:
+            list[dict]: 每个工况的 project、condition 与全部结果字段
+        """
+        where = ['c.stale = 0']
+        params = []
+        if project is not None:
+            where.append('p.name = ?')
+            params.append(project)
+        for key, value in filters.items():
+            field, _, op = key.partition('__')
+            op = op or 'eq'
+            if field not in OUTPUT_FIELDS or op not in _OPERATORS:
+                raise ValueError(f"无效的查询条件：{key}")
+            where.append(f'c.{field} {_OPERATORS[op]} ?')
+            params.append(value)
+
+        sql = (f'SELECT p.name, c.name, {", ".join("c." + k for k in OUTPUT_FIELDS)} '
+               'FROM conditions c JOIN projects p ON p.id = c.project_id '
+               f'WHERE {" AND ".join(where)}')
+        if order_by:
+            field = order_by.lstrip('-')
+            if field not in OUTPUT_FIELDS:
+                raise ValueError(f"无效的排序字段：{order_by}")
+            sql += f' ORDER BY c.{field} {"DESC" if order_by.startswith("-") else "ASC"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+
+        results = []
+        for row in self.conn.execute(sql, params):
+            item = {'project': row[0], 'condition': row[1]}
+            item.update(zip(OUTPUT_FIELDS, row[2:]))
+            results.append(item)
+        return results
+
+
+def inputs_to_store(store, columns, results=None):
+    """列式工况（可含结果）直接写入工况库（输入取自 columns，不取结果中的反算值）"""
+    if results is None:
+        return store.save_conditions(inputs_from_columns(columns))
+    return store.save_conditions(inputs_from_columns(columns, results), inputs_from_columns(columns))
+
+
+if __name__ == "__main__":
+    import random
+
+    base = dict(steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+                tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+                material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+                cooling_water_in_temp=25, cooling_water_temp_rise=8,
+                cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85)
+    rng = random.Random(0)
+    items = []
+    for k in range(50000):
+        d = InputData.from_dict(dict(base, velocity=round(rng.uniform(1.0, 3.5), 2),
+                                     cooling_water_in_temp=round(rng.uniform(15, 30), 1)))
+        d.project_name = f"项目{k % 10}"
+        d.working_condition = f"工况{k:05d}"
+        items.append(d)
+
+    with ProjectStore(':memory:') as store:
+        t0 = time.perf_counter()
+        store.save_conditions(items)
+        t1 = time.perf_counter()
+        done, failed = store.recalculate_stale()
+        t2 = time.perf_counter()
+        hits = store.query(total_pressure_drop__gt=250, order_by='-total_pressure_drop', limit=100)
+        t3 = time.perf_counter()
+        print(f"保存 {len(items)} 个工况 {t1 - t0:.2f} s，重算 {done} 个（{failed} 个未通过校验）{t2 - t1:.2f} s")
+        print(f"水阻 > 250 kPa（前100）：{len(hits)} 个工况，查询 {(t3 - t2) * 1000:.1f} ms")
+        print(store.load('项目3', '工况00003').to_dict()['total_pressure_drop'])
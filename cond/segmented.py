@@ -0,0 +1,441 @@
+"""
+分段推进计算模块
+冷却水沿管长逐段、逐流程推进，用局部水温计算水温修正系数、传热系数
+和水阻温度修正系数，给出沿程分布与汇总结果。
+
+每个流程分 N 段，所有工况的全部管段排成 [工况, 管段] 二维数组一次计算。
+水温沿换热面积满足 dt/dA = U·fw(t)·(t_sat - t)/(m·cp)，水温修正系数表
+在相邻表点之间对温度线性（fw = α + β·t），在每个表区间上可直接积分：
+    A(t) = m·cp / (U·(α + β·t_sat)) · ln[(α + β·t)/(t_sat - t)] + 常数
+因此先对每个工况求出从进口水温到各表点的累计面积，再由各管段边界处的
+累计面积反解出边界水温，无需迭代；达到设计热负荷所需面积同样由该积分直接得到。
+沿程积分使用连续插值的水温修正系数（兼容模式的 4 位舍入只作用于输出的各管段系数）。
+各管段分布可整列计算（numpy），也可由 Numba 逐工况循环计算（backend='fused'），
+后者每个管段只写一次结果，表区间内的指数项按等面积步长递推，与 numpy 结果相差
+在舍入误差量级。
+
+耗时（1 万工况、每流程 200 段，单核）：给出各管段分布时为集总批量计算的约 46 倍（numpy）
+和 12 倍（fused），开销在于生成并写出 6 个 [工况, 管段] 数组，与分段数成正比；
+只需汇总量时传 profiles=False，平均传热系数与水阻沿表区间直接积分，不再逐管段计算，
+约为集总的 3 倍（主要是建立水温-面积关系），与分段数无关；上例中汇总量与逐管段结果的相对偏差 < 1e-7。
+"""
+import math
+
+import numpy as np
+
+from . import precision
+from . import vectorized as vec
+from .fused import HAVE_NUMBA, _round, numba, prange
+
+# 水温修正系数表换算为 °C，各区间 fw = α + β·t；最后一个区间（超出表范围）为 NaN
+_TABLE_T = (vec._FW_TEMPS - 32) * 5 / 9
+_BETA = np.append(np.diff(vec._FW_VALUES) / np.diff(_TABLE_T), np.nan)
+_ALPHA = np.append(vec._FW_VALUES[:-1] - _BETA[:-1] * _TABLE_T[:-1], np.nan)
+# °F 表各区间斜率（与 np.interp 内部的计算相同）
+_FW_SLOPE = np.diff(vec._FW_VALUES) / np.diff(vec._FW_TEMPS)
+
+
+class SegmentedResult:
+    """分段计算结果：沿程分布为 [工况, 管段] 数组，汇总量为 [工况] 数组"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        """转换为字典"""
+        return dict(self.__dict__)
+
+
+class _Profile:
+    """
+    各工况的水温-面积关系（按水温修正系数表区间分段的解析积分）
+
+    每个工况只取从进口水温所在区间起的 width 个区间（width 按出口水温上界与 t_max 确定），
+    局部区间 w 上 ln[(α+β·t)/(t_sat-t)] = offset + A·slope，
+    start_area[:, w] 为进口到局部区间 w 起点的累计面积（第 0 个区间为 0）。
+    """
+
+    def __init__(self, t_sat, t_in, mcp, u_base, total_area, t_max=None):
+        n_table = _TABLE_T.size
+        self.valid = ((t_in >= _TABLE_T[0]) & (t_in < _TABLE_T[-1]) & (t_in < t_sat)
+                      & (u_base > 0) & (mcp > 0) & (total_area > 0))
+        t_sat = np.where(self.valid, t_sat, 1.0)
+        t_in = np.where(self.valid, t_in, 0.0)
+        first = np.searchsorted(_TABLE_T, t_in, side='right') - 1
+        # 出口水温上界：整管按表中最大修正系数计
+        t_bound = t_sat - (t_sat - t_in) * np.exp(-u_base * vec._FW_VALUES.max() * total_area / mcp)
+        if t_max is not None:
+            t_bound = np.fmax(t_bound, np.minimum(t_max, t_sat))
+        last = np.searchsorted(_TABLE_T, np.where(self.valid, t_bound, t_in), side='right') - 1
+        width = int((last - first).max(initial=0)) + 1
+        j = np.minimum(first[:, np.newaxis] + np.arange(width), n_table - 1)
+        alpha, beta = _ALPHA[j], _BETA[j]
+        t_sat_col = t_sat[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # 局部区间 w：[max(T_j, t_in), min(T_j+1, t_sat)]
+            k = alpha + beta * t_sat_col                                  # α + β·t_sat
+            slope = (u_base / mcp)[:, np.newaxis] * k
+            lo = np.maximum(_TABLE_T[j], t_in[:, np.newaxis])
+            hi = np.minimum(np.append(_TABLE_T[1:], np.inf)[j], t_sat_col)
+            log_lo = np.log((alpha + beta * lo) / (t_sat_col - lo))
+            log_hi = np.log((alpha + beta * hi) / (t_sat_col - hi))
+            span = np.where(hi >= t_sat_col, np.inf, (log_hi - log_lo) / slope)
+            span[:, -1] = np.inf
+            span[j == n_table - 1] = np.inf
+            self.start_area = np.zeros_like(span)
+            np.cumsum(span[:, :-1], axis=1, out=self.start_area[:, 1:])
+            # t = t_sat - 1/(β/k + exp(ln(1/k) + offset + A·slope))
+            self.params = np.stack((log_lo - self.start_area * slope - np.log(k), slope, beta / k), axis=-1)
+        self.params = self.params.reshape(-1, 3)
+        self.alpha, self.beta, self.lo = alpha, beta, lo
+        self.upper = np.append(_TABLE_T[1:], np.inf)[j]
+        self.first = first
+        self.width = width
+        self.t_sat = t_sat
+
+    def temperature(self, area, step):
+        """
+        由累计面积求水温
+
+        参数:
+            area: 累计面积 [工况, 点]，须为 k·step（k 为整数，按列非减）
+            step: 每工况的面积步长 [工况]
+        """
+        n, m = area.shape
+        # 各局部区间起点之后的第一个面积点；对全部工况连续计数，
+        # 累加结果直接是 params 中的行号（工况 × width + 局部区间）
+        with np.errstate(divide='ignore', invalid='ignore'):
+            first = np.ceil(self.start_area / step[:, np.newaxis])
+        first = np.where(np.isfinite(first), np.clip(first, 0, m), m).astype(np.intp)
+        first += np.arange(n)[:, np.newaxis] * (m + 1)
+        idx = np.cumsum(np.bincount(first.ravel(), minlength=n * (m + 1)))
+        idx -= 1
+        g = self.params[idx.reshape(n, m + 1)[:, :m]]
+        t = g[..., 1] * area
+        t += g[..., 0]
+        np.exp(t, out=t)
+        t += g[..., 2]
+        np.divide(1.0, t, out=t)
+        np.subtract(self.t_sat[:, np.newaxis], t, out=t)
+        t[~self.valid] = np.nan
+        return t
+
+    def area(self, t):
+        """进口水温到水温 t [工况] 的面积，t 不低于饱和温度或超出计算区间为 NaN"""
+        w = np.searchsorted(_TABLE_T, t, side='right') - 1 - self.first
+        inside = self.valid & (t < self.t_sat) & (w >= 0) & (w < self.width)
+        w = np.clip(w, 0, self.width - 1)
+        g = self.params[np.arange(t.size) * self.width + w]
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            # 由 t = t_sat - 1/(q + e^x) 反解 x，再由 x = offset + A·slope 求 A
+            x = np.log(1 / (self.t_sat - t) - g[:, 2])
+            area = (x - g[:, 0]) / g[:, 1]
+        return np.where(inside, area, np.nan)
+
+    def mean_temperature(self, t_out, u_base, mcp, area):
+        """
+        进口到出口水温 t_out [工况] 的面积平均水温
+
+        (t_sat - t)·dA = m·cp/U · dt/fw(t)，fw 在各表区间上对 t 线性，可逐区间直接积分
+        """
+        hi = np.minimum(self.upper, t_out[:, np.newaxis])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = np.log((self.alpha + self.beta * hi) / (self.alpha + self.beta * self.lo)) / self.beta
+            s = np.where(hi > self.lo, s, 0.0).sum(axis=1)
+            t_mean = self.t_sat - mcp / u_base * s / area
+        return np.where(np.isfinite(t_out), t_mean, np.nan)
+
+
+def _fill_numpy(profile, n_cols, segments, p, seg_area, u_base, mcp, friction, local_drop, t_in):
+    """各管段分布（numpy 整列计算）"""
+    col = np.arange(n_cols)
+    active = col[np.newaxis, :] < (segments * p)[:, np.newaxis]
+    # 管段边界水温：累计面积 k·dA，非活动管段保持出口水温
+    boundary = np.minimum(np.arange(n_cols + 1)[np.newaxis, :], (segments * p)[:, np.newaxis])
+    water_temp = profile.temperature(boundary * seg_area[:, np.newaxis], seg_area)
+    water_temp[:, 0] = np.where(profile.valid, t_in, np.nan)
+    t_mid = water_temp[:, :-1] + water_temp[:, 1:]
+    t_mid *= 0.5
+
+    fw = vec.water_correction_factor(t_mid)
+    fw[~active] = np.nan
+    local_u = u_base[:, np.newaxis] * fw
+    heat_load = np.diff(water_temp, axis=1)
+    heat_load *= (mcp / 1000)[:, np.newaxis]                                  # kW
+
+    # 沿程水阻：摩擦阻力按局部水温修正，局部阻力计入每个流程末段
+    pressure_drop = vec.temperature_factor(t_mid)
+    pressure_drop *= friction[:, np.newaxis]
+    pressure_drop[~active] = 0.0
+    pass_end = col[segments - 1::segments]
+    pressure_drop[:, pass_end] += np.where(active[:, pass_end], local_drop[:, np.newaxis], 0.0)
+    return (water_temp, fw, local_u, heat_load, pressure_drop,
+            np.nansum(local_u, axis=1), pressure_drop.sum(axis=1))
+
+
+def _fill_kernel(valid, t_in, t_sat, params, start_area, width, seg_area, n_active, segments,
+                 u_base, mcp, friction, local_drop, compat, fw_temps, fw_values, fw_slope,
+                 water_temp, fw_out, local_u, heat_load, pressure_drop, u_sum, drop_sum):
+    """各管段分布（逐工况循环，由 Numba 编译为并行机器码）"""
+    n_cols = fw_out.shape[1]
+    for i in prange(valid.shape[0]):
+        t_prev = t_in[i] if valid[i] else np.nan
+        water_temp[i, 0] = t_prev
+        w = 0
+        j = 0
+        pass_end = segments - 1
+        kw_per_k = mcp[i] / 1000
+        total_u = 0.0
+        total_drop = 0.0
+        row = -1
+        e = 0.0
+        step = 1.0
+        for k in range(1, n_cols + 1):
+            if k <= n_active[i]:
+                area = k * seg_area[i]
+                while w + 1 < width and start_area[i, w + 1] <= area:
+                    w += 1
+                if i * width + w != row:
+                    # 进入新的表区间：直接求指数项，区间内按等面积步长递推
+                    row = i * width + w
+                    e = math.exp(params[row, 0] + area * params[row, 1])
+                    step = math.exp(seg_area[i] * params[row, 1])
+                else:
+                    e *= step
+            t = t_sat[i] - 1.0 / (params[row, 2] + e)
+            if not valid[i]:
+                t = np.nan
+            water_temp[i, k] = t
+            c = k - 1
+            heat_load[i, c] = (t - t_prev) * kw_per_k
+            t_mid = (t_prev + t) * 0.5
+            t_prev = t
+            if c >= n_active[i]:
+                fw_out[i, c] = np.nan
+                local_u[i, c] = np.nan
+                pressure_drop[i, c] = 0.0
+                continue
+            t_f = t_mid * 9 / 5 + 32
+            if t_f >= fw_temps[0] and t_f <= fw_temps[-1]:
+                # 沿程水温不降，表区间指针只需前移（同 np.interp）
+                while j < fw_temps.shape[0] - 2 and t_f >= fw_temps[j + 1]:
+                    j += 1
+                if t_f == fw_temps[-1]:
+                    fw = fw_values[-1]
+                else:
+                    fw = fw_slope[j] * (t_f - fw_temps[j]) + fw_values[j]
+                if compat:
+                    fw = _round(fw, 1e4)
+                u = u_base[i] * fw
+                total_u += u
+            else:
+                fw = np.nan
+                u = np.nan
+            fw_out[i, c] = fw
+            local_u[i, c] = u
+            rt = 1.0 - 0.002 * (t_mid - 20)
+            if rt != rt:
+                drop = np.nan
+            else:
+                drop = min(max(rt, 0.9), 1.1) * friction[i]
+            if c == pass_end:
+                drop += local_drop[i]
+                pass_end += segments
+            pressure_drop[i, c] = drop
+            total_drop += drop
+        u_sum[i] = total_u
+        drop_sum[i] = total_drop
+
+
+if HAVE_NUMBA:
+    _fill_fused = numba.njit(parallel=True, nogil=True, cache=True)(_fill_kernel)
+else:
+    _fill_fused = None
+
+
+def _fill_numba(profile, n_cols, segments, p, seg_area, u_base, mcp, friction, local_drop, t_in):
+    """各管段分布（Numba 内核）"""
+    n = seg_area.size
+    water_temp = np.empty((n, n_cols + 1))
+    fw, local_u, heat_load, pressure_drop = (np.empty((n, n_cols)) for _ in range(4))
+    u_sum, drop_sum = np.empty(n), np.empty(n)
+    _fill_fused(profile.valid, t_in, profile.t_sat, profile.params,
+                np.ascontiguousarray(profile.start_area), profile.width, seg_area,
+                (segments * p).astype(np.int64), segments, u_base, mcp, friction, local_drop,
+                precision.compat, vec._FW_TEMPS, vec._FW_VALUES, _FW_SLOPE,
+                water_temp, fw, local_u, heat_load, pressure_drop, u_sum, drop_sum)
+    return water_temp, fw, local_u, heat_load, pressure_drop, u_sum, drop_sum
+
+
+def march(t_sat, t_in, water_flow_kg_s, cp_water, tube_diameter, tube_wall_thickness,
+          tube_count, tube_length, passes, velocity, material_coefficient, cleanliness,
+          duty=None, segments=20, backend='numpy', profiles=True):
+    """
+    分段推进计算（按工况与管段向量化）
+
+    参数:
+        t_sat: 饱和温度 (°C)
+        t_in: 冷却水进口温度 (°C)
+        water_flow_kg_s: 冷却水质量流量 (kg/s)
+        cp_water: 冷却水比热容 (kJ/kg·°C)
+        tube_diameter: 换热管外径 (mm)
+        tube_wall_thickness: 管壁厚度 (mm)
+        tube_count: 换热管总数 (根)
+        tube_length: 单根管长 (mm)
+        passes: 流程数 (1, 2, 或 4)
+        velocity: 管内流速 (m/s)
+        material_coefficient: 材料修正系数
+        cleanliness: 清洁系数
+        duty: 设计热负荷 (kW)，给定时计算达到该热负荷所需的换热面积
+        segments: 每流程分段数
+        backend: 'numpy'（整列计算）或 'fused'（Numba 逐工况循环，每个管段只写一次结果；
+                 未安装 Numba 时退回 numpy）
+        profiles: 是否给出各管段分布；为 False 时不生成 [工况, 管段] 数组（沿程分布字段为 None），
+                  平均传热系数与水阻改为沿面积逐表区间直接积分（即分段数趋于无穷的极限），
+                  与逐管段求和相差在分段离散误差与兼容模式 4 位舍入量级
+    返回:
+        SegmentedResult
+    """
+    if segments < 1:
+        raise ValueError("分段数必须≥1")
+    if backend not in ('numpy', 'fused'):
+        raise ValueError(f"无效的计算后端：{backend}")
+
+    t_sat, t_in, m, cp, do, wall, n_tubes, length, p, v, mat, cf = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(x, dtype=float)) for x in (
+            t_sat, t_in, water_flow_kg_s, cp_water, tube_diameter, tube_wall_thickness,
+            tube_count, tube_length, passes, velocity, material_coefficient, cleanliness)))
+    if not np.isin(p, (1, 2, 4)).all():
+        raise ValueError("流程数必须是1、2或4")
+
+    # 与管段无关的量
+    mcp = m * cp * 1000                                          # W/K
+    seg_area = np.pi * do / 1000 * length / 1000 / segments * n_tubes / p
+    total_area = seg_area * segments * p
+    u_metric = vec.uncorrected_u(do, v) * vec.U_BTU_TO_METRIC
+    u_base = u_metric * mat * cf
+    t_target = None if duty is None else t_in + np.asarray(duty, dtype=float) * 1000 / mcp
+    profile = _Profile(t_sat, t_in, mcp, u_base, total_area, t_target)
+    di_m = (do - 2 * wall) / 1000
+    friction = 28.72 * v ** 1.75 / di_m ** 1.25 * (length / 1000 / segments)
+    local_drop = 0.1 * v ** 2
+
+    if profiles:
+        n_cols = segments * int(p.max())
+        col = np.arange(n_cols)
+        fill = _fill_numba if backend == 'fused' and HAVE_NUMBA else _fill_numpy
+        water_temp, fw, local_u, heat_load, pressure_drop, u_sum, drop_sum = fill(
+            profile, n_cols, segments, p, seg_area, u_base, mcp, friction, local_drop, t_in)
+        t_out = water_temp[:, -1]
+        mean_u = u_sum * seg_area / total_area
+        seg_pass = col // segments + 1
+        active = col[np.newaxis, :] < (segments * p)[:, np.newaxis]
+    else:
+        # 只求汇总量：出口水温由整管面积反解，∫U·fw·dA = m·cp·ln[(t_sat - t_in)/(t_sat - t_out)]，
+        # 表范围内 Rt 对水温线性，摩擦阻力按面积平均水温计
+        t_out = profile.temperature(np.outer(total_area, (0, 1)), total_area)[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_u = mcp * np.log((t_sat - t_in) / (t_sat - t_out)) / total_area
+        t_mean = profile.mean_temperature(t_out, u_base, mcp, total_area)
+        drop_sum = (friction * segments * vec.temperature_factor(t_mean) + local_drop) * p
+        seg_pass = active = water_temp = fw = local_u = heat_load = pressure_drop = None
+
+    result = SegmentedResult(
+        segments=segments,
+        segment_pass=seg_pass,
+        active=active,
+        water_temp=water_temp,
+        water_correction_factor=fw,
+        local_u=local_u,
+        heat_load=heat_load,
+        pressure_drop=pressure_drop,
+        cooling_water_out_temp=t_out,
+        DUTY=mcp * (t_out - t_in) / 1000,
+        terminal_temp_diff=t_sat - t_out,
+        surface_area=total_area,
+        mean_u=mean_u,
+        total_pressure_drop=1.2 * 0.001 * drop_sum,
+    )
+    if duty is not None:
+        # 达到设计热负荷所需面积：进口到目标出口水温的积分
+        result.required_surface_area = profile.area(t_target)
+    return result
+
+
+def segmented_from_data(data, segments=20, **kwargs):
+    """
+    对已完成 calculate_all() 的工况做分段计算
+
+    参数:
+        data: InputData 或 InputData 列表（需已计算出管数、管长、流速等）
+        segments: 每流程分段数
+    返回:
+        SegmentedResult
+    """
+    items = data if isinstance(data, (list, tuple)) else [data]
+
+    def col(name):
+        return np.array([getattr(d, name) for d in items], dtype=float)
+
+    return march(
+        col('saturation_temp'), col('cooling_water_in_temp'), col('water_flow_kg_s'),
+        col('cp_water'), col('tube_diameter'), col('tube_wall_thickness'),
+        col('tube_count'), col('tube_length'), col('passes'), col('velocity'),
+        col('material_coefficient'), col('clean_factor_corrected'),
+        duty=col('DUTY'), segments=segments, **kwargs
+    )
+
+
+if __name__ == "__main__":
+    from .data_model import InputData
+    from .calculator import CondenserCalculator
+
+    d = InputData()
+    d.steam_pressure, d.steam_mass_flow, d.steam_enthalpy = 0.12, 600000, 2400
+    d.tube_diameter, d.tube_wall_thickness, d.tube_pitch = 25.4, 0.711, 32
+    d.material, d.passes, d.cooling_water_nozzle_count = 'SS TP 304', 2, 2
+    d.cooling_water_in_temp, d.cooling_water_temp_rise = 25, 8
+    d.cp_water, d.rho_water, d.velocity, d.cleanliness_factor = 4.179, 997, 2.0, 0.85
+    CondenserCalculator(d).calculate_all()
+
+    r = segmented_from_data(d, segments=50)
+    print(f"集总: 出口 {d.cooling_water_out_temp:.3f}°C, 面积 {d.surface_area:.2f} m², 水阻 {d.total_pressure_drop:.3f} kPa")
+    print(f"分段: 出口 {r.cooling_water_out_temp[0]:.3f}°C, 所需面积 {r.required_surface_area[0]:.2f} m², "
+          f"水阻 {r.total_pressure_drop[0]:.3f} kPa")
+
+    # 1 万个工况：集总批量计算与 200 段分段计算的耗时比
+    import time
+    from .batch import calculate_batch
+    from .columns import as_columns
+
+    rng = np.random.default_rng(0)
+    cols = as_columns(dict(d.to_dict(), steam_mass_flow=rng.uniform(3e5, 9e5, 10000),
+                           cooling_water_in_temp=rng.uniform(5, 30, 10000), velocity=rng.uniform(1.5, 2.5, 10000)))
+    b = calculate_batch(cols)
+    args = (b['saturation_temp'], cols['cooling_water_in_temp'], b['water_flow_kg_s'], cols['cp_water'],
+            cols['tube_diameter'], cols['tube_wall_thickness'], b['tube_count'], b['tube_length'],
+            cols['passes'], cols['velocity'], b['material_coefficient'], b['clean_factor_corrected'])
+    march(*args, duty=b['DUTY'], segments=2, backend='fused')            # Numba 编译
+
+    def best(f):
+        times = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            f()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    lumped = best(lambda: calculate_batch(cols))
+    print(f"\n集总批量 1 万工况: {lumped * 1000:.1f} ms")
+    for backend in ('numpy', 'fused'):
+        t = best(lambda: march(*args, duty=b['DUTY'], segments=200, backend=backend))
+        print(f"分段 200 段 ({backend}): {t * 1000:.1f} ms，为集总的 {t / lumped:.1f} 倍")
+    t = best(lambda: march(*args, duty=b['DUTY'], segments=200, profiles=False))
+    print(f"分段 200 段 (仅汇总量): {t * 1000:.1f} ms，为集总的 {t / lumped:.1f} 倍")
+
+    full = march(*args, duty=b['DUTY'], segments=200)
+    summary = march(*args, duty=b['DUTY'], segments=200, profiles=False)
+    for name in ('cooling_water_out_temp', 'mean_u', 'total_pressure_drop', 'required_surface_area'):
+        a, s = getattr(full, name), getattr(summary, name)
+        print(f"  {name}: 最大相对偏差 {np.nanmax(np.abs(s / a - 1)):.1e}，"
+              f"NaN 一致 {bool((np.isnan(a) == np.isnan(s)).all())}")
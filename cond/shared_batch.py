@@ -0,0 +1,305 @@
+"""
+共享内存多进程批量计算
+把 InputData 或列式数组直接交给进程池时，每个工况都要在进程间序列化
+往返一次，大批量下传输开销超过计算本身。本模块：
+- 父进程把列式输入与输出数组放进一块 multiprocessing.shared_memory；
+- 工作进程只收到 (共享内存名, 起点, 终点)，直接在共享内存上读取输入切片、
+  原地写回结果，不逐工况序列化；
+- 材料名称与排管方式编码为表下标存放，工作进程按下标还原名称列；
+- 共享内存由父进程创建并负责释放：正常结束、计算异常、工作进程崩溃
+  或取消时都在 finally 中解除映射并删除；父进程自身异常退出时由
+  标准库的 resource_tracker 兜底删除。
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, CancelledError, FIRST_COMPLETED, wait
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from . import precision
+from . import vectorized as vec
+from .batch import calculate_batch
+from .columns import INPUT_FIELDS, MODE_FIELDS, OUTPUT_FIELDS, as_columns
+from .material_coefficient import _VALID_MATERIALS
+from .progress import Progress
+from .tube_layout import _PATTERNS as _LAYOUT_PATTERNS
+from .validation import FATAL_MASK
+
+# 材料下标 -> 名称；-1 为未知材料，-2 为未给定（空字符串）
+_MATERIAL_NAMES = np.array(list(_VALID_MATERIALS) + ['', '?'], dtype=object)
+_UNKNOWN_MATERIAL = -1
+_MISSING_MATERIAL = -2
+# 排管方式下标 -> 名称；0 为未给定，-1 为未知排管方式
+_LAYOUT_NAMES = np.array([''] + list(_LAYOUT_PATTERNS) + ['?'], dtype=object)
+
+# 共享内存布局：(字段名, dtype)，每个字段为长度为工况数的连续数组
+_LAYOUT = (tuple((name, np.float64) for name in INPUT_FIELDS)
+           + tuple((name, np.int64) for name in MODE_FIELDS)
+           + (('material_code', np.int64), ('layout_code', np.int64))
+           + tuple((name, np.float64) for name in OUTPUT_FIELDS)
+           + (('error_code', np.uint32),))
+_RESULT_FIELDS = OUTPUT_FIELDS + ('error_code',)
+
+
+def _attach(name):
+    """打开已有共享内存（只由创建方负责删除）"""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 没有 track 参数：打开时也会登记，但工作进程与父进程共用
+        # 同一个 resource_tracker，重复登记不影响由父进程删除
+        return SharedMemory(name=name)
+
+
+class SharedBatch:
+    """
+    共享内存中的一批工况（输入列 + 结果列）
+
+    调用方可直接向 inputs 中的数组写入输入，避免再复制一次；
+    也可用 fill() 从普通列式输入复制。
+    """
+
+    def __init__(self, n, name=None):
+        self.n = n
+        offsets = {}
+        size = 0
+        for field, dtype in _LAYOUT:
+            offsets[field] = size
+            size += -(-n * np.dtype(dtype).itemsize // 8) * 8      # 按 8 字节对齐
+        self._owner = name is None
+        self.shm = SharedMemory(create=True, size=max(size, 1)) if self._owner else _attach(name)
+        self.arrays = {field: np.ndarray((n,), dtype=dtype, buffer=self.shm.buf, offset=offsets[field])
+                       for field, dtype in _LAYOUT}
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def inputs(self):
+        """输入列视图：数值字段、模式字段、material_code 与 layout_code"""
+        return {k: v for k, v in self.arrays.items() if k not in _RESULT_FIELDS}
+
+    @property
+    def results(self):
+        """结果列视图（共享内存释放后失效，需长期保留请用 copy_results）"""
+        return {k: self.arrays[k] for k in _RESULT_FIELDS}
+
+    def fill(self, columns):
+        """从列式输入（见 columns 模块）复制到共享内存"""
+        c = columns if isinstance(columns.get('material'), np.ndarray) else as_columns(columns)
+        for name in INPUT_FIELDS + MODE_FIELDS:
+            self.arrays[name][:] = c[name]
+        code = vec.material_index(c['material'])
+        code[c['material'] == ''] = _MISSING_MATERIAL
+        self.arrays['material_code'][:] = code
+        layout = c.get('tube_layout_pattern')
+        code = np.zeros(self.n, dtype=np.int64)
+        if layout is not None:
+            code[layout != ''] = -1
+            for i, name in enumerate(_LAYOUT_PATTERNS, 1):
+                code[layout == name] = i
+        self.arrays['layout_code'][:] = code
+
+    def columns(self, start=0, stop=None):
+        """工况切片 [start, stop) 的列式输入（数值列为共享内存视图）"""
+        cols = {name: self.arrays[name][start:stop] for name in INPUT_FIELDS + MODE_FIELDS}
+        cols['material'] = _MATERIAL_NAMES[self.arrays['material_code'][start:stop]]
+        cols['tube_layout_pattern'] = _LAYOUT_NAMES[self.arrays['layout_code'][start:stop]]
+        return cols
+
+    def compute(self, start=0, stop=None, backend='numpy'):
+        """计算切片 [start, stop)，结果原地写回共享内存"""
+        r = calculate_batch(self.columns(start, stop), backend=backend)
+        for name in _RESULT_FIELDS:
+            self.arrays[name][start:stop] = r[name]
+
+    def copy_results(self):
+        """结果列的独立副本"""
+        return {k: v.copy() for k, v in self.results.items()}
+
+    def close(self):
+        """解除映射；创建方同时删除共享内存"""
+        self.arrays = {}
+        shm, self.shm = self.shm, None
+        if shm is None:
+            return
+        shm.close()
+        if self._owner:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _compute_slice(name, n, start, stop, backend, mode):
+    """进程池任务：在共享内存上计算一段工况，返回 (工况数, 失败数)"""
+    with precision.precision(mode):
+        batch = SharedBatch(n, name)
+        try:
+            batch.compute(start, stop, backend)
+            failed = int(np.count_nonzero(batch.arrays['error_code'][start:stop] & FATAL_MASK))
+        finally:
+            batch.close()
+    return stop - start, failed
+
+
+class SharedBatchExecutor:
+    """
+    共享内存多进程批量计算执行器
+
+    进程池在执行器生命周期内复用；每次 run() 创建一块共享内存，
+    结束（含异常与取消）时释放。建议以 with 语句使用。
+    """
+
+    def __init__(self, workers=None, chunk_size=100_000, backend='numpy'):
+        """
+        参数:
+            workers: 进程数，None 为 CPU 核数
+            chunk_size: 每个任务的工况数
+            backend: 工作进程中的计算后端（见 batch.calculate_batch）
+        """
+        if chunk_size < 1:
+            raise ValueError("分块大小必须≥1")
+        self.workers = (os.cpu_count() or 1) if workers is None else max(int(workers), 1)
+        self.chunk_size = int(chunk_size)
+        self.backend = backend
+        self._pool = None
+        self._cancelled = threading.Event()
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        return self._pool
+
+    def cancel(self):
+        """取消正在执行的 run()（可从其他线程调用），该 run() 抛出 CancelledError"""
+        self._cancelled.set()
+
+    def run(self, columns, progress=None, cancel=None):
+        """
+        批量计算
+
+        参数:
+            columns: 列式输入（字段名同 InputData）
+            progress: 进度回调 callback(ProgressInfo)（见 progress 模块）
+            cancel: CancelToken，与 cancel() 方法等效
+        返回:
+            dict: 与 batch.calculate_batch 相同的结果字段与 'error_code'
+        """
+        c = columns if isinstance(columns.get('material'), np.ndarray) else as_columns(columns)
+        batch = SharedBatch(len(c['material']))
+        try:
+            batch.fill(c)
+            self.run_shared(batch, progress, cancel)
+            return batch.copy_results()
+        finally:
+            batch.close()
+
+    def run_shared(self, batch, progress=None, cancel=None):
+        """在已填好输入的 SharedBatch 上计算，结果原地写入 batch.results"""
+        self._cancelled.clear()
+        n = batch.n
+        tracker = Progress(n, progress, cancel)
+        mode = precision.get_precision()
+        bounds = list(range(0, n, self.chunk_size)) + [n]
+        pool = self._executor()
+        pending = {pool.submit(_compute_slice, batch.name, n, a, b, self.backend, mode)
+                   for a, b in zip(bounds[:-1], bounds[1:]) if b > a}
+        try:
+            while pending:
+                if self._cancelled.is_set():
+                    raise CancelledError("批量计算已取消")
+                tracker.check()
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # 传递工作进程中的异常（含进程崩溃）
+                    tracker.update(*future.result())
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            # 进程崩溃后进程池不可再用，下次 run() 重新创建
+            if getattr(pool, '_broken', False):
+                self.shutdown()
+            raise
+        tracker.finish()
+
+    def shutdown(self):
+        """关闭进程池（取消尚未开始的任务）"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def calculate_batch_shared(columns, workers=None, chunk_size=100_000, backend='numpy',
+                           progress=None, cancel=None):
+    """
+    共享内存多进程批量计算（一次性使用的便捷函数）
+
+    参数:
+        columns: 列式输入
+        workers: 进程数，None 为 CPU 核数
+        chunk_size: 每个任务的工况数
+        backend: 计算后端（'numpy' 或 'fused'）
+        progress: 进度回调
+        cancel: CancelToken
+    返回:
+        dict: 同 batch.calculate_batch
+    """
+    with SharedBatchExecutor(workers, chunk_size, backend) as executor:
+        return executor.run(columns, progress, cancel)
+
+
+def _pickled_chunk(columns):
+    """对照：列式输入整块序列化传给工作进程"""
+    return calculate_batch(columns)
+
+
+if __name__ == "__main__":
+    import time
+
+    n = 2_000_000
+    rng = np.random.default_rng(0)
+    cols = as_columns(dict(
+        steam_pressure=rng.uniform(0.008, 0.3, n), steam_mass_flow=rng.uniform(2e5, 9e5, n),
+        steam_enthalpy=2400, tube_diameter=rng.choice([19.05, 25.4, 31.75], n),
+        tube_wall_thickness=0.711, tube_pitch=40, material=rng.choice(['SS TP 304', 'Admiralty'], n),
+        passes=2, cooling_water_nozzle_count=2, cooling_water_in_temp=rng.uniform(5, 30, n),
+        cooling_water_temp_rise=8, cp_water=4.179, rho_water=997, velocity=rng.uniform(1.0, 3.0, n),
+        cleanliness_factor=0.85))
+
+    with SharedBatchExecutor(workers=2) as executor:
+        executor.run({k: v[:10] for k, v in cols.items()})          # 启动工作进程
+        t0 = time.perf_counter()
+        shared = executor.run(cols)
+        t1 = time.perf_counter()
+        pool = executor._executor()
+        step = executor.chunk_size
+        parts = list(pool.map(_pickled_chunk, [{k: v[i:i + step] for k, v in cols.items()}
+                                               for i in range(0, n, step)]))
+        t2 = time.perf_counter()
+    pickled = {k: np.concatenate([p[k] for p in parts]) for k in _RESULT_FIELDS}
+    same = all(np.array_equal(shared[k], pickled[k], equal_nan=True) for k in _RESULT_FIELDS)
+    print(f"{n:,} 工况：共享内存 {t1 - t0:.2f} s，序列化传输 {t2 - t1:.2f} s，结果一致：{same}")
+
+    # 工作进程异常时共享内存同样被释放
+    with SharedBatchExecutor(workers=2, backend='bogus') as executor:
+        try:
+            executor.run({k: v[:1000] for k, v in cols.items()})
+        except ValueError as e:
+            print("工作进程异常已传回：", e)
+    print("残留共享内存段：", [f for f in os.listdir('/dev/shm') if f.startswith('psm_')]
+          if os.path.isdir('/dev/shm') else '（非 Linux）')
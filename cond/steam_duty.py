@@ -4,6 +4,8 @@
 """
 import math
 
+from . import precision
+
 
 # 简化的IAPWS-IF97饱和水性质计算（避免依赖外部库）
 def _iapws_saturation_properties(P_MPa):
@@ -40,7 +42,9 @@ def _iapws_saturation_properties(P_MPa):
     # 基于温度的多项式拟合
     h_water = 4.2 * T_sat + 0.0015 * (T_sat ** 2)
     
-    return round(T_sat, 3), round(h_water, 3)
+    if precision.compat:
+        return round(T_sat, 3), round(h_water, 3)
+    return T_sat, h_water
 
 
 def get_steam_heat_load(pressure_MPa, steam_enthalpy, steam_flow_rate):
@@ -78,7 +82,9 @@ def get_steam_heat_load(pressure_MPa, steam_enthalpy, steam_flow_rate):
     except Exception as e:
         raise Exception(f"饱和水计算失败：{str(e)}")
 
-    return round(temperature, 3), round(water_enthalpy, 3), round(heat_load, 3)
+    if precision.compat:
+        return round(temperature, 3), round(water_enthalpy, 3), round(heat_load, 3)
+    return temperature, water_enthalpy, heat_load
 
 
 # 测试
@@ -0,0 +1,222 @@
+"""
+异步流式计算
+asyncio 服务与数据管道从异步来源（队列、异步文件读取等）逐条得到输入字典，
+在事件循环中直接调用 CondenserCalculator 会阻塞整个循环。本模块：
+- calculate_stream() 消费异步可迭代的输入字典，以 `async for` 逐条产出结果；
+- 计算交给可配置的执行器（默认事件循环的线程池，CPU 密集的持续负载建议
+  用 ProcessPoolExecutor，不与事件循环争用 GIL）；
+- 已就绪的输入合并成小批一次提交，摊薄每次提交执行器的开销；
+- 同时在途（已从来源读取但尚未产出）的输入不超过 max_in_flight，
+  消费方跟不上时停止读取来源，形成背压；
+- 有序模式按输入顺序产出，无序模式按完成顺序产出；
+- 每条输入按编译计划快速计算（见 plan 模块），计划不支持的字段组合
+  退回 CondenserCalculator，结果与错误均与同步计算一致。
+"""
+import asyncio
+
+from . import precision
+from .calculator import CondenserCalculator
+from .data_model import InputData
+from .plan import plan_for
+
+_END = object()
+
+
+class _SourceError:
+    """来源迭代中的异常（由读取任务转交给产出方抛出）"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _compute(records, mode):
+    """执行器任务：计算一批输入字典，计算失败的记录返回其异常"""
+    results = []
+    with precision.precision(mode):
+        for record in records:
+            data = InputData.from_dict(record)
+            try:
+                try:
+                    plan = plan_for(data)
+                except ValueError:
+                    # 缺少计划的必要字段：退回 calculate_all()，由其给出结果或错误
+                    result = CondenserCalculator(data).calculate_all()
+                else:
+                    result = plan(data)
+                results.append(result.to_dict())
+            except Exception as e:
+                results.append(e)
+    return results
+
+
+async def _read(inputs, slots, queue):
+    """先占一个在途名额再从来源读取下一条，放入队列"""
+    source = inputs.__aiter__()
+    index = 0
+    try:
+        while True:
+            await slots.acquire()
+            try:
+                record = await source.__anext__()
+            except StopAsyncIteration:
+                break
+            queue.put_nowait((index, record))
+            index += 1
+    except Exception as e:
+        queue.put_nowait(_SourceError(e))
+    else:
+        queue.put_nowait(_END)
+
+
+async def calculate_stream(inputs, executor=None, max_in_flight=256, batch_size=64, ordered=True):
+    """
+    异步流式计算
+
+    参数:
+        inputs: 异步可迭代对象，逐条产出输入字典（字段名同 InputData）
+        executor: concurrent.futures 执行器，None 为事件循环的默认线程池
+        max_in_flight: 同时在途的最大输入条数（背压上限）
+        batch_size: 每次提交执行器的最大条数（只合并已读到的输入，不等待凑满）
+        ordered: True 按输入顺序产出，False 按完成顺序产出
+    产出:
+        tuple: (输入序号, 结果字典)；计算失败的记录（输入无效、蒸汽压力超出范围、字段类型错误等）
+              结果为异常实例，不中断流
+    """
+    if max_in_flight < 1:
+        raise ValueError("在途上限必须≥1")
+    if batch_size < 1:
+        raise ValueError("批大小必须≥1")
+    loop = asyncio.get_running_loop()
+    mode = precision.get_precision()
+    slots = asyncio.Semaphore(max_in_flight)
+    queue = asyncio.Queue()
+    reader = asyncio.ensure_future(_read(inputs, slots, queue))
+    running = {}                # 执行器 future -> 该批输入序号
+    ready = {}                  # 有序模式下已完成、等待前序结果的 序号 -> 结果
+    next_index = 0
+    getter = None
+    exhausted = False
+    try:
+        while not exhausted or running or ready:
+            if getter is None and not exhausted:
+                getter = asyncio.ensure_future(queue.get())
+            waiting = set(running) | ({getter} if getter is not None else set())
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if getter in done:
+                entries = [getter.result()]
+                getter = None
+                while len(entries) < batch_size and not queue.empty():
+                    entries.append(queue.get_nowait())
+                batch = []
+                for entry in entries:
+                    if entry is _END:
+                        exhausted = True
+                    elif isinstance(entry, _SourceError):
+                        raise entry.error
+                    else:
+                        batch.append(entry)
+                if batch:
+                    future = loop.run_in_executor(executor, _compute, [r for _, r in batch], mode)
+                    running[future] = [i for i, _ in batch]
+
+            for future in done:
+                if future not in running:
+                    continue
+                indices = running.pop(future)
+                results = future.result()
+                if ordered:
+                    ready.update(zip(indices, results))
+                    while next_index in ready:
+                        result = ready.pop(next_index)
+                        slots.release()
+                        yield next_index, result
+                        next_index += 1
+                else:
+                    for index, result in zip(indices, results):
+                        slots.release()
+                        yield index, result
+    finally:
+        reader.cancel()
+        if getter is not None:
+            getter.cancel()
+        for future in running:
+            future.cancel()
+
+
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    base = dict(steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+                tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+                material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+                cooling_water_in_temp=25, cooling_water_temp_rise=8,
+                cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85)
+    n = 50_000
+    records = [dict(base, velocity=0.9 + 2.2 * i / n) for i in range(n)]
+
+    async def source():
+        # 模拟异步来源：每 1000 条让出一次事件循环
+        for i, record in enumerate(records):
+            if i % 1000 == 0:
+                await asyncio.sleep(0)
+            yield record
+
+    async def heartbeat(stop, lags):
+        """每 10 ms 醒来一次，记录事件循环的调度延迟"""
+        while not stop.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - t - 0.01)
+
+    async def run(executor, ordered):
+        stop, lags = asyncio.Event(), []
+        beat = asyncio.ensure_future(heartbeat(stop, lags))
+        t0 = time.perf_counter()
+        count = errors = 0
+        previous = -1
+        in_order = True
+        async for index, result in calculate_stream(source(), executor, ordered=ordered):
+            count += 1
+            errors += isinstance(result, Exception)
+            in_order &= index == previous + 1
+            previous = index
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await beat
+        lags.sort()
+        print(f"{'进程池' if executor else '线程池'}，{'有序' if ordered else '无序'}：{count:,} 条 "
+              f"（无效 {errors}）{elapsed:.2f} s，按输入顺序：{in_order}，"
+              f"事件循环延迟中位 {lags[len(lags) // 2] * 1e3:.1f} ms / 最大 {lags[-1] * 1e3:.1f} ms")
+
+    async def parity():
+        """未给管间距、缺少喷嘴数与越界输入的记录：产出与 calculate_all() 一致"""
+        import contextlib
+        import io
+
+        variants = [dict(base, tube_pitch=None), dict(base, tube_pitch=None, tube_layout_pattern='square'),
+                    dict(base, cooling_water_nozzle_count=None), dict(base, velocity=5.0)]
+
+        async def items():
+            for record in variants:
+                yield record
+
+        same = 0
+        async for index, result in calculate_stream(items()):
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected = CondenserCalculator(InputData.from_dict(variants[index])).calculate_all().to_dict()
+            except Exception as e:
+                expected = type(e)
+            same += expected == (type(result) if isinstance(result, Exception) else result)
+        print(f"特殊输入 {len(variants)} 条，与 calculate_all 一致 {same} 条")
+
+    async def main():
+        await parity()
+        await run(None, True)
+        await run(None, False)
+        with ProcessPoolExecutor(2) as pool:
+            await run(pool, True)
+
+    asyncio.run(main())
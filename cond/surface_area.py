@@ -1,6 +1,7 @@
 """
 换热面积计算模块
 """
+from . import precision
 
 
 def heat_transfer_area(heat_load, lmtd, u_uncorrect, fw_water, fw_mat, fouling_factor=1.0):
@@ -16,7 +17,7 @@ def heat_transfer_area(heat_load, lmtd, u_uncorrect, fw_water, fw_mat, fouling_f
         fw_mat: 材料修正系数，必须>0
         fouling_factor: 清洁系数，默认1.0，必须>0
     返回:
-        float: 换热面积 (m²)，保留2位小数
+        float: 换热面积 (m²)，按精度策略舍入（compat 为2位小数）
     """
     # 输入校验
     if heat_load <= 0:
@@ -34,7 +35,7 @@ def heat_transfer_area(heat_load, lmtd, u_uncorrect, fw_water, fw_mat, fouling_f
 
     # 核心计算（1000转换：kW -> W）
     area = 1000 * heat_load / (lmtd * u_uncorrect * fw_water * fw_mat * fouling_factor)
-    return round(area, 2)
+    return round(area, 2) if precision.compat else area
 
 
 if __name__ == "__main__":
@@ -0,0 +1,381 @@
+"""
+参数扫描（网格）
+在基准工况上对若干输入字段取值做全组合扫描：
+- 扫描点按扁平下标编号，任意区间 [start, stop) 可独立生成列式输入，
+  不需要展开整个网格，因此可按块分发给多个进程或多台机器；
+- 扫描定义可转为 JSON 兼容的字典（to_spec/from_spec）传给远端工作进程；
+- 结果按块写入 SweepStore：每个结果字段一个数组（可为磁盘上的 .npy
+  内存映射），按扫描点下标定位，同一块重复写入只接受第一次；
+- 磁盘存储定期做检查点，中断后可从检查点续算：
+      python -m cond.sweep resume 结果目录
+  结果目录记录计算时的精度策略与计算后端，续算沿用二者，与当前设置
+  不一致时报错，不会把两种设置的结果混在同一目录中。
+"""
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from . import precision
+from .batch import calculate_batch
+from .columns import INPUT_FIELDS, MODE_FIELDS, OUTPUT_FIELDS, STRING_FIELDS, as_columns
+from .progress import Progress
+from .validation import FATAL_MASK
+
+_BASE_FIELDS = INPUT_FIELDS + MODE_FIELDS + STRING_FIELDS
+
+
+class Sweep:
+    """网格扫描定义"""
+
+    def __init__(self, base, axes, chunk_size=100_000):
+        """
+        参数:
+            base: 基准工况（InputData 或字段字典）
+            axes: 扫描字段 -> 取值序列（按给定顺序组合，最后一个字段变化最快）
+            chunk_size: 每块扫描点数
+        """
+        if chunk_size < 1:
+            raise ValueError("分块大小必须≥1")
+        values = base.to_dict() if hasattr(base, 'to_dict') else dict(base)
+        self.base = {k: values.get(k) for k in _BASE_FIELDS}
+        if self.base['tube_layout_pattern'] is None:
+            # 未给定排管方式时不写入扫描定义（与旧版本的扫描定义相同，可继续续算）
+            del self.base['tube_layout_pattern']
+        for k in MODE_FIELDS:
+            if self.base[k] is None:
+                self.base[k] = 0
+        self.axes = {}
+        for name, points in axes.items():
+            if name not in _BASE_FIELDS:
+                raise ValueError(f"无效的扫描字段：{name}")
+            points = list(points)
+            if not points:
+                raise ValueError(f"扫描字段 {name} 没有取值")
+            self.axes[name] = points
+        self.shape = tuple(len(v) for v in self.axes.values())
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+        self.chunk_size = int(chunk_size)
+        self.n_chunks = -(-self.size // self.chunk_size)
+
+    def chunk_bounds(self, chunk_id):
+        """块编号 -> 扫描点区间 (start, stop)"""
+        if not 0 <= chunk_id < self.n_chunks:
+            raise ValueError(f"块编号超出范围：{chunk_id}")
+        start = chunk_id * self.chunk_size
+        return start, min(start + self.chunk_size, self.size)
+
+    def columns(self, start, stop):
+        """扫描点区间 [start, stop) 的列式输入"""
+        cols = dict(self.base)
+        index = np.unravel_index(np.arange(start, stop), self.shape)
+        for (name, points), ix in zip(self.axes.items(), index):
+            cols[name] = np.asarray(points, dtype=object if name in STRING_FIELDS else None)[ix]
+        return cols
+
+    def to_spec(self):
+        """JSON 兼容的扫描定义"""
+        def plain(v):
+            return v.item() if isinstance(v, np.generic) else v
+        return {'base': {k: plain(v) for k, v in self.base.items()},
+                'axes': {k: [plain(v) for v in points] for k, points in self.axes.items()},
+                'chunk_size': self.chunk_size}
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec['base'], spec['axes'], spec['chunk_size'])
+
+
+class ChunkedBatch:
+    """
+    已给定输入的批量工况，按块执行（接口同 Sweep，可写入 SweepStore）
+
+    输入本身不保存到结果目录，只保存其指纹用于续算时核对。
+    """
+
+    def __init__(self, columns, chunk_size=100_000):
+        if chunk_size < 1:
+            raise ValueError("分块大小必须≥1")
+        self.data = as_columns(columns)
+        self.size = len(self.data['material'])
+        self.shape = (self.size,)
+        self.chunk_size = int(chunk_size)
+        self.n_chunks = -(-self.size // self.chunk_size)
+
+    chunk_bounds = Sweep.chunk_bounds
+
+    def columns(self, start, stop):
+        return {k: v[start:stop] for k, v in self.data.items()}
+
+    def to_spec(self):
+        """批量输入的规模与指纹（CRC32）"""
+        crc = 0
+        for name in INPUT_FIELDS + MODE_FIELDS:
+            crc = zlib.crc32(np.ascontiguousarray(self.data[name]).data, crc)
+        crc = zlib.crc32('\n'.join(self.data['material']).encode('utf-8'), crc)
+        layout = self.data['tube_layout_pattern']
+        if (layout != '').any():
+            # 未给定排管方式时指纹与旧版本相同，已有扫描结果可继续续算
+            crc = zlib.crc32('\n'.join(layout).encode('utf-8'), crc)
+        return {'batch': {'size': self.size, 'crc32': crc}, 'chunk_size': self.chunk_size}
+
+
+def _atomic_save(path, array):
+    """先写临时文件并落盘，再原子替换，中途崩溃不会留下残缺文件"""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SweepStore:
+    """
+    扫描结果存储
+
+    每个结果字段一个长度为扫描点数的数组，未完成的点为 NaN（error_code 为 0）；
+    给定 path 时各字段保存为目录下的 .npy 文件（内存映射），否则在内存中。
+
+    磁盘存储按 checkpoint_interval 定期做检查点：先把结果数组写回磁盘，
+    再原子替换已完成块列表 done.npy，因此 done.npy 中的块其结果一定已落盘。
+    再次以同一目录打开时从检查点续算：已完成的块不再计算，检查点之后
+    完成但未记录的块重新计算，最终结果与一次算完相同。
+    """
+
+    def __init__(self, sweep, fields=None, path=None, checkpoint_interval=30.0, backend='numpy'):
+        """
+        参数:
+            sweep: Sweep 或 ChunkedBatch
+            fields: 保存的结果字段，None 为全部 OUTPUT_FIELDS（error_code 总是保存）
+            path: 结果目录，None 为内存存储；目录中已有同一扫描的结果时续算
+            checkpoint_interval: 检查点间隔 (s)
+            backend: 计算后端；与当前精度策略一起记录在结果目录中，
+                     续算时与目录中的记录不一致则报错
+        """
+        fields = tuple(fields or OUTPUT_FIELDS)
+        unknown = set(fields) - set(OUTPUT_FIELDS)
+        if unknown:
+            raise ValueError(f"无效的结果字段：{', '.join(sorted(unknown))}")
+        self.sweep = sweep
+        self.fields = fields + ('error_code',)
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.precision = precision.get_precision()
+        self.backend = backend
+        self._last_checkpoint = time.monotonic()
+        self.done = np.zeros(sweep.n_chunks, dtype=bool)
+        self.arrays = {}
+        if path is None:
+            for name in self.fields:
+                self.arrays[name] = np.zeros(sweep.size, dtype=np.uint32) if name == 'error_code' \
+                    else np.full(sweep.size, np.nan)
+            return
+
+        meta = {'sweep': sweep.to_spec(), 'fields': list(fields),
+                'precision': self.precision, 'backend': backend}
+        meta_path = os.path.join(path, 'sweep.json')
+        if os.path.exists(meta_path):
+            saved = read_meta(path)
+            plain = json.loads(json.dumps(meta))
+            if any(saved[k] != plain[k] for k in ('sweep', 'fields')):
+                raise ValueError(f"结果目录 {path} 中已有其他扫描的结果")
+            for k in ('precision', 'backend'):
+                if k in saved and saved[k] != plain[k]:
+                    raise ValueError(f"结果目录 {path} 按 {k}={saved[k]} 计算，与当前的 {plain[k]} 不一致")
+            for name in self.fields:
+                self.arrays[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r+')
+            done_path = os.path.join(path, 'done.npy')
+            if os.path.exists(done_path):
+                self.done[:] = np.load(done_path)
+            return
+
+        os.makedirs(path, exist_ok=True)
+        for name in self.fields:
+            dtype = np.uint32 if name == 'error_code' else np.float64
+            arr = np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), mode='w+',
+                                            dtype=dtype, shape=(sweep.size,))
+            if name != 'error_code':
+                arr[:] = np.nan
+            self.arrays[name] = arr
+        self.checkpoint()
+        # 扫描定义最后写入：存在 sweep.json 即表示目录已完整初始化
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    @property
+    def complete(self):
+        return bool(self.done.all())
+
+    def pending(self):
+        """未完成的块编号"""
+        return np.flatnonzero(~self.done).tolist()
+
+    def progress(self, callback=None, cancel=None):
+        """按已完成块的点数与失败数创建 Progress（续算时已完成部分不计入吞吐量）"""
+        done = failed = 0
+        for chunk_id in np.flatnonzero(self.done):
+            start, stop = self.sweep.chunk_bounds(chunk_id)
+            done += stop - start
+            failed += np.count_nonzero(self.arrays['error_code'][start:stop] & FATAL_MASK)
+        return Progress(self.sweep.size, callback, cancel, done=done, failed=failed)
+
+    def write(self, chunk_id, results):
+        """
+        写入一块结果（到达检查点间隔时随之做检查点）
+
+        返回:
+            bool: 是否写入（该块已完成时丢弃重复结果，返回 False）
+        """
+        if self.done[chunk_id]:
+            return False
+        start, stop = self.sweep.chunk_bounds(chunk_id)
+        for name in self.fields:
+            self.arrays[name][start:stop] = results[name]
+        self.done[chunk_id] = True
+        if self.path is not None and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+        return True
+
+    def checkpoint(self):
+        """结果数组写回磁盘后原子更新已完成块列表"""
+        if self.path is None:
+            return
+        for arr in self.arrays.values():
+            arr.flush()
+        _atomic_save(os.path.join(self.path, 'done.npy'), self.done)
+        self._last_checkpoint = time.monotonic()
+
+    flush = checkpoint
+
+    def results(self):
+        """结果字段 -> 数组（与 batch.calculate_batch 的返回格式相同）"""
+        return dict(self.arrays)
+
+
+def read_meta(path):
+    """读取结果目录中保存的扫描定义、结果字段、精度策略与计算后端"""
+    with open(os.path.join(path, 'sweep.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compute_chunk(sweep, chunk_id, fields, backend='numpy'):
+    """计算一块扫描点，只返回需要保存的字段"""
+    r = calculate_batch(sweep.columns(*sweep.chunk_bounds(chunk_id)), backend=backend)
+    return {name: r[name] for name in fields}
+
+
+def run_sweep(sweep, fields=None, path=None, backend='numpy', checkpoint_interval=30.0,
+              progress=None, cancel=None):
+    """
+    在本进程内逐块执行扫描
+
+    参数:
+        sweep: Sweep 或 ChunkedBatch
+        fields: 保存的结果字段
+        path: 结果目录（None 为内存）；目录中已有检查点时跳过已完成的块
+        backend: 计算后端（见 batch.calculate_batch）
+        checkpoint_interval: 检查点间隔 (s)
+        progress: 进度回调 callback(ProgressInfo)（见 progress 模块）
+        cancel: CancelToken；取消时先做检查点再抛出 CancelledError，之后可续算
+    返回:
+        SweepStore
+    """
+    store = SweepStore(sweep, fields, path, checkpoint_interval, backend)
+    tracker = store.progress(progress, cancel)
+    try:
+        tracker.check()
+        for chunk_id in store.pending():
+            results = compute_chunk(sweep, chunk_id, store.fields, backend)
+            store.write(chunk_id, results)
+            tracker.update(results['error_code'].size, np.count_nonzero(results['error_code'] & FATAL_MASK))
+    finally:
+        store.checkpoint()
+    tracker.finish()
+    return store
+
+
+def calculate_batch_resumable(columns, path, chunk_size=100_000, fields=None, backend='numpy',
+                              checkpoint_interval=30.0, progress=None, cancel=None):
+    """
+    可续算的批量计算：中断后以相同输入与目录再次调用，从检查点继续
+
+    参数:
+        columns: 列式输入
+        path: 结果目录
+        chunk_size: 每块工况数
+        fields: 保存的结果字段
+        backend: 计算后端
+        checkpoint_interval: 检查点间隔 (s)
+        progress: 进度回调
+        cancel: CancelToken
+    返回:
+        dict: 结果字段 -> 数组（内存映射）与 'error_code'
+    """
+    return run_sweep(ChunkedBatch(columns, chunk_size), fields, path, backend,
+                     checkpoint_interval, progress, cancel).results()
+
+
+def resume_sweep(path, backend=None, mode=None, checkpoint_interval=30.0, progress=None, cancel=None):
+    """
+    按结果目录中保存的扫描定义续算扫描
+
+    参数:
+        path: 结果目录
+        backend: 计算后端，None 为沿用目录中的记录；与记录不一致时报错
+        mode: 精度策略，None 为沿用目录中的记录；与记录不一致时报错
+        checkpoint_interval: 检查点间隔 (s)
+        progress: 进度回调
+        cancel: CancelToken
+    返回:
+        SweepStore
+    """
+    meta = read_meta(path)
+    if 'batch' in meta['sweep']:
+        raise ValueError("批量计算的输入未保存在结果目录中，请以相同输入调用 calculate_batch_resumable")
+    saved_backend = meta.get('backend', 'numpy')
+    saved_mode = meta.get('precision', precision.get_precision())
+    if backend is not None and backend != saved_backend:
+        raise ValueError(f"结果目录 {path} 按 backend={saved_backend} 计算，与指定的 {backend} 不一致")
+    if mode is not None and mode != saved_mode:
+        raise ValueError(f"结果目录 {path} 按 precision={saved_mode} 计算，与指定的 {mode} 不一致")
+    with precision.precision(saved_mode):
+        return run_sweep(Sweep.from_spec(meta['sweep']), meta['fields'], path, saved_backend,
+                         checkpoint_interval, progress, cancel)
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    if len(sys.argv) > 2 and sys.argv[1] == 'resume':
+        done = resume_sweep(sys.argv[2], progress=print)
+        print(f"{sys.argv[2]}：{done.sweep.n_chunks} 块全部完成（precision={done.precision}，backend={done.backend}）")
+        sys.exit(0)
+
+    base = dict(steam_pressure=0.12, steam_mass_flow=600000, steam_enthalpy=2400,
+                tube_diameter=25.4, tube_wall_thickness=0.711, tube_pitch=32,
+                material='SS TP 304', passes=2, cooling_water_nozzle_count=2,
+                cooling_water_in_temp=25, cooling_water_temp_rise=8,
+                cp_water=4.179, rho_water=997, velocity=2.0, cleanliness_factor=0.85)
+    sweep = Sweep(base, {'cooling_water_in_temp': np.linspace(5, 33, 57),
+                         'velocity': np.linspace(1.0, 3.0, 41),
+                         'passes': [1, 2, 4]}, chunk_size=1000)
+    store = run_sweep(sweep, fields=('design_surface_area', 'total_pressure_drop'))
+    area = store.arrays['design_surface_area'].reshape(sweep.shape)
+    print(f"{sweep.size} 点，{sweep.n_chunks} 块，失败 {np.count_nonzero(store.arrays['error_code'])} 点")
+    print("25°C、2.0 m/s、2 流程设计面积：", area[40, 20, 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 模拟中途崩溃：算完一半块、做过检查点后丢弃进程内状态
+        fields = ('design_surface_area', 'total_pressure_drop')
+        partial = SweepStore(sweep, fields, tmp, checkpoint_interval=0)
+        for chunk_id in range(sweep.n_chunks // 2):
+            partial.write(chunk_id, compute_chunk(sweep, chunk_id, partial.fields))
+        del partial
+        resumed = resume_sweep(tmp)
+        same = all(np.array_equal(resumed.arrays[k], store.arrays[k], equal_nan=True) for k in store.fields)
+        print(f"续算后结果与一次算完一致：{same}")
@@ -0,0 +1,220 @@
+"""
+管束排布计算模块
+在圆形管板上按正三角形/正方形节距排布换热管，并留出分程隔板通道，
+统计实际可布置的管位，求能容纳指定管数的最小管板直径。
+
+所有管位均以 numpy 数组整体生成与筛选；同一几何参数(管径无关)的
+管位半径排序结果会被缓存，因此在参数扫描中反复调用只需一次查表。
+"""
+import math
+
+import numpy as np
+
+_PATTERNS = ('triangular', 'square')
+_VALID_PASSES = (1, 2, 4)
+
+# 几何参数 -> (覆盖半径, 已排序的管中心半径, 排序后对应的x, y, 流程号)
+_LATTICE_CACHE = {}
+
+
+class TubeLayout:
+    """管束排布结果"""
+
+    def __init__(self, x, y, pass_no, sheet_diameter):
+        self.x = x                          # 管中心x坐标 (mm)
+        self.y = y                          # 管中心y坐标 (mm)
+        self.pass_no = pass_no              # 所属流程号 (1..passes)
+        self.sheet_diameter = sheet_diameter  # 管板外径 (mm)
+
+    @property
+    def tube_count(self):
+        return int(self.x.size)
+
+    @property
+    def tubes_per_pass(self):
+        """各流程的管数"""
+        return np.bincount(self.pass_no, minlength=int(self.pass_no.max(initial=0)) + 1)[1:]
+
+
+def _check_geometry(tube_diameter, flow_number, tube_spacing, pattern):
+    """参数校验（与 calculate_tube_sheet_diameter 保持一致）"""
+    if tube_diameter <= 0:
+        raise ValueError(f"换热管外径必须>0")
+    if flow_number not in _VALID_PASSES:
+        raise ValueError("流程数必须是1、2或4")
+    if tube_spacing <= tube_diameter:
+        raise ValueError(f"管间距必须大于管外径")
+    if pattern not in _PATTERNS:
+        raise ValueError(f"未知排列方式：{pattern}，可选：{', '.join(_PATTERNS)}")
+
+
+def _lattice(pattern, pitch, radius):
+    """生成覆盖半径 radius 圆的节距点阵（以原点为中心）"""
+    row_pitch = pitch * math.sqrt(3) / 2 if pattern == 'triangular' else pitch
+    n_rows = int(radius / row_pitch) + 2
+    n_cols = int(radius / pitch) + 2
+    i, j = np.meshgrid(np.arange(-n_cols, n_cols + 1), np.arange(-n_rows, n_rows + 1))
+    x = i * pitch
+    if pattern == 'triangular':
+        # 奇数行错开半个节距
+        x = x + (j % 2) * (pitch / 2)
+    y = j * row_pitch
+    return x.ravel().astype(float), y.ravel().astype(float)
+
+
+def _pass_positions(pattern, pitch, passes, lane_width, radius):
+    """
+    按流程数划分区域并留出分程通道
+
+    2流程沿水平通道上下对称，4流程再加一条竖直通道形成四象限；
+    每个区域内的点阵从通道边缘开始排布。
+    返回: (x, y, pass_no)
+    """
+    x, y = _lattice(pattern, pitch, radius)
+    if passes == 1:
+        return x, y, np.ones(x.size, dtype=np.intp)
+
+    c = lane_width / 2
+    if passes == 2:
+        keep = y >= 0
+        xs, ys = x[keep], y[keep] + c
+        return (np.concatenate((xs, xs)),
+                np.concatenate((-ys, ys)),
+                np.repeat(np.array([1, 2], dtype=np.intp), xs.size))
+
+    keep = (x >= 0) & (y >= 0)
+    xs, ys = x[keep] + c, y[keep] + c
+    # 下半部为第1、2流程，上半部为第3、4流程
+    return (np.concatenate((-xs, xs, xs, -xs)),
+            np.concatenate((-ys, -ys, ys, ys)),
+            np.repeat(np.array([1, 2, 3, 4], dtype=np.intp), xs.size))
+
+
+def _sorted_positions(pattern, pitch, passes, lane_width, tube_count):
+    """返回至少含 tube_count 个完整管位的排序结果（按需扩大并缓存）"""
+    key = (pattern, float(pitch), passes, float(lane_width))
+    cached = _LATTICE_CACHE.get(key)
+    if cached is not None and cached[1].size >= tube_count:
+        return cached
+
+    cell = pitch * pitch * (math.sqrt(3) / 2 if pattern == 'triangular' else 1.0)
+    radius = 1.2 * math.sqrt(tube_count * cell / math.pi) + lane_width + 2 * pitch
+    if cached is not None:
+        radius = max(radius, 1.5 * cached[0])
+    while True:
+        x, y, pass_no = _pass_positions(pattern, pitch, passes, lane_width, radius)
+        r = np.hypot(x, y)
+        # 只有覆盖半径以内的管位是完整的
+        inside = r <= radius
+        if inside.sum() >= tube_count:
+            break
+        radius *= 1.5
+
+    order = np.argsort(r[inside], kind='stable')
+    entry = (radius, r[inside][order], x[inside][order], y[inside][order], pass_no[inside][order])
+    _LATTICE_CACHE[key] = entry
+    return entry
+
+
+def _defaults(tube_spacing, lane_width, edge_clearance):
+    if lane_width is None:
+        lane_width = 2 * tube_spacing
+    if edge_clearance is None:
+        edge_clearance = tube_spacing
+    if lane_width < tube_spacing:
+        raise ValueError(f"分程通道宽度必须≥管间距")
+    if edge_clearance < 0:
+        raise ValueError(f"管板边缘余量必须≥0")
+    return lane_width, edge_clearance
+
+
+def min_tube_sheet_diameter(tube_diameter, tube_count, flow_number, tube_spacing,
+                            pattern='triangular', lane_width=None, edge_clearance=None):
+    """
+    按实际排管求容纳指定管数的最小管板外径
+
+    参数:
+        tube_diameter: 换热管外径 (mm)
+        tube_count: 换热管数量 (根)，可为整数或整数数组
+        flow_number: 流程数 (1, 2, 或 4)
+        tube_spacing: 换热管中心间距 (mm)
+        pattern: 排列方式 'triangular'(正三角形) 或 'square'(正方形)
+        lane_width: 分程通道两侧管中心距 (mm)，默认2倍管间距
+        edge_clearance: 最外圈管外壁到管板外缘的余量 (mm)，默认1倍管间距
+    返回:
+        float 或 ndarray: 管板外径 (mm)
+    """
+    _check_geometry(tube_diameter, flow_number, tube_spacing, pattern)
+    lane_width, edge_clearance = _defaults(tube_spacing, lane_width, edge_clearance)
+
+    counts = np.asarray(tube_count, dtype=np.intp)
+    if counts.size and counts.min() < 1:
+        raise ValueError(f"换热管数量必须≥1")
+
+    _, radii, _, _, _ = _sorted_positions(pattern, tube_spacing, flow_number, lane_width,
+                                          int(counts.max(initial=1)))
+    diameter = 2 * (radii[counts - 1] + tube_diameter / 2 + edge_clearance)
+    return float(diameter) if diameter.ndim == 0 else diameter
+
+
+def count_tubes(sheet_diameter, tube_diameter, flow_number, tube_spacing,
+                pattern='triangular', lane_width=None, edge_clearance=None):
+    """
+    统计给定管板外径内可布置的管数
+
+    参数:
+        sheet_diameter: 管板外径 (mm)，可为数值或数组
+        其余参数同 min_tube_sheet_diameter
+    返回:
+        int 或 ndarray: 可布置管数
+    """
+    _check_geometry(tube_diameter, flow_number, tube_spacing, pattern)
+    lane_width, edge_clearance = _defaults(tube_spacing, lane_width, edge_clearance)
+
+    limit = np.asarray(sheet_diameter, dtype=float) / 2 - tube_diameter / 2 - edge_clearance
+    cell = tube_spacing ** 2 * (math.sqrt(3) / 2 if pattern == 'triangular' else 1.0)
+    estimate = int(math.pi * max(float(limit.max(initial=0)), 0) ** 2 / cell) + 1
+    while True:
+        radius, radii, _, _, _ = _sorted_positions(pattern, tube_spacing, flow_number,
+                                                   lane_width, estimate)
+        if radius >= limit.max(initial=0):
+            break
+        estimate = radii.size * 2
+
+    counts = np.searchsorted(radii, limit, side='right')
+    return int(counts) if counts.ndim == 0 else counts
+
+
+def generate_tube_layout(tube_diameter, tube_count, flow_number, tube_spacing,
+                         pattern='triangular', lane_width=None, edge_clearance=None):
+    """
+    生成指定管数的排管方案（取离中心最近的 tube_count 个管位）
+
+    参数:
+        同 min_tube_sheet_diameter，tube_count 为整数
+    返回:
+        TubeLayout: 管中心坐标、流程号与管板外径
+    """
+    _check_geometry(tube_diameter, flow_number, tube_spacing, pattern)
+    lane_width, edge_clearance = _defaults(tube_spacing, lane_width, edge_clearance)
+    tube_count = int(tube_count)
+    if tube_count < 1:
+        raise ValueError(f"换热管数量必须≥1")
+
+    _, radii, x, y, pass_no = _sorted_positions(pattern, tube_spacing, flow_number,
+                                                lane_width, tube_count)
+    diameter = 2 * (radii[tube_count - 1] + tube_diameter / 2 + edge_clearance)
+    return TubeLayout(x[:tube_count].copy(), y[:tube_count].copy(),
+                      pass_no[:tube_count].copy(), float(diameter))
+
+
+if __name__ == "__main__":
+    import time
+    from .tube_sheet import calculate_tube_sheet_diameter
+
+    t0 = time.perf_counter()
+    layout = generate_tube_layout(25, 30000, 2, 32)
+    t1 = time.perf_counter()
+    print(f"排管: {layout.tube_count} 根, 管板外径: {layout.sheet_diameter:.0f} mm, "
+          f"各流程: {layout.tubes_per_pass.tolist()}, 用时 {1000 * (t1 - t0):.1f} ms")
+    print(f"经验公式: {calculate_tube_sheet_diameter(25, 30000, 2, 32):.0f} mm")
@@ -3,6 +3,8 @@
 """
 import math
 
+from . import precision
+
 # 单位转换常量
 M3_H_TO_M3_S = 1 / 3600
 
@@ -18,7 +20,7 @@ def calc_tube_velocity(vol_flow_m3_h, tube_od_mm, wall_thickness_mm, tube_count,
         tube_count: 换热管数量 (根)
         passes: 流程数，默认1
     返回:
-        float: 管内流速 (m/s)，保留4位小数
+        float: 管内流速 (m/s)，按精度策略舍入（compat 为4位小数）
     """
     # 类型 + 数值校验
     try:
@@ -51,7 +53,7 @@ def calc_tube_velocity(vol_flow_m3_h, tube_od_mm, wall_thickness_mm, tube_count,
 
     # 流速计算
     velocity = Q_m3_s / Ai_total if Ai_total > 0 else 0.0
-    return round(velocity, 4)
+    return round(velocity, 4) if precision.compat else velocity
 
 
 def calc_tube_count_from_flow(vol_flow_m3_h, target_velocity_mps, tube_od_mm, wall_thickness_mm, passes=1):
@@ -0,0 +1,168 @@
+"""
+批量输入校验模块
+一次性对整批工况检查各阶段计算函数的全部适用范围，不抛出异常：
+每个工况得到一个错误位掩码，并可按约束统计失败数量。
+校验通过的工况可直接进入无校验的向量化计算路径（见 batch 模块）。
+管间距与排管方式只影响管板外径（与 calculate_all() 一致，管板外径与长径比
+留空），这两个错误位不使工况失败，其余结果照常计算。
+"""
+import numpy as np
+
+from . import vectorized as vec
+from .columns import as_columns
+from .heat_transfer_coefficient import _MIN_DIAM, _MAX_DIAM, _MIN_VEL_FPS, _MAX_VEL_FPS, MPS_TO_FPS
+from .material_coefficient import _MIN_THICK, _MAX_THICK
+from .tube_layout import _PATTERNS as _LAYOUT_PATTERNS
+from .water_correction import _MIN_F, _MAX_F
+
+# 错误位定义：名称 -> (位, 说明)
+ERROR_CODES = {
+    'missing_input': (1 << 0, "缺少必要输入参数"),
+    'steam_pressure': (1 << 1, "工作压力超出范围 [0.001, 22.064] MPa"),
+    'steam_enthalpy': (1 << 2, "蒸汽焓值必须>0"),
+    'steam_flow': (1 << 3, "蒸汽流量必须>0"),
+    'duty': (1 << 4, "热负荷必须>0（蒸汽焓值需大于饱和水焓值）"),
+    'water_properties': (1 << 5, "冷却水比热容、密度、温升或水量必须>0"),
+    'water_temp': (1 << 6, f"进水温度超出修正系数表范围 [{_MIN_F}, {_MAX_F}] °F"),
+    'material': (1 << 7, "未知材料"),
+    'thickness': (1 << 8, f"壁厚超出范围 [{_MIN_THICK}, {_MAX_THICK}] 英寸"),
+    'wall': (1 << 9, "外径必须大于2倍壁厚"),
+    'diameter': (1 << 10, f"管径超出范围 [{_MIN_DIAM}, {_MAX_DIAM}] mm"),
+    'velocity': (1 << 11, "流速超出范围 [0.91, 3.66] m/s"),
+    'passes': (1 << 12, "流程数必须是1、2或4"),
+    'temp_order': (1 << 13, "温度顺序错误，必须满足 t_sat > t_out > t_in"),
+    'terminal_diff': (1 << 14, "终端温差太小，必须满足 t_sat - t_out >= 2.8°C"),
+    'cleanliness': (1 << 15, "清洁系数必须>0"),
+    'pitch': (1 << 16, "管间距必须大于管外径"),
+    'nozzle_count': (1 << 17, "冷却水管口数必须≥1"),
+    'structure': (1 << 18, "结构模式输入无效（管数、管长或设计面积必须>0）"),
+    'mode': (1 << 19, "计算模式或结构模式无效"),
+    'layout': (1 << 20, "未知排管方式，可选 triangular、square"),
+}
+# 不使工况失败的错误位（只有管板外径与长径比为 NaN）
+SHEET_CODES = ('pitch', 'layout')
+# 使工况失败的错误位
+FATAL_MASK = np.uint32(sum(bit for name, (bit, _) in ERROR_CODES.items() if name not in SHEET_CODES))
+
+
+class ValidationResult:
+    """批量校验结果"""
+
+    def __init__(self, codes):
+        self.codes = codes                  # 每个工况的错误位掩码 (uint32)
+        self.valid = (codes & FATAL_MASK) == 0  # 可计算的工况（管板错误位不计入）
+
+    def summary(self):
+        """按约束统计失败工况数：名称 -> 数量（只列出数量>0的约束）"""
+        counts = {}
+        for name, (bit, _) in ERROR_CODES.items():
+            n = int(np.count_nonzero(self.codes & bit))
+            if n:
+                counts[name] = n
+        return counts
+
+    @staticmethod
+    def describe(code):
+        """错误位掩码 -> 说明列表"""
+        return [msg for bit, msg in ERROR_CODES.values() if int(code) & bit]
+
+
+def _missing(*arrays):
+    mask = np.zeros(arrays[0].shape, dtype=bool)
+    for a in arrays:
+        mask |= np.isnan(a)
+    return mask
+
+
+def validate_batch(columns):
+    """
+    整批校验全部计算约束
+
+    参数:
+        columns: 列式输入（见 columns.as_columns，未规范化的 dict 会先规范化）
+    返回:
+        ValidationResult
+    """
+    c = columns if isinstance(columns.get('material'), np.ndarray) else as_columns(columns)
+    calc_mode = c['calculation_mode']
+    struct_mode = c['structure_mode']
+    codes = np.zeros(calc_mode.shape, dtype=np.uint32)
+
+    def flag(name, mask):
+        codes[mask] |= np.uint32(ERROR_CODES[name][0])
+
+    # NaN 参与比较结果均为 False，因此各约束只需写出“不满足”的条件并排除缺失值
+    with np.errstate(invalid='ignore'):
+        p = c['steam_pressure']
+        h = c['steam_enthalpy']
+        flow = c['steam_mass_flow']
+        do = c['tube_diameter']
+        wall = c['tube_wall_thickness']
+        t_in = c['cooling_water_in_temp']
+        cp = c['cp_water']
+        rho = c['rho_water']
+        v = c['velocity']
+        passes = c['passes']
+        clean = c['cleanliness_factor']
+        fouling = c['fouling_factor']
+        rise = c['cooling_water_temp_rise']
+        water_flow = c['water_flow_input']
+        mode0 = calc_mode == 0
+
+        # 缺失输入
+        missing = _missing(p, h, flow, do, wall, t_in, cp, rho, v, passes, c['cooling_water_nozzle_count'])
+        missing |= np.isnan(clean) & ~(fouling > 0)
+        missing |= c['material'] == ''
+        missing |= mode0 & np.isnan(rise)
+        missing |= (calc_mode == 1) & np.isnan(water_flow)
+        missing |= (struct_mode == 1) & _missing(c['input_tube_count'], c['input_tube_length'])
+        missing |= (struct_mode == 2) & _missing(c['input_design_surface'], c['input_tube_count'])
+        flag('missing_input', missing)
+
+        flag('mode', ~np.isin(calc_mode, (0, 1)) | ~np.isin(struct_mode, (0, 1, 2)))
+
+        # 蒸汽热负荷
+        flag('steam_pressure', (p * 1000 < 1) | (p > 22.064))
+        flag('steam_enthalpy', h <= 0)
+        flag('steam_flow', flow <= 0)
+        t_sat, h_water = vec.saturation_properties(p)
+        flag('duty', h <= h_water)
+
+        # 冷却水
+        bad_water = (cp <= 0) | (rho <= 0) | (mode0 & (rise <= 0)) | (~mode0 & (water_flow <= 0))
+        flag('water_properties', bad_water)
+        t_f = t_in * 9 / 5 + 32
+        flag('water_temp', (t_f < _MIN_F) | (t_f > _MAX_F))
+
+        # 材料与管子
+        flag('material', (c['material'] != '') & (vec.material_index(c['material']) < 0))
+        th_in = wall / 25.4
+        flag('thickness', (th_in < _MIN_THICK) | (th_in > _MAX_THICK))
+        flag('wall', do <= 2 * wall)
+        flag('diameter', (do < _MIN_DIAM) | (do > _MAX_DIAM))
+        v_fps = v * MPS_TO_FPS
+        flag('velocity', (v_fps < _MIN_VEL_FPS) | (v_fps > _MAX_VEL_FPS))
+        flag('passes', ~np.isnan(passes) & ~np.isin(passes, (1, 2, 4)))
+
+        # 对数平均温差（出口温度由热负荷与水量/温升推出）
+        duty = (h - h_water) * flow / 3600
+        t_out = np.where(mode0, t_in + rise, t_in + duty / (water_flow * rho / 3600 * cp))
+        flag('temp_order', ~np.isnan(t_sat) & ~np.isnan(t_out) & ~((t_sat > t_out) & (t_out > t_in)))
+        flag('terminal_diff', (t_sat > t_out) & (t_sat - t_out < 2.8))
+
+        flag('cleanliness', ~(fouling > 0) & (clean <= 0))
+        flag('pitch', c['tube_pitch'] <= do)
+        layout = c.get('tube_layout_pattern')
+        if layout is not None:
+            given = layout != ''
+            if given.any():
+                flag('layout', given & ~np.isin(layout, _LAYOUT_PATTERNS))
+        flag('nozzle_count', c['cooling_water_nozzle_count'] < 1)
+
+        # 结构模式输入
+        count = c['input_tube_count']
+        bad_struct = (struct_mode == 1) & ((count < 1) | (c['input_tube_length'] <= 0))
+        bad_struct |= (struct_mode == 2) & ((count < 1) | (c['input_design_surface'] <= 0))
+        flag('structure', bad_struct)
+
+    return ValidationResult(codes)
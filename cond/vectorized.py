@@ -0,0 +1,260 @@
+"""
+向量化计算内核
+各阶段计算函数的 numpy 数组版本，用于批量工况、分段模型与参数扫描。
+
+与标量版本使用同一套查表数据和公式；超出适用范围的元素返回 NaN
+而不抛出异常（批量校验见 validation 模块）。舍入遵循同一精度策略
+（见 precision 模块），兼容模式下仅在十进制舍入边界上可能相差一个末位。
+"""
+import numpy as np
+
+from . import precision
+from .heat_transfer_coefficient import _RAW, _VELOCITIES, _DIAMETERS, MPS_TO_FPS
+from .material_coefficient import _THICKNESS, _COEFF as _MAT_COEFF, _VALID_MATERIALS
+from .water_correction import _TEMP_FW, _COEFF as _FW_COEFF
+
+# 查表数据转为数组
+_U_TABLE = np.array([_RAW[d] for d in _DIAMETERS])          # [直径, 流速]
+_U_DIAMETERS = np.array(_DIAMETERS)
+_U_VELOCITIES = np.array(_VELOCITIES)
+_MAT_TABLE = np.array([_MAT_COEFF[m] for m in _VALID_MATERIALS])  # [材料, 壁厚]
+_MAT_THICKNESS = np.array(_THICKNESS)
+_FW_TEMPS = np.array(_TEMP_FW, dtype=float)
+_FW_VALUES = np.array(_FW_COEFF)
+_MATERIAL_INDEX = {m.lower(): i for i, m in enumerate(_VALID_MATERIALS)}
+
+U_BTU_TO_METRIC = 5.678
+
+
+def _arr(x):
+    return np.asarray(x, dtype=float)
+
+
+def apply_precision(x, digits):
+    """按精度策略舍入（完整精度模式下原样返回）"""
+    return np.round(x, digits) if precision.compat else x
+
+
+def _segment(x, grid):
+    """返回插值区间下标与区间内权重（两端截断）"""
+    xc = np.clip(x, grid[0], grid[-1])
+    i = np.clip(np.searchsorted(grid, xc, side='right') - 1, 0, grid.size - 2)
+    t = (xc - grid[i]) / (grid[i + 1] - grid[i])
+    return i, t
+
+
+def material_index(materials):
+    """
+    材料名称 -> 材料表下标（不区分大小写，未知材料为 -1）
+
+    参数:
+        materials: 材料名称或名称序列
+    返回:
+        ndarray[int]: 材料下标
+    """
+    if isinstance(materials, str):
+        return np.array(_MATERIAL_INDEX.get(materials.strip().lower(), -1))
+    # 批量工况中材料种类很少：每种名称只规范化一次
+    lookup = {m: _MATERIAL_INDEX.get(str(m).strip().lower(), -1) for m in set(materials)}
+    return np.fromiter(map(lookup.__getitem__, materials), dtype=np.intp, count=len(materials))
+
+
+def saturation_properties(pressure_mpa):
+    """
+    饱和温度与饱和水焓（_iapws_saturation_properties 的数组版本）
+
+    参数:
+        pressure_mpa: 压力 (MPa)
+    返回:
+        tuple: (饱和温度°C, 饱和水焓kJ/kg)，无效压力为 NaN
+    """
+    p = _arr(pressure_mpa)
+    valid = (p * 1000 >= 1) & (p <= 22.064)
+    ps = np.where(valid, p, 1.0)
+    t_sat = np.where(ps <= 0.1, 10.1967 * ps ** 0.25 - 0.3667,
+                     np.where(ps <= 1.0, 45.0 + 45.0 * np.log10(ps * 10),
+                              100.0 + 50.0 * np.log10(ps)))
+    h_water = 4.2 * t_sat + 0.0015 * t_sat ** 2
+    nan = np.nan
+    return (np.where(valid, apply_precision(t_sat, 3), nan),
+            np.where(valid, apply_precision(h_water, 3), nan))
+
+
+def steam_heat_load(pressure_mpa, steam_enthalpy, steam_flow_rate):
+    """
+    饱和温度、饱和水焓及热负荷（get_steam_heat_load 的数组版本）
+
+    参数:
+        pressure_mpa: 工作压力 (MPa)
+        steam_enthalpy: 蒸汽焓值 (kJ/kg)
+        steam_flow_rate: 蒸汽流量 (kg/s)
+    返回:
+        tuple: (饱和水温度°C, 饱和水焓值kJ/kg, 热负荷kJ/s)
+    """
+    h = _arr(steam_enthalpy)
+    flow = _arr(steam_flow_rate)
+    t_sat, h_water = saturation_properties(pressure_mpa)
+    duty = apply_precision((h - h_water) * flow, 3)
+    duty = np.where((h > 0) & (flow > 0), duty, np.nan)
+    return t_sat, h_water, duty
+
+
+def water_correction_factor(t_celsius):
+    """
+    水温修正系数（数组版本），超出 30-120 °F 为 NaN
+    """
+    t_f = _arr(t_celsius) * 9 / 5 + 32
+    coeff = apply_precision(np.interp(t_f, _FW_TEMPS, _FW_VALUES), 4)
+    return np.where((t_f >= _FW_TEMPS[0]) & (t_f <= _FW_TEMPS[-1]), coeff, np.nan)
+
+
+def material_coeff(material_idx, thickness_in):
+    """
+    材料修正系数（数组版本）
+
+    参数:
+        material_idx: 材料下标（见 material_index）
+        thickness_in: 壁厚 (英寸)
+    返回:
+        ndarray: 材料修正系数（按精度策略舍入，compat 为4位小数），未知材料或壁厚超限为 NaN
+    """
+    idx = np.asarray(material_idx, dtype=np.intp)
+    th = _arr(thickness_in)
+    i, t = _segment(th, _MAT_THICKNESS)
+    row = np.where(idx >= 0, idx, 0)
+    coeff = _MAT_TABLE[row, i] + t * (_MAT_TABLE[row, i + 1] - _MAT_TABLE[row, i])
+    valid = (idx >= 0) & (th >= _MAT_THICKNESS[0]) & (th <= _MAT_THICKNESS[-1])
+    return np.where(valid, apply_precision(coeff, 4), np.nan)
+
+
+def uncorrected_u(diameter_mm, velocity):
+    """
+    未修正传热系数 U (Btu/(h·ft²·°F))（双线性插值，数组版本）
+
+    参数:
+        diameter_mm: 换热管外径 (mm)
+        velocity: 管内水流速 (m/s)
+    返回:
+        ndarray: U 值（按精度策略舍入，compat 为1位小数），超出范围为 NaN
+    """
+    d = _arr(diameter_mm)
+    v_fps = _arr(velocity) * MPS_TO_FPS
+    i, s = _segment(d, _U_DIAMETERS)
+    j, t = _segment(v_fps, _U_VELOCITIES)
+    u0 = _U_TABLE[i, j] + s * (_U_TABLE[i + 1, j] - _U_TABLE[i, j])
+    u1 = _U_TABLE[i, j + 1] + s * (_U_TABLE[i + 1, j + 1] - _U_TABLE[i, j + 1])
+    u = apply_precision(u0 + t * (u1 - u0), 1)
+    valid = ((d >= _U_DIAMETERS[0]) & (d <= _U_DIAMETERS[-1])
+             & (v_fps >= _U_VELOCITIES[0]) & (v_fps <= _U_VELOCITIES[-1]))
+    return np.where(valid, u, np.nan)
+
+
+def lmtd(t_sat, t_in, t_out):
+    """
+    对数平均温差 (°C)（数组版本），不满足温度顺序或端差<2.8°C 为 NaN
+    """
+    t_sat, t_in, t_out = _arr(t_sat), _arr(t_in), _arr(t_out)
+    dt1 = t_sat - t_in
+    dt2 = t_sat - t_out
+    valid = (t_sat > t_out) & (t_out > t_in) & (dt2 >= 2.8)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(np.abs(dt1 - dt2) < 0.001, dt1, (t_out - t_in) / np.log(dt1 / dt2))
+    return np.where(valid, apply_precision(value, 4), np.nan)
+
+
+def heat_transfer_area(heat_load, lmtd_value, u_uncorrect, fw_water, fw_mat, fouling_factor=1.0):
+    """
+    换热面积 A (m²)（数组版本），任一输入非正为 NaN
+    """
+    denom = _arr(lmtd_value) * _arr(u_uncorrect) * _arr(fw_water) * _arr(fw_mat) * _arr(fouling_factor)
+    q = _arr(heat_load)
+    valid = (q > 0) & (denom > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        area = apply_precision(1000 * q / denom, 2)
+    return np.where(valid, area, np.nan)
+
+
+def fouling_to_clean(f, do_mm, t_mm, u_w_m2k):
+    """
+    污垢系数 -> 清洁系数（数组版本），内径≤0 为 NaN
+    """
+    do = _arr(do_mm) * 1e-3
+    di = do - 2 * _arr(t_mm) * 1e-3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cf = 1 / (1 + _arr(u_w_m2k) * _arr(f) * do / di)
+    return np.where(di > 0, cf, np.nan)
+
+
+def kern_seaton(days, rf_max, time_constant):
+    """
+    Kern–Seaton 渐近污垢系数（数组版本）
+    """
+    return _arr(rf_max) * -np.expm1(-_arr(days) / _arr(time_constant))
+
+
+def temperature_factor(temp_c):
+    """HEI 水阻温度修正系数 Rt（简化公式，限制在 [0.9, 1.1]）"""
+    return np.clip(1.0 - 0.002 * (_arr(temp_c) - 20), 0.9, 1.1)
+
+
+def hei_water_resistance(di_mm, velocity_ms, length_mm, passes, temp_c):
+    """
+    HEI 水阻 (kPa)（calculate_hei_water_resistance 的数组版本）
+
+    无效输入（内径/流速/管长非正，流程数不是1、2、4）为 NaN
+    """
+    di_m = _arr(di_mm) / 1000.0
+    v = _arr(velocity_ms)
+    length_m = _arr(length_mm) / 1000.0
+    p = _arr(passes)
+    valid = (di_m > 0) & (v > 0) & (length_m > 0) & np.isin(p, (1, 2, 4))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dpl = 28.72 * v ** 1.75 / di_m ** 1.25
+    dpa = length_m * p * dpl * temperature_factor(temp_c)
+    # 端部 + 进出口 + 其他局部阻力：(0.5 + 0.3 + 0.2) * v² * passes * 0.1
+    local = (0.5 + 0.3 + 0.2) * v ** 2 * p * 0.1
+    return np.where(valid, np.round(dpa + local, 7), np.nan)
+
+
+def tube_count_from_flow(vol_flow_m3_h, target_velocity_mps, tube_od_mm, wall_thickness_mm, passes=1):
+    """
+    由体积流量与目标流速求最少管数（数组版本，向上取整，≥1）
+    """
+    di_m = (_arr(tube_od_mm) - 2 * _arr(wall_thickness_mm)) * 1e-3
+    ai_single = np.pi * (di_m / 2) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ai_needed = _arr(vol_flow_m3_h) / 3600 / _arr(target_velocity_mps)
+        count = np.maximum(np.ceil(ai_needed / ai_single * _arr(passes)), 1)
+    valid = (di_m > 0) & (_arr(target_velocity_mps) > 0) & (_arr(vol_flow_m3_h) > 0)
+    return np.where(valid, count, np.nan)
+
+
+def tube_length_from_area(total_area_m2, tube_count, tube_od_mm):
+    """
+    由总面积与管数求单根管长 (mm)（数组版本，向下取整，≥1）
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        length_m = _arr(total_area_m2) / (np.pi * _arr(tube_od_mm) * 1e-3 * _arr(tube_count))
+    length = np.maximum(np.floor(length_m * 1000), 1.0)
+    valid = (_arr(total_area_m2) > 0) & (_arr(tube_count) >= 1) & (_arr(tube_od_mm) > 0)
+    return np.where(valid, length, np.nan)
+
+
+def velocity_from_tube_count(vol_flow_m3_h, tube_count, tube_od_mm, wall_thickness_mm, passes):
+    """
+    由管数反算管内流速 (m/s)（数组版本，与计算引擎一致按精度策略舍入，compat 为3位小数）
+    """
+    di_m = (_arr(tube_od_mm) - 2 * _arr(wall_thickness_mm)) / 1000
+    area_per_tube = np.pi * (di_m / 2) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v = (_arr(vol_flow_m3_h) / 3600 * _arr(passes)) / (area_per_tube * _arr(tube_count))
+    return apply_precision(v, 3)
+
+
+def pipe_inner_diameter(water_mass_flow_kg_s, max_velocity_mps, fluid_density_kg_m3=1000.0):
+    """
+    接管内径 (mm)，按50mm向上圆整（数组版本）
+    """
+    vol = _arr(water_mass_flow_kg_s) / _arr(fluid_density_kg_m3)
+    d_mm = np.sqrt(4 * vol / (np.pi * _arr(max_velocity_mps))) * 1000
+    return np.ceil(d_mm / 50) * 50
@@ -1,6 +1,8 @@
 """
 冷却水温度修正系数模块
 """
+from . import precision
+
 
 # 30-120 °F 对应水温修正系数
 _TEMP_FW = [
@@ -53,7 +55,7 @@ def water_correction_factor(t_celsius):
     参数:
         t_celsius: 冷却水进水温度 (°C)
     返回:
-        float: 水温修正系数（4位小数）
+        float: 水温修正系数，按精度策略舍入（compat 为4位小数）
     """
     # 类型校验
     if not isinstance(t_celsius, (int, float)):
@@ -70,7 +72,7 @@ def water_correction_factor(t_celsius):
 
     # 线性插值
     coeff = _linear_interp(t_f, _TEMP_FW, _COEFF)
-    return round(coeff, 4)
+    return round(coeff, 4) if precision.compat else coeff
 
 
 if __name__ == "__main__":
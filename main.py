@@ -3,6 +3,8 @@
 工业风格UI设计
 """
 import os
+import threading
+from concurrent.futures import CancelledError
 os.environ['KIVY_NO_ARGS'] = '1'
 os.environ['KIVY_WINDOW'] = 'sdl2'
 
@@ -22,6 +24,7 @@ from kivy.uix.spinner import Spinner
 from kivy.uix.popup import Popup
 from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelHeader
 from kivy.uix.togglebutton import ToggleButton
+from kivy.uix.progressbar import ProgressBar
 from kivy.graphics import Color, Rectangle, Line
 from kivy.properties import ObjectProperty, StringProperty
 from kivy.core.window import Window
@@ -31,6 +34,8 @@ from kivy.clock import Clock
 from cond.data_model import InputData
 from cond.calculator import CondenserCalculator
 from cond.material_coefficient import get_material_list
+from cond.plan import calculate_many
+from cond.progress import CancelToken
 
 # 工业风格颜色
 COLORS = {
@@ -47,6 +52,16 @@ COLORS = {
     'error': (0.9, 0.3, 0.3, 1),            # 错误红
 }
 
+# 实时计算防抖延迟（秒）：连续输入期间只在停顿后计算一次
+LIVE_CALC_DELAY = 0.4
+
+# 工况扫描范围：(字段名, 起点, 终点, 步长)
+SCAN_AXES = (
+    ('cooling_water_in_temp', 5.0, 35.0, 0.5),
+    ('velocity', 1.0, 3.0, 0.05),
+    ('cleanliness_factor', 0.60, 0.95, 0.05),
+)
+
 
 class IndustrialLabel(Label):
     """工业风格标签"""
@@ -127,6 +142,87 @@ class SectionHeader(BoxLayout):
         self.rect.size = self.size
 
 
+class CalculationWorker:
+    """后台计算线程：只保留最新提交的任务，过期任务与结果直接丢弃"""
+    def __init__(self, on_result):
+        self._on_result = on_result
+        self._cond = threading.Condition()
+        self._pending = None
+        self._job_id = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, data, context=None):
+        """提交计算任务（覆盖尚未开始的旧任务）"""
+        with self._cond:
+            self._job_id += 1
+            self._pending = (self._job_id, data, context)
+            self._cond.notify()
+
+    def cancel(self):
+        """取消等待中的任务，并使正在计算的任务结果失效"""
+        with self._cond:
+            self._job_id += 1
+            self._pending = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                job_id, data, context = self._pending
+                self._pending = None
+            try:
+                result, error = CondenserCalculator(data).calculate_all(), None
+            except Exception as e:
+                result, error = None, e
+            # 结果回到UI线程处理
+            Clock.schedule_once(
+                lambda dt, j=job_id, r=result, e=error, c=context: self._deliver(j, r, e, c)
+            )
+
+    def _deliver(self, job_id, result, error, context):
+        if job_id != self._job_id:
+            return
+        self._on_result(result, error, context)
+
+
+def scan_cases(data):
+    """以当前输入为基准，按 SCAN_AXES 全组合生成扫描工况"""
+    base = data.to_dict()
+    cases = [{}]
+    for name, start, stop, step in SCAN_AXES:
+        count = int(round((stop - start) / step)) + 1
+        values = [round(start + i * step, 6) for i in range(count)]
+        cases = [dict(c, **{name: v}) for c in cases for v in values]
+    return [InputData.from_dict(dict(base, **c)) for c in cases]
+
+
+class ScanJob:
+    """后台工况扫描：进度与结果回到UI线程处理，可随时取消"""
+    def __init__(self, data, on_progress, on_done):
+        self._on_progress = on_progress
+        self._on_done = on_done
+        self.token = CancelToken()
+        self._thread = threading.Thread(target=self._run, args=(data,), daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """在下一个分块边界处停止扫描"""
+        self.token.cancel()
+
+    def _run(self, data):
+        try:
+            cases = scan_cases(data)
+            result, error = (cases, calculate_many(cases, self._report, self.token)), None
+        except Exception as e:
+            result, error = None, e
+        Clock.schedule_once(lambda dt: self._on_done(result, error))
+
+    def _report(self, info):
+        Clock.schedule_once(lambda dt: self._on_progress(info))
+
+
 class InputPanel(BoxLayout):
     """输入面板"""
     def __init__(self, **kwargs):
@@ -439,6 +535,20 @@ class InputPanel(BoxLayout):
             self.input_design_surface.disabled = False
             self.input_design_surface.background_color = COLORS['input_bg']
     
+    def bind_changes(self, callback):
+        """绑定所有影响计算结果的输入控件"""
+        for widget in (self.steam_pressure, self.steam_mass_flow, self.steam_enthalpy,
+                       self.tube_diameter, self.tube_wall_thickness, self.tube_pitch,
+                       self.material, self.passes, self.nozzle_count,
+                       self.cooling_water_in_temp, self.cp_water, self.rho_water,
+                       self.cleanliness_factor, self.input_temp_rise, self.input_water_flow,
+                       self.input_velocity, self.input_tube_count, self.input_tube_length,
+                       self.input_design_surface):
+            widget.bind(text=callback)
+        for toggle in (self.mode_temp_rise, self.mode_water_flow, self.structure_auto,
+                       self.structure_manual, self.structure_fixed):
+            toggle.bind(state=callback)
+
     def get_input_data(self):
         """获取输入数据"""
         data = InputData()
@@ -505,6 +615,7 @@ class ResultPanel(BoxLayout):
         self._create_thermal_section()
         self._create_structure_section()
         self._create_hydraulic_section()
+        self._bind_fields()
         
         scroll.add_widget(self.content)
         self.add_widget(scroll)
@@ -583,38 +694,50 @@ class ResultPanel(BoxLayout):
         self.content.add_widget(self.cw_nozzle)
         self.content.add_widget(self.cond_nozzle)
     
+    def _bind_fields(self):
+        """结果字段 -> (显示标签, 格式)"""
+        self._fields = [
+            # 热力结果
+            ('saturation_temp', self.saturation_temp_value, '{:.3f}'),
+            ('water_enthalpy', self.water_enthalpy_value, '{:.3f}'),
+            ('DUTY', self.duty_value, '{:.3f}'),
+            ('LMTD', self.lmtd_value, '{:.4f}'),
+            ('terminal_temp_diff', self.terminal_diff_value, '{:.3f}'),
+            ('u_metric', self.u_metric_value, '{:.2f}'),
+            ('surface_area', self.surface_area_value, '{:.2f}'),
+            ('design_surface_area', self.design_surface_value, '{:.0f}'),
+            # 结构结果
+            ('tube_count', self.tube_count_value, '{}'),
+            ('tube_length', self.tube_length_value, '{:.0f}'),
+            ('tube_sheet_diameter', self.tube_sheet_dia_value, '{:.0f}'),
+            ('tube_length_diameter_ratio', self.length_dia_ratio_value, '{:.2f}'),
+            # 水力结果
+            ('water_flow_kg_s', self.water_flow_kg_s_value, '{:.3f}'),
+            ('water_flow_m3_h', self.water_flow_m3_h_value, '{:.2f}'),
+            ('cooling_water_out_temp', self.outlet_temp_value, '{:.3f}'),
+            ('total_pressure_drop', self.pressure_drop_value, '{:.6f}'),
+            ('cooling_water_nozzle_diameter', self.cw_nozzle_value, '{}'),
+            ('condensate_outlet_inner_diameter', self.cond_nozzle_value, '{}'),
+        ]
+        # 上次显示的原始值，用于跳过未变化的标签
+        self._shown = {}
+
     def update_results(self, data):
-        """更新结果显示"""
-        # 热力结果
-        self.saturation_temp_value.text = f"{data.saturation_temp:.3f}" if data.saturation_temp else '-'
-        self.water_enthalpy_value.text = f"{data.water_enthalpy:.3f}" if data.water_enthalpy else '-'
-        self.duty_value.text = f"{data.DUTY:.3f}" if data.DUTY else '-'
-        self.lmtd_value.text = f"{data.LMTD:.4f}" if data.LMTD else '-'
-        self.terminal_diff_value.text = f"{data.terminal_temp_diff:.3f}" if data.terminal_temp_diff else '-'
-        self.u_metric_value.text = f"{data.u_metric:.2f}" if data.u_metric else '-'
-        self.surface_area_value.text = f"{data.surface_area:.2f}" if data.surface_area else '-'
-        self.design_surface_value.text = f"{data.design_surface_area:.0f}" if data.design_surface_area else '-'
-        
-        # 结构结果
-        self.tube_count_value.text = str(data.tube_count) if data.tube_count else '-'
-        self.tube_length_value.text = f"{data.tube_length:.0f}" if data.tube_length else '-'
-        self.tube_sheet_dia_value.text = f"{data.tube_sheet_diameter:.0f}" if data.tube_sheet_diameter else '-'
-        self.length_dia_ratio_value.text = f"{data.tube_length_diameter_ratio:.2f}" if data.tube_length_diameter_ratio else '-'
-        
-        # 长径比颜色判断
-        if data.tube_length_diameter_ratio:
-            if data.tube_length_diameter_ratio < 2 or data.tube_length_diameter_ratio > 3:
-                self.length_dia_ratio_value.color = COLORS['error']
-            else:
-                self.length_dia_ratio_value.color = COLORS['success']
-        
-        # 水力结果
-        self.water_flow_kg_s_value.text = f"{data.water_flow_kg_s:.3f}" if data.water_flow_kg_s else '-'
-        self.water_flow_m3_h_value.text = f"{data.water_flow_m3_h:.2f}" if data.water_flow_m3_h else '-'
-        self.outlet_temp_value.text = f"{data.cooling_water_out_temp:.3f}" if data.cooling_water_out_temp else '-'
-        self.pressure_drop_value.text = f"{data.total_pressure_drop:.6f}" if data.total_pressure_drop else '-'
-        self.cw_nozzle_value.text = str(data.cooling_water_nozzle_diameter) if data.cooling_water_nozzle_diameter else '-'
-        self.cond_nozzle_value.text = str(data.condensate_outlet_inner_diameter) if data.condensate_outlet_inner_diameter else '-'
+        """更新结果显示（仅刷新数值发生变化的标签）"""
+        for attr, label, fmt in self._fields:
+            value = getattr(data, attr)
+            if attr in self._shown and self._shown[attr] == value:
+                continue
+            self._shown[attr] = value
+            label.text = fmt.format(value) if value else '-'
+
+            # 长径比颜色判断：按显示的（舍入后的）数值判断，与用户看到的一致
+            if attr == 'tube_length_diameter_ratio' and value:
+                shown = float(label.text)
+                if shown < 2 or shown > 3:
+                    label.color = COLORS['error']
+                else:
+                    label.color = COLORS['success']
 
 
 class CondenserCalcApp(App):
@@ -661,14 +784,63 @@ class CondenserCalcApp(App):
         
         root.add_widget(tabs)
         
+        # 状态栏
+        self.status_label = IndustrialLabel(
+            text='',
+            color=COLORS['text_secondary'],
+            font_size='12sp',
+            height='24dp'
+        )
+        root.add_widget(self.status_label)
+        
+        # 扫描进度条（扫描时显示）
+        self.progress_row = BoxLayout(size_hint_y=None, height=0, opacity=0, spacing='5dp')
+        self.progress_bar = ProgressBar(max=1)
+        self.progress_row.add_widget(self.progress_bar)
+        self.cancel_btn = IndustrialButton(
+            text='取消',
+            size_hint_x=0.25,
+            background_color=COLORS['error']
+        )
+        self.cancel_btn.bind(on_press=self.on_cancel_scan)
+        self.progress_row.add_widget(self.cancel_btn)
+        root.add_widget(self.progress_row)
+        
         # 计算按钮
+        button_bar = BoxLayout(size_hint_y=None, height='50dp', spacing='5dp')
+        self.live_toggle = ToggleButton(
+            text='实时计算',
+            size_hint_x=0.35,
+            background_color=COLORS['input_bg']
+        )
+        self.live_toggle.bind(state=self._on_live_toggle)
+        button_bar.add_widget(self.live_toggle)
+        
         calc_btn = IndustrialButton(
             text='执行计算',
             size_hint_y=None,
             height='50dp'
         )
         calc_btn.bind(on_press=self.on_calculate)
-        root.add_widget(calc_btn)
+        button_bar.add_widget(calc_btn)
+        
+        self.scan_btn = IndustrialButton(
+            text='工况扫描',
+            size_hint_x=0.5,
+            size_hint_y=None,
+            height='50dp',
+            background_color=COLORS['accent']
+        )
+        self.scan_btn.bind(on_press=self.on_scan)
+        button_bar.add_widget(self.scan_btn)
+        root.add_widget(button_bar)
+        
+        # 后台计算与实时计算
+        self.worker = CalculationWorker(self._on_calc_result)
+        self._live_event = None
+        self._popup = None
+        self._scan = None
+        self.input_panel.bind_changes(self._on_input_change)
         
         return root
     
@@ -676,65 +848,179 @@ class CondenserCalcApp(App):
         self.title_rect.pos = instance.pos
         self.title_rect.size = instance.size
     
+    def _on_live_toggle(self, instance, state):
+        """切换实时计算模式"""
+        if state == 'down':
+            instance.background_color = COLORS['primary']
+            self._on_input_change()
+        else:
+            instance.background_color = COLORS['input_bg']
+            self._cancel_live()
+    
+    def _on_input_change(self, *args):
+        """输入变化：实时模式下防抖后重新计算，并丢弃过期任务"""
+        if self.live_toggle.state != 'down':
+            return
+        self._cancel_live()
+        self._live_event = Clock.schedule_once(lambda dt: self._start_calculation(live=True), LIVE_CALC_DELAY)
+    
+    def _cancel_live(self):
+        if self._live_event is not None:
+            self._live_event.cancel()
+            self._live_event = None
+        self.worker.cancel()
+    
     def on_calculate(self, instance):
         """执行计算"""
+        self._cancel_live()
+        self._start_calculation(live=False)
+    
+    def _start_calculation(self, live):
+        """读取输入并提交到后台线程"""
+        self._live_event = None
+        data = self._read_input(live)
+        if data is None:
+            return
+        
+        self.status_label.color = COLORS['text_secondary']
+        self.status_label.text = '计算中...'
+        self.worker.submit(data, live)
+    
+    def _read_input(self, live):
+        """读取并检查输入，有错误时报告并返回 None"""
         try:
             # 获取输入数据
             data = self.input_panel.get_input_data()
-            
-            # 验证必要参数
-            errors = []
-            if data.steam_pressure is None:
-                errors.append('蒸汽压力')
-            if data.steam_mass_flow is None:
-                errors.append('蒸汽流量')
-            if data.steam_enthalpy is None:
-                errors.append('蒸汽焓值')
-            if data.tube_diameter is None:
-                errors.append('换热管外径')
-            if data.tube_wall_thickness is None:
-                errors.append('管壁厚度')
-            if data.cooling_water_in_temp is None:
-                errors.append('冷却水进口温度')
-            
-            if errors:
-                self.show_error(f"请填写以下参数:\n{', '.join(errors)}")
-                return
-            
-            # 执行计算
-            calculator = CondenserCalculator(data)
-            result_data = calculator.calculate_all()
-            
-            # 更新结果
-            self.result_panel.update_results(result_data)
-            
-            # 显示成功提示
-            self.show_success('计算完成！')
-            
         except ValueError as e:
-            self.show_error(f'输入错误: {str(e)}')
-        except Exception as e:
-            self.show_error(f'计算错误: {str(e)}')
+            self._report_error(f'输入错误: {str(e)}', live)
+            return
+        
+        # 验证必要参数
+        errors = []
+        if data.steam_pressure is None:
+            errors.append('蒸汽压力')
+        if data.steam_mass_flow is None:
+            errors.append('蒸汽流量')
+        if data.steam_enthalpy is None:
+            errors.append('蒸汽焓值')
+        if data.tube_diameter is None:
+            errors.append('换热管外径')
+        if data.tube_wall_thickness is None:
+            errors.append('管壁厚度')
+        if data.cooling_water_in_temp is None:
+            errors.append('冷却水进口温度')
+        
+        if errors:
+            self._report_error(f"请填写以下参数:\n{', '.join(errors)}", live)
+            return None
+        return data
+    
+    def on_scan(self, instance):
+        """以当前输入为基准扫描冷却水温、流速与清洁系数"""
+        if self._scan is not None:
+            return
+        data = self._read_input(live=False)
+        if data is None:
+            return
+        self._cancel_live()
+        self.scan_btn.disabled = True
+        self.progress_bar.value = 0
+        self.progress_row.height = self.scan_btn.height
+        self.progress_row.opacity = 1
+        self.status_label.color = COLORS['text_secondary']
+        self.status_label.text = '扫描准备中...'
+        self._scan = ScanJob(data, self._on_scan_progress, self._on_scan_done)
+    
+    def on_cancel_scan(self, instance):
+        """取消扫描"""
+        if self._scan is not None:
+            self._scan.cancel()
+            self.status_label.text = '正在取消...'
+    
+    def _on_scan_progress(self, info):
+        """扫描进度（UI线程）"""
+        if self._scan is None or self._scan.token.cancelled:
+            return
+        self.progress_bar.value = info.fraction
+        self.status_label.text = f'扫描中 {info.fraction:.0%}  {info}'
+    
+    def _on_scan_done(self, result, error):
+        """扫描结束（UI线程）"""
+        self._scan = None
+        self.scan_btn.disabled = False
+        self.progress_row.height = 0
+        self.progress_row.opacity = 0
+        if isinstance(error, CancelledError):
+            self.status_label.color = COLORS['warning']
+            self.status_label.text = '扫描已取消'
+            return
+        if error is not None:
+            self._report_error(f'扫描错误: {str(error)}', live=False)
+            return
+        
+        cases, results = result
+        valid = [r for r in results if r is not None]
+        if not valid:
+            self._report_error('扫描范围内没有通过校验的工况', live=False)
+            return
+        best = min(valid, key=lambda r: r.design_surface_area)
+        areas = [r.design_surface_area for r in valid]
+        drops = [r.total_pressure_drop for r in valid]
+        self.status_label.color = COLORS['success']
+        self.status_label.text = f'扫描完成：{len(cases)} 个工况'
+        self._show_popup('扫描结果',
+            f'扫描 {len(cases)} 个工况，有效 {len(valid)} 个\n'
+            f'设计面积 {min(areas):.0f} ~ {max(areas):.0f} m²\n'
+            f'冷却水阻 {min(drops):.4f} ~ {max(drops):.4f} MPa\n'
+            f'面积最小：进水 {best.cooling_water_in_temp:g} °C，'
+            f'流速 {best.velocity:g} m/s，清洁系数 {best.cleanliness_factor:g}',
+            COLORS['success'], (0.9, 0.4))
+    
+    def _on_calc_result(self, result_data, error, live):
+        """后台计算完成（UI线程）"""
+        if isinstance(error, ValueError):
+            self._report_error(f'输入错误: {str(error)}', live)
+            return
+        if error is not None:
+            self._report_error(f'计算错误: {str(error)}', live)
+            return
+        
+        # 更新结果
+        self.result_panel.update_results(result_data)
+        self.status_label.color = COLORS['success']
+        self.status_label.text = '计算完成'
+        
+        # 显示成功提示（实时模式下只更新状态栏）
+        if not live:
+            self.show_success('计算完成！')
+    
+    def _report_error(self, message, live):
+        """实时模式下错误只显示在状态栏，避免打断输入"""
+        self.status_label.color = COLORS['error']
+        self.status_label.text = message.replace('\n', ' ')
+        if not live:
+            self.show_error(message)
+    
+    def _show_popup(self, title, message, color, size_hint):
+        """复用同一个弹窗，避免每次计算都新建控件"""
+        if self._popup is None:
+            self._popup = Popup(
+                content=Label(),
+                background_color=COLORS['bg_panel']
+            )
+        self._popup.title = title
+        self._popup.content.text = message
+        self._popup.content.color = color
+        self._popup.size_hint = size_hint
+        self._popup.open()
     
     def show_error(self, message):
         """显示错误弹窗"""
-        popup = Popup(
-            title='错误',
-            content=Label(text=message, color=COLORS['error']),
-            size_hint=(0.8, 0.4),
-            background_color=COLORS['bg_panel']
-        )
-        popup.open()
+        self._show_popup('错误', message, COLORS['error'], (0.8, 0.4))
     
     def show_success(self, message):
         """显示成功弹窗"""
-        popup = Popup(
-            title='成功',
-            content=Label(text=message, color=COLORS['success']),
-            size_hint=(0.6, 0.3),
-            background_color=COLORS['bg_panel']
-        )
-        popup.open()
+        self._show_popup('成功', message, COLORS['success'], (0.6, 0.3))
 
 
 if __name__ == '__main__':